@@ -20,6 +20,59 @@ DEFAULT_CFG = {
     "notice_sms_enabled": True,             # Enable/disable SMS sending
     "notice_attachments_root_path": None,   # Root path for notice attachments (if any)
     "allowed_domains_attachments": [],      # Allowed domains for attachments
+    "notice_attachment_storage_backend": "notice.storage.FileSystemAttachmentStorage",  # Attachment blob store
+    "notice_attachment_storage_options": {},  # Keyword arguments for the blob store backend
+    "notice_attachment_compress_mime_types": ["text/*", "application/pdf", "application/json", "application/xml",
+                                              "application/msword", "application/rtf", "image/svg+xml",
+                                              "image/bmp", "image/tiff"],  # Attachment contents stored gzipped
+    "notice_attachment_compress_min_saving": 0.1,  # Contents shrinking less than this share are stored as is
+    "notice_blob_gc_grace_seconds": 86400,  # Unreferenced blobs are only deleted after this delay
+    "notice_preview_enabled": True,         # Generate attachment previews in the background (Celery)
+    "notice_preview_max_size": 320,         # Max width and height in pixels of attachment previews
+    "notice_preview_quality": 80,           # JPEG quality of attachment previews
+    "notice_preview_max_source_size": 52428800,  # Attachments larger than this get no preview
+    "notice_preview_timeout": 120,          # Soft time limit in seconds of a preview task (killed 30 s later)
+    "notice_preview_workers": 2,            # Render processes of generate_attachment_previews
+    "notice_upload_spool_path": None,       # Directory for chunked upload spool files (system temp dir if None)
+    "notice_upload_max_size": 104857600,    # Max size in bytes of a chunked attachment upload
+    "notice_upload_expiry_seconds": 86400,  # Uploads not touched for this long are deleted (cleanup_notice_uploads)
+    "notice_visible_cache_enabled": True,   # Cache the published notice counts per scope (unread counts)
+    "notice_visible_cache_alias": "default",  # Django cache alias (in-memory LRU if not configured)
+    "notice_visible_cache_timeout": 300,    # Seconds before a cached visible notice list expires
+    "notice_visible_cache_max_entries": 1024,  # Capacity of the in-memory LRU fallback
+    "notice_facility_locations_timeout": 3600,  # Seconds a cached facility -> district/region lookup is kept
+    "notice_publish_batch_size": 1000,      # Notices published per scheduler transaction
+    "notice_publish_interval": 60,          # Seconds between scheduler ticks (publish_due_notices --loop)
+    "notice_archive_batch_size": 500,       # Expired notices archived per sweeper transaction
+    "notice_recipient_chunk_size": 2000,    # Rows fetched per server-side cursor round-trip when resolving recipients
+    "notice_email_batch_size": 100,         # Recipients per email delivery batch
+    "notice_email_from": "no-reply@openimis.org",  # Sender of notice emails
+    "notice_email_max_retries": 5,          # Retries of a message on SMTP throttling
+    "notice_email_backoff_seconds": 1,      # Base delay of the exponential backoff on SMTP throttling
+    "notice_sms_backend": "notice.sms.HttpSMSBackend",  # SMS delivery backend (notice.sms.LocMemSMSBackend for tests)
+    "notice_sms_backend_options": {},       # Keyword arguments of the SMS backend (url, bulk_url, api_key, max_workers...)
+    "notice_sms_batch_size": 500,           # Recipients per SMS delivery batch
+    "notice_delivery_publish_channels": ["EMAIL"],  # Channels delivered when a notice is published
+    "notice_delivery_relay_batch_size": 500,  # Outbox rows dispatched per relay transaction
+    "notice_delivery_relay_interval": 5,    # Seconds between idle relay ticks (relay_notice_deliveries --loop)
+    "notice_delivery_stale_seconds": 900,   # Dispatched outbox rows not completed after this delay are dispatched again
+    "notice_delivery_max_attempts": 5,      # Dispatch attempts of an outbox row before it is marked failed
+    "notice_delivery_retry_backoff": 30,    # Seconds before retrying a failed outbox row, doubled at each attempt
+    "notice_delivery_retry_max_backoff": 3600,  # Upper bound in seconds of the retry backoff
+    "notice_events_enabled": True,          # Publish notice change events to the event streams
+    "notice_events_broker": "notice.events.InProcessNoticeBroker",  # Pub/sub (notice.events.RedisNoticeBroker across processes)
+    "notice_events_broker_options": {},     # Keyword arguments of the broker (url for Redis)
+    "notice_events_single_process": False,  # Allow the in-process broker without DEBUG (one process serves everything)
+    "notice_events_wsgi_streams": False,    # Serve event streams under WSGI without DEBUG (gevent workers)
+    "notice_events_heartbeat": 15,          # Seconds between keep-alive comments on idle event streams
+    "notice_events_stream_timeout": 300,    # Seconds before an event stream is closed (clients reconnect)
+    "notice_sync_page_size": 500,           # Max notices (and deletions) per noticesChangedSince page
+    "notice_sync_settle_seconds": 5,        # Changes younger than this are left to the next sync
+    "notice_instrumentation_enabled": False,  # Time notice resolvers and mutations (NoticeInstrumentationMiddleware)
+    "notice_instrumentation_slow_ms": 200,  # Resolvers slower than this are logged, not only counted
+    "notice_metrics_token": "",             # Bearer token of the metrics endpoint (disabled when empty)
+    "notice_metrics_flush_seconds": 10,     # Seconds between publications of a process's metrics to the cache
+    "notice_metrics_process_ttl": 86400,    # Seconds before the metrics of a process that stopped publishing are dropped
 }
 
 
@@ -43,6 +96,57 @@ class NoticeConfig(AppConfig):
     notice_sms_enabled = None
     notice_attachments_root_path = None
     allowed_domains_attachments = None
+    notice_attachment_storage_backend = None
+    notice_attachment_storage_options = None
+    notice_attachment_compress_mime_types = None
+    notice_attachment_compress_min_saving = None
+    notice_blob_gc_grace_seconds = None
+    notice_preview_enabled = None
+    notice_preview_max_size = None
+    notice_preview_quality = None
+    notice_preview_max_source_size = None
+    notice_preview_timeout = None
+    notice_preview_workers = None
+    notice_upload_spool_path = None
+    notice_upload_max_size = None
+    notice_upload_expiry_seconds = None
+    notice_visible_cache_enabled = None
+    notice_visible_cache_alias = None
+    notice_visible_cache_timeout = None
+    notice_visible_cache_max_entries = None
+    notice_facility_locations_timeout = None
+    notice_publish_batch_size = None
+    notice_publish_interval = None
+    notice_archive_batch_size = None
+    notice_recipient_chunk_size = None
+    notice_email_batch_size = None
+    notice_email_from = None
+    notice_email_max_retries = None
+    notice_email_backoff_seconds = None
+    notice_sms_backend = None
+    notice_sms_backend_options = None
+    notice_sms_batch_size = None
+    notice_delivery_publish_channels = None
+    notice_delivery_relay_batch_size = None
+    notice_delivery_relay_interval = None
+    notice_delivery_stale_seconds = None
+    notice_delivery_max_attempts = None
+    notice_delivery_retry_backoff = None
+    notice_delivery_retry_max_backoff = None
+    notice_events_enabled = None
+    notice_events_broker = None
+    notice_events_broker_options = None
+    notice_events_single_process = None
+    notice_events_wsgi_streams = None
+    notice_events_heartbeat = None
+    notice_events_stream_timeout = None
+    notice_sync_page_size = None
+    notice_sync_settle_seconds = None
+    notice_instrumentation_enabled = None
+    notice_instrumentation_slow_ms = None
+    notice_metrics_token = None
+    notice_metrics_flush_seconds = None
+    notice_metrics_process_ttl = None
 
     def __load_config(self, cfg):
         for field in cfg:
@@ -52,4 +156,5 @@ class NoticeConfig(AppConfig):
     def ready(self):
         from core.models import ModuleConfiguration
         cfg = ModuleConfiguration.get_or_default(MODULE_NAME, DEFAULT_CFG)
-        self.__load_config(cfg)
\ No newline at end of file
+        self.__load_config(cfg)
+        from . import signals  # noqa: F401 - connects the model signal receivers
\ No newline at end of file
@@ -0,0 +1,77 @@
+import logging
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .apps import NoticeConfig
+from .cache import visible_notice_cache
+from .events import EVENT_DELETED, is_visible, notice_event, publish_notice_events
+from .models import Notice, NoticeAttachment, NoticeArchive, NoticeAttachmentArchive, NoticeMutation, \
+    NoticeMutationArchive, NoticeDelivery, NoticeDeliveryStats, NoticeRecipientDelivery, NoticeScopeChange, \
+    NoticeSearchTerm
+from .reads import forget_notice_reads
+
+logger = logging.getLogger(__name__)
+
+
+def _archive_copy(instance, archive_model, archived_at):
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in archive_model._meta.concrete_fields
+        if field.attname != "archived_at"
+    }
+    return archive_model(archived_at=archived_at, **values)
+
+
+def archive_expired_notices(batch_size=None, now=None, max_batches=None) -> int:
+    """
+    Move the notices past their validity_to, with their attachments and mutation log links, to
+    the archive tables.
+    Each batch is copied and deleted in its own transaction, so the sweep can be interrupted
+    and resumed at any time: whatever is still in tbl_notices is simply picked up again.
+    Attachment blobs are not touched, the archived rows keep referencing them.
+    Returns the number of archived notices.
+    """
+    batch_size = batch_size or NoticeConfig.notice_archive_batch_size
+    now = now or timezone.now()
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    archived, batches = 0, 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            notices = list(
+                Notice.objects.select_for_update(skip_locked=skip_locked)
+                .filter(validity_to__lt=now)
+                .order_by("id")[:batch_size]
+            )
+            if not notices:
+                break
+            ids = [notice.id for notice in notices]
+            attachments = list(NoticeAttachment.objects.filter(notice_id__in=ids))
+            NoticeArchive.objects.bulk_create([_archive_copy(notice, NoticeArchive, now) for notice in notices])
+            NoticeAttachmentArchive.objects.bulk_create(
+                [_archive_copy(attachment, NoticeAttachmentArchive, now) for attachment in attachments])
+            # the mutation log entries stay in core, their links follow the notices to the archive
+            mutations = list(NoticeMutation.objects.filter(notice_id__in=ids))
+            NoticeMutationArchive.objects.bulk_create(
+                [_archive_copy(mutation, NoticeMutationArchive, now) for mutation in mutations])
+            NoticeMutation.objects.filter(notice_id__in=ids).delete()
+            NoticeAttachment.objects.filter(notice_id__in=ids).delete()
+            forget_notice_reads(ids)
+            # delivery tracking is not archived; deleted set-based rather than through the cascade
+            NoticeRecipientDelivery.objects.filter(notice_id__in=ids).delete()
+            NoticeDelivery.objects.filter(notice_id__in=ids).delete()
+            NoticeDeliveryStats.objects.filter(notice_id__in=ids).delete()
+            # the archive stream of the sync reports them as deleted everywhere
+            NoticeScopeChange.objects.filter(notice_id__in=ids).delete()
+            NoticeSearchTerm.objects.filter(notice_id__in=ids).delete()
+            # every dependent row is gone: one DELETE without the collector and its per-row
+            # post_delete signals, the events and invalidations being sent once per batch below
+            notices_to_delete = Notice.objects.filter(id__in=ids)
+            notices_to_delete._raw_delete(notices_to_delete.db)
+            visible_notice_cache.invalidate_notices(notices)
+            publish_notice_events(notice_event(EVENT_DELETED, notice) for notice in notices if is_visible(notice))
+        archived += len(notices)
+        batches += 1
+    if archived:
+        logger.info("Archived %s expired notices", archived)
+    return archived
@@ -0,0 +1,101 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from location.models import HealthFacility, Location
+
+from .apps import NoticeConfig
+from .cache import GLOBAL_SCOPE, facility_scope, location_scope, visible_notice_cache
+
+LOCATIONS_GENERATION_KEY = "notice:facility-locations:generation"
+
+
+def _locations_generation():
+    backend = visible_notice_cache.backend
+    generation = backend.get(LOCATIONS_GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        backend.set(LOCATIONS_GENERATION_KEY, generation, None)
+    return generation
+
+
+def invalidate_facility_locations():
+    """
+    Drop every cached facility lookup at once: moving a location changes the ancestors of all
+    the facilities below it.
+    """
+    visible_notice_cache.backend.set(LOCATIONS_GENERATION_KEY, time.time_ns(), None)
+
+
+def location_ancestor_ids(location_id):
+    """
+    Parent, grand-parent... of a location, one query per level.
+    """
+    ancestor_ids = []
+    location_id = Location.objects.filter(id=location_id).values_list("parent_id", flat=True).first()
+    while location_id is not None and location_id not in ancestor_ids:
+        ancestor_ids.append(location_id)
+        location_id = Location.objects.filter(id=location_id).values_list("parent_id", flat=True).first()
+    return ancestor_ids
+
+
+def facility_location_ids(health_facility_id):
+    """
+    Location of a health facility (its district) and the ancestors of that location, computed
+    once per facility and cached until a location or facility changes.
+    """
+    backend = visible_notice_cache.backend
+    key = f"notice:facility-locations:{_locations_generation()}:{health_facility_id}"
+    location_ids = backend.get(key)
+    if location_ids is None:
+        location_id = HealthFacility.objects.filter(id=health_facility_id).values_list("location_id", flat=True).first()
+        location_ids = [location_id] + location_ancestor_ids(location_id) if location_id else []
+        backend.set(key, location_ids, NoticeConfig.notice_facility_locations_timeout)
+    return location_ids
+
+
+def facility_scopes(health_facility_id):
+    """
+    Visibility scopes of the users of a facility: national notices, the facility's own and
+    those targeting its district or region.
+    """
+    return [GLOBAL_SCOPE, facility_scope(health_facility_id)] + \
+        [location_scope(location_id) for location_id in facility_location_ids(health_facility_id)]
+
+
+def audience_filter(health_facility_id):
+    """
+    Notices (or archived notices) visible at a facility, as a single IN on the cached
+    facility locations instead of a join through the location hierarchy.
+    """
+    return Q(health_facility__isnull=True, audience_location__isnull=True) \
+        | Q(health_facility_id=health_facility_id) \
+        | Q(audience_location_id__in=facility_location_ids(health_facility_id))
+
+
+def location_descendant_ids(location_id):
+    """
+    A location and every location below it, one query per level.
+    """
+    location_ids, level = [location_id], [location_id]
+    while level:
+        level = list(Location.objects.filter(parent_id__in=level, validity_to__isnull=True)
+                     .values_list("id", flat=True))
+        location_ids.extend(level)
+    return location_ids
+
+
+def get_audience_location(location_id):
+    """
+    Region or district a notice can target.
+
+    Raises:
+        ValidationError: If the location does not exist or is neither a region nor a district.
+    """
+    from .models import Notice
+    location = Location.objects.filter(id=location_id, validity_to__isnull=True).first()
+    if location is None:
+        raise ValidationError(f"Location not found: {location_id}")
+    if location.type not in Notice.LOCATION_AUDIENCES:
+        raise ValidationError(f"Notices can only target a region or a district: {location_id}")
+    return location
@@ -0,0 +1,208 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .apps import NoticeConfig
+from .models import NoticeAttachment, NoticeAttachmentArchive, NoticeAttachmentUpload, NoticeBlob
+from .previews import preview_key
+from .storage import StoredBlob, decode_base64_document, get_attachment_storage, is_compressed, should_compress
+
+logger = logging.getLogger(__name__)
+
+
+def register_blob(blob: StoredBlob):
+    """
+    Record a stored blob, once per content hash. References are counted separately, when
+    attachment rows start or stop pointing to it.
+    """
+    # touching a known blob keeps it from being collected while it is being referenced again
+    if NoticeBlob.objects.filter(content_hash=blob.content_hash).update(updated_at=timezone.now()):
+        return
+    NoticeBlob.objects.get_or_create(content_hash=blob.content_hash, defaults={
+        "storage_key": blob.storage_key,
+        "size": blob.size,
+        "stored_size": blob.stored_size,
+        "compression": NoticeBlob.COMPRESSION_GZIP if is_compressed(blob.storage_key) else NoticeBlob.COMPRESSION_NONE,
+    })
+
+
+def _store_blob(save) -> StoredBlob:
+    storage = get_attachment_storage()
+    blob = save(storage)
+    register_blob(blob)
+    # the collector may have deleted the same content between the save and the registration
+    if not storage.exists(blob.storage_key):
+        logger.warning("Blob %s collected while being stored, storing it again", blob.content_hash)
+        blob = save(storage)
+    return blob
+
+
+def store_blob_file(fileobj, mime=None) -> StoredBlob:
+    """
+    Store a seekable file in the blob store (compressed when its MIME type is compressible)
+    and record it.
+    """
+    def save(storage):
+        fileobj.seek(0)
+        return storage.save(fileobj, compress=should_compress(mime))
+    return _store_blob(save)
+
+
+def store_blob_bytes(data: bytes, mime=None) -> StoredBlob:
+    return _store_blob(lambda storage: storage.save_bytes(data, compress=should_compress(mime)))
+
+
+def store_blob_base64(document: str, mime=None) -> StoredBlob:
+    return store_blob_bytes(decode_base64_document(document), mime)
+
+
+def _update_references(content_hashes, sign):
+    """
+    Add (sign=1) or remove (sign=-1) one reference per occurrence of each hash, with one
+    UPDATE per distinct number of occurrences.
+    """
+    by_count = {}
+    for content_hash, count in Counter(content_hash for content_hash in content_hashes if content_hash).items():
+        by_count.setdefault(count, []).append(content_hash)
+    now = timezone.now()
+    for count, hashes in by_count.items():
+        NoticeBlob.objects.filter(content_hash__in=hashes) \
+            .update(ref_count=F("ref_count") + sign * count, updated_at=now)
+
+
+def add_blob_references(content_hashes):
+    _update_references(content_hashes, 1)
+
+
+def release_blob_references(content_hashes):
+    _update_references(content_hashes, -1)
+
+
+def delete_unreferenced_blobs(grace_seconds=None, batch_size=500):
+    """
+    Remove the blobs without references for more than `grace_seconds` from the blob table,
+    and from the store with their preview once committed (unless the content was stored again
+    meanwhile). Finalized uploads count as references until they expire.
+    Returns (number of blobs, bytes freed).
+    """
+    grace_seconds = NoticeConfig.notice_blob_gc_grace_seconds if grace_seconds is None else grace_seconds
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    storage = get_attachment_storage()
+    deleted, freed = 0, 0
+    while True:
+        with transaction.atomic():
+            blobs = list(NoticeBlob.objects.select_for_update()
+                         .filter(ref_count__lte=0, updated_at__lt=cutoff)
+                         .order_by("updated_at")[:batch_size])
+            if not blobs:
+                return deleted, freed
+            # a reference may have been added without the counter (rows written before tracking)
+            content_hashes = [blob.content_hash for blob in blobs]
+            referenced = set()
+            for queryset in _references():
+                referenced.update(queryset.filter(content_hash__in=content_hashes)
+                                  .values_list("content_hash", flat=True))
+            for blob in blobs:
+                if blob.content_hash in referenced:
+                    NoticeBlob.objects.filter(id=blob.id).update(ref_count=recount_references(blob.content_hash))
+                    continue
+                blob.delete()
+                transaction.on_commit(lambda blob=blob: _delete_blob_content(storage, blob))
+                deleted += 1
+                freed += blob.stored_size
+        logger.info("Deleted %s unreferenced notice blobs", deleted)
+
+
+def _delete_blob_content(storage, blob):
+    # stored again since the blob row was deleted: the new row owns the content
+    if NoticeBlob.objects.filter(content_hash=blob.content_hash).exists():
+        return
+    for key in {blob.storage_key, preview_key(blob.content_hash), blob.preview_key} - {None}:
+        storage.delete(key)
+
+
+def _references():
+    return (NoticeAttachment.objects.all(), NoticeAttachmentArchive.objects.all(),
+            NoticeAttachmentUpload.objects.filter(status=NoticeAttachmentUpload.STATUS_COMPLETED))
+
+
+def recount_references(content_hash) -> int:
+    """
+    Attachments, archived attachments and finalized uploads pointing to a content.
+    """
+    return sum(queryset.filter(content_hash=content_hash).count() for queryset in _references())
+
+
+def compress_stored_blobs(batch_size=100):
+    """
+    Rewrite the uncompressed blobs referenced by attachments of a compressible MIME type,
+    keeping them only when compression is worth it, and point their references to the
+    compressed blob. Returns (number of blobs compressed, bytes saved).
+    """
+    storage = get_attachment_storage()
+    compressed, saved, last_id = 0, 0, 0
+    while True:
+        blobs = list(NoticeBlob.objects.filter(compression=NoticeBlob.COMPRESSION_NONE, id__gt=last_id)
+                     .order_by("id")[:batch_size])
+        if not blobs:
+            return compressed, saved
+        last_id = blobs[-1].id
+        mimes = dict(NoticeAttachment.objects.filter(content_hash__in=[blob.content_hash for blob in blobs])
+                     .exclude(mime__isnull=True).values_list("content_hash", "mime"))
+        for blob in blobs:
+            if not should_compress(mimes.get(blob.content_hash)):
+                continue
+            stored = storage.recompress(blob.storage_key, blob.content_hash, blob.size)
+            if stored is None:
+                continue
+            with transaction.atomic():
+                for model in (NoticeAttachment, NoticeAttachmentArchive):
+                    model.objects.filter(content_hash=blob.content_hash).update(storage_key=stored.storage_key)
+                NoticeBlob.objects.filter(id=blob.id).update(
+                    storage_key=stored.storage_key, stored_size=stored.stored_size,
+                    compression=NoticeBlob.COMPRESSION_GZIP)
+                transaction.on_commit(lambda key=blob.storage_key: storage.delete(key))
+            compressed += 1
+            saved += blob.stored_size - stored.stored_size
+
+
+def storage_report():
+    """
+    Attachment storage figures: the bytes attachments represent, what deduplication and
+    compression bring that down to, and what the former inline base64 documents would take.
+    """
+    references = {"attachments": 0, "content_bytes": 0}
+    for model in (NoticeAttachment, NoticeAttachmentArchive):
+        totals = model.objects.filter(content_hash__isnull=False).aggregate(count=Count("id"), size=Sum("size"))
+        references["attachments"] += totals["count"] or 0
+        references["content_bytes"] += totals["size"] or 0
+    blobs = NoticeBlob.objects.aggregate(count=Count("id"), size=Sum("size"), stored=Sum("stored_size"))
+    compressed = NoticeBlob.objects.filter(compression=NoticeBlob.COMPRESSION_GZIP) \
+        .aggregate(count=Count("id"), size=Sum("size"), stored=Sum("stored_size"))
+    unreferenced = NoticeBlob.objects.filter(ref_count__lte=0).aggregate(count=Count("id"), stored=Sum("stored_size"))
+    unique_bytes, stored_bytes = blobs["size"] or 0, blobs["stored"] or 0
+    content_bytes = references["content_bytes"]
+    base64_bytes = (content_bytes + 2) // 3 * 4
+
+    def ratio(saved, total):
+        return round(saved / total, 4) if total else 0.0
+
+    return {
+        "attachments": references["attachments"],
+        "blobs": blobs["count"] or 0,
+        "compressed_blobs": compressed["count"] or 0,
+        "unreferenced_blobs": unreferenced["count"] or 0,
+        "content_bytes": content_bytes,
+        "inline_base64_bytes": base64_bytes,
+        "unique_content_bytes": unique_bytes,
+        "stored_bytes": stored_bytes,
+        "unreferenced_stored_bytes": unreferenced["stored"] or 0,
+        "deduplication_saved_bytes": content_bytes - unique_bytes,
+        "compression_saved_bytes": unique_bytes - stored_bytes,
+        "saved_ratio": ratio(content_bytes - stored_bytes, content_bytes),
+        "saved_vs_base64_ratio": ratio(base64_bytes - stored_bytes, base64_bytes),
+    }
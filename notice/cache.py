@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import InvalidCacheBackendError, caches
+from django.db import transaction
+
+from .apps import NoticeConfig
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+# every notice, whatever its facility: what users without health facility see
+ALL_SCOPE = "all"
+
+
+def facility_scope(health_facility_id) -> str:
+    """
+    Scope of the notices of a health facility (the global scope without facility).
+    """
+    return f"hf:{health_facility_id}" if health_facility_id else GLOBAL_SCOPE
+
+
+def location_scope(location_id) -> str:
+    return f"loc:{location_id}"
+
+
+def notice_scope(health_facility_id, audience_location_id=None) -> str:
+    """
+    Visibility scope of a notice: its health facility, its region or district, or every facility.
+    """
+    if health_facility_id:
+        return facility_scope(health_facility_id)
+    if audience_location_id:
+        return location_scope(audience_location_id)
+    return GLOBAL_SCOPE
+
+
+class LRUCache:
+    """
+    Minimal thread-safe in-memory LRU with expiry, used when the configured Django
+    cache alias is not available.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.evictions += 1
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout if timeout else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class VisibleNoticeCache:
+    """
+    Cache of the small values derived from notice visibility: the published notice count per
+    scope (one health facility, one region or district, or all facilities) and, through
+    notice.audience, the locations of each facility. Visibility itself stays an indexed filter
+    on the notice table. Users of a facility see the union of the global scope, their facility
+    scope and the scopes of its locations, so a notice change only ever invalidates its own scope.
+
+    The hit, miss and invalidation counters are per process (exact across threads, not across
+    processes): they describe the cache use of the process exposing them.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._fallback = None
+        self._stats_lock = threading.Lock()
+
+    def _count(self, counter, amount=1):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    @property
+    def backend(self):
+        try:
+            return caches[NoticeConfig.notice_visible_cache_alias]
+        except InvalidCacheBackendError:
+            if self._fallback is None:
+                logger.warning("Cache alias %s not configured, using an in-memory LRU for visible notices",
+                               NoticeConfig.notice_visible_cache_alias)
+                self._fallback = LRUCache(NoticeConfig.notice_visible_cache_max_entries)
+            return self._fallback
+
+    @staticmethod
+    def _count_key(scope):
+        return f"notice:published-count:{scope}"
+
+    @staticmethod
+    def scope_notices(scope):
+        from .models import Notice
+        if scope == ALL_SCOPE:
+            return Notice.objects.all()
+        if scope == GLOBAL_SCOPE:
+            return Notice.objects.filter(health_facility__isnull=True, audience_location__isnull=True)
+        kind, target_id = scope.split(":", 1)
+        if kind == "loc":
+            return Notice.objects.filter(audience_location_id=int(target_id))
+        return Notice.objects.filter(health_facility_id=int(target_id))
+
+    def _cached(self, key, compute):
+        cached = self.backend.get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+        self._count("misses")
+        value = compute()
+        self.backend.set(key, value, NoticeConfig.notice_visible_cache_timeout)
+        return value
+
+    def scope_published_count(self, scope):
+        """
+        Number of published, active notices of a scope: the unread count of a user who read none.
+        """
+        def _count():
+            return self.scope_notices(scope).filter(published_at__isnull=False, is_active=True).count()
+        if not NoticeConfig.notice_visible_cache_enabled:
+            return _count()
+        return self._cached(self._count_key(scope), _count)
+
+    def invalidate(self, scopes):
+        """
+        Drop the given scopes once the current transaction commits, so that concurrent
+        requests cannot cache the state from before the change.
+        """
+        scopes = set(scopes)
+        if not scopes:
+            return
+        keys = [self._count_key(scope) for scope in scopes | {ALL_SCOPE}]
+
+        def _delete():
+            self.backend.delete_many(keys)
+            self._count("invalidations", len(scopes))
+        transaction.on_commit(_delete)
+
+    def invalidate_notices(self, notices):
+        self.invalidate(notice_scope(notice.health_facility_id, notice.audience_location_id) for notice in notices)
+
+    @property
+    def evictions(self):
+        return self._fallback.evictions if self._fallback is not None else 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+visible_notice_cache = VisibleNoticeCache()
@@ -0,0 +1,226 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from . import services
+from .apps import NoticeConfig
+from .models import Notice, NoticeDelivery, NoticeDeliveryStats, NoticeRecipientDelivery
+from .recipients import iter_notice_recipients
+from .sms import SMSMessage, get_sms_backend, idempotency_key
+
+logger = logging.getLogger(__name__)
+
+
+def enabled_channels(channels=None):
+    """
+    Requested channels (all by default) minus the ones disabled by notice_email_enabled / notice_sms_enabled.
+    """
+    channels = channels or [NoticeDelivery.CHANNEL_EMAIL, NoticeDelivery.CHANNEL_SMS]
+    return [
+        channel for channel in channels
+        if (channel == NoticeDelivery.CHANNEL_EMAIL and NoticeConfig.notice_email_enabled)
+        or (channel == NoticeDelivery.CHANNEL_SMS and NoticeConfig.notice_sms_enabled)
+    ]
+
+
+def enqueue_notice_deliveries(notice_ids, channels):
+    """
+    Write the first outbox row of a new delivery run of each notice and channel. Must be called
+    in the transaction publishing (or re-sending) the notices: deliveries then exist if and only
+    if it is committed. Rows of earlier runs are left as they are.
+    """
+    notice_ids, channels = list(notice_ids), enabled_channels(channels)
+    last_runs = {
+        (notice_id, channel): run
+        for notice_id, channel, run in NoticeDelivery.objects
+        .filter(notice_id__in=notice_ids, channel__in=channels)
+        .values("notice_id", "channel").annotate(run=Max("run")).values_list("notice_id", "channel", "run")
+    } if notice_ids and channels else {}
+    NoticeDelivery.objects.bulk_create([
+        NoticeDelivery(notice_id=notice_id, channel=channel, run=last_runs.get((notice_id, channel), -1) + 1)
+        for notice_id in notice_ids
+        for channel in channels
+    ])
+    NoticeDeliveryStats.objects.bulk_create(
+        [NoticeDeliveryStats(notice_id=notice_id) for notice_id in notice_ids], ignore_conflicts=True)
+
+
+def relay_notice_deliveries(batch_size=None, now=None) -> int:
+    """
+    Hand pending outbox rows to Celery, in one transaction per batch. Rows are locked with
+    SKIP LOCKED so relays can run in parallel. A row whose message was lost (dispatched longer
+    than notice_delivery_stale_seconds ago and never completed) is dispatched again: deliveries
+    are at least once. Rows whose last attempt failed wait for their next_attempt_at.
+    Returns the number of dispatched rows.
+    """
+    from .tasks import deliver_notice_batch
+    batch_size = batch_size or NoticeConfig.notice_delivery_relay_batch_size
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=NoticeConfig.notice_delivery_stale_seconds)
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    dispatched = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                NoticeDelivery.objects.select_for_update(skip_locked=skip_locked)
+                .filter(Q(status=NoticeDelivery.STATUS_PENDING)
+                        & (Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+                        | Q(status=NoticeDelivery.STATUS_DISPATCHED, dispatched_at__lt=stale))
+                .order_by("created_at", "id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            NoticeDelivery.objects.filter(id__in=ids).update(
+                status=NoticeDelivery.STATUS_DISPATCHED, dispatched_at=now, attempts=F("attempts") + 1)
+            # published before commit: if the broker is down the batch rolls back and stays pending
+            for delivery_id in ids:
+                deliver_notice_batch.delay(delivery_id)
+        dispatched += len(ids)
+        if len(ids) < batch_size:
+            break
+    return dispatched
+
+
+def retry_delay(attempts) -> timedelta:
+    """
+    Exponential backoff before the next attempt of an outbox row that failed `attempts` times.
+    """
+    seconds = NoticeConfig.notice_delivery_retry_backoff * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, NoticeConfig.notice_delivery_retry_max_backoff))
+
+
+def _increment_stats(notice_id, deltas):
+    """
+    Apply counter deltas ({"email_sent": 3, "email_pending": -3, ...}) to the stats row of a notice.
+    """
+    deltas = {counter: F(counter) + delta for counter, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if not NoticeDeliveryStats.objects.filter(notice_id=notice_id).update(**deltas):
+        # notice published before delivery stats existed
+        NoticeDeliveryStats.objects.get_or_create(notice_id=notice_id)
+        NoticeDeliveryStats.objects.filter(notice_id=notice_id).update(**deltas)
+
+
+def _track_recipients(delivery, recipients):
+    """
+    Record the recipients of a batch (in bulk, on its first attempt) and return the rows still
+    to be sent: a retried batch skips the recipients it already reached.
+    """
+    known = set(delivery.recipients.values_list("recipient_source", "recipient_id"))
+    address_field = "email" if delivery.channel == NoticeDelivery.CHANNEL_EMAIL else "phone"
+    new = [
+        NoticeRecipientDelivery(
+            delivery=delivery, notice_id=delivery.notice_id, channel=delivery.channel,
+            recipient_source=recipient.key[0], recipient_id=recipient.key[1],
+            address=getattr(recipient, address_field))
+        for recipient in recipients if recipient.key not in known
+    ]
+    if new:
+        NoticeRecipientDelivery.objects.bulk_create(new)
+        _increment_stats(delivery.notice_id, {
+            NoticeDeliveryStats.counter(delivery.channel, NoticeRecipientDelivery.STATUS_PENDING): len(new)})
+    return list(delivery.recipients.exclude(status=NoticeRecipientDelivery.STATUS_SENT))
+
+
+def _record_results(delivery, rows, sent, failed):
+    """
+    Bulk update the status of the recipient rows of a batch from the addresses sent and the
+    (address, error) pairs that failed, and move the stats counters accordingly.
+    """
+    sent, errors = set(sent), dict(failed)
+    now = timezone.now()
+    changed, deltas = [], Counter()
+    for row in rows:
+        if row.address in errors:
+            status, error = NoticeRecipientDelivery.STATUS_FAILED, errors[row.address]
+        elif row.address in sent:
+            status, error = NoticeRecipientDelivery.STATUS_SENT, None
+        else:
+            continue
+        deltas[NoticeDeliveryStats.counter(delivery.channel, row.status)] -= 1
+        deltas[NoticeDeliveryStats.counter(delivery.channel, status)] += 1
+        row.status, row.error, row.updated_at = status, error, now
+        changed.append(row)
+    with transaction.atomic():
+        NoticeRecipientDelivery.objects.bulk_update(changed, ["status", "error", "updated_at"], batch_size=1000)
+        _increment_stats(delivery.notice_id, deltas)
+
+
+def _send_email_batch(notice, addresses, run):
+    rendered = services.render_notice_email(notice.title, notice.description, notice.priority)
+    result = services.NoticeEmailDispatcher().send(addresses, rendered)
+    return result.sent, result.failed
+
+
+def _send_sms_batch(notice, addresses, run):
+    results = get_sms_backend().send_messages([
+        SMSMessage(phone, notice.description, idempotency_key(notice.uuid, phone, run))
+        for phone in addresses
+    ])
+    return [result.to for result in results if result.success], \
+        [(result.to, result.error) for result in results if not result.success]
+
+
+CHANNEL_SENDERS = {
+    NoticeDelivery.CHANNEL_EMAIL: (_send_email_batch, lambda: NoticeConfig.notice_email_batch_size),
+    NoticeDelivery.CHANNEL_SMS: (_send_sms_batch, lambda: NoticeConfig.notice_sms_batch_size),
+}
+
+
+def deliver_notice_batch(delivery_id):
+    """
+    Send one recipient batch of an outbox row. The row following it (next batch of the same
+    notice and channel) and the recipient rows are written before sending, so the chain
+    survives a crash mid-batch and a retry only sends to the recipients not reached yet.
+    """
+    with transaction.atomic():
+        delivery = NoticeDelivery.objects.select_for_update().filter(id=delivery_id).first()
+        if delivery is None or delivery.status in (NoticeDelivery.STATUS_SENT, NoticeDelivery.STATUS_FAILED):
+            return
+        notice = Notice.objects.select_related("health_facility__location").get(id=delivery.notice_id)
+        send, batch_size = CHANNEL_SENDERS[delivery.channel]
+        batch_size = batch_size()
+        recipients = list(islice(
+            iter_notice_recipients(notice, channel=delivery.channel, after=delivery.recipient_cursor),
+            batch_size + 1))
+        if len(recipients) > batch_size:
+            recipients = recipients[:batch_size]
+            # a retried batch finds the row it already chained, in its own run only
+            NoticeDelivery.objects.get_or_create(
+                notice_id=delivery.notice_id, channel=delivery.channel, run=delivery.run,
+                batch_index=delivery.batch_index + 1,
+                defaults={
+                    "recipient_cursor_source": recipients[-1].key[0],
+                    "recipient_cursor_id": recipients[-1].key[1],
+                })
+        rows = _track_recipients(delivery, recipients)
+    # one message per address, even when several recipients share it
+    addresses = list(dict.fromkeys(row.address for row in rows))
+    try:
+        sent, failed = send(notice, addresses, delivery.run) if addresses else ([], [])
+    except Exception as exc:
+        logger.exception("Delivery %s of notice %s failed", delivery_id, delivery.notice_id)
+        next_attempt_at = None
+        if delivery.attempts >= NoticeConfig.notice_delivery_max_attempts:
+            _record_results(delivery, rows, [], [(address, str(exc)) for address in addresses])
+            status = NoticeDelivery.STATUS_FAILED
+        else:
+            status = NoticeDelivery.STATUS_PENDING
+            next_attempt_at = timezone.now() + retry_delay(delivery.attempts)
+        NoticeDelivery.objects.filter(id=delivery_id).update(
+            status=status, last_error=str(exc), next_attempt_at=next_attempt_at)
+        return
+    _record_results(delivery, rows, sent, failed)
+    NoticeDelivery.objects.filter(id=delivery_id).update(
+        status=NoticeDelivery.STATUS_SENT,
+        recipient_count=len(recipients),
+        last_error=failed[0][1] if failed else None,
+        completed_at=timezone.now(),
+    )
@@ -0,0 +1,215 @@
+import json
+import logging
+import queue
+import threading
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .apps import NoticeConfig
+from .cache import ALL_SCOPE, notice_scope
+
+logger = logging.getLogger(__name__)
+
+EVENT_PUBLISHED = "published"
+EVENT_UPDATED = "updated"
+EVENT_DELETED = "deleted"
+
+# Lightweight change notification: clients fetch the notice itself (or the changes since
+# their last sync) when they receive one. `scope` is the visibility scope of the notice.
+NoticeEvent = namedtuple("NoticeEvent", ["type", "uuid", "scope", "updated_at"])
+
+
+def scope_channel(scope) -> str:
+    return f"notice:events:{scope}"
+
+
+def event_channels(event):
+    """
+    Channels an event is published on: the scope of the notice, and the channel of the
+    users who see every notice.
+    """
+    return [scope_channel(event.scope), scope_channel(ALL_SCOPE)]
+
+
+def encode_event(event) -> str:
+    return json.dumps({
+        "type": event.type,
+        "uuid": str(event.uuid),
+        "scope": event.scope,
+        "updatedAt": event.updated_at.isoformat() if event.updated_at else None,
+    })
+
+
+def notice_event(event_type, notice, scope=None):
+    scope = scope or notice_scope(notice.health_facility_id, notice.audience_location_id)
+    return NoticeEvent(event_type, notice.uuid, scope, notice.updated_at)
+
+
+def is_visible(notice) -> bool:
+    return bool(notice.is_active and notice.published_at)
+
+
+def notice_change_events(notice, was_visible, previous_scope):
+    """
+    Events of a saved notice, given whether it was visible before and its previous scope.
+    """
+    visible = is_visible(notice)
+    scope = notice_scope(notice.health_facility_id, notice.audience_location_id)
+    if visible and was_visible and previous_scope != scope:
+        # moved: gone from the previous scope, new in the current one
+        return [notice_event(EVENT_DELETED, notice, previous_scope), notice_event(EVENT_PUBLISHED, notice, scope)]
+    if visible:
+        return [notice_event(EVENT_UPDATED if was_visible else EVENT_PUBLISHED, notice, scope)]
+    if was_visible:
+        return [notice_event(EVENT_DELETED, notice, previous_scope)]
+    return []
+
+
+class BaseNoticeBroker:
+    """
+    Pub/sub used to fan notice events out to the open event streams.
+    """
+    # only reaches the subscribers of the publishing process
+    process_local = False
+
+    def publish(self, channel, message):
+        raise NotImplementedError()
+
+    def subscribe(self, channels):
+        """
+        Subscription to `channels`, with `get(timeout)` returning the next message (or None
+        on timeout) and `close()`.
+        """
+        raise NotImplementedError()
+
+
+class _QueueSubscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.queue = queue.Queue(maxsize=broker.max_queue_size)
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class InProcessNoticeBroker(BaseNoticeBroker):
+    """
+    Broker delivering to the subscribers of the current process only: for tests, development
+    and single-process deployments. A subscriber not keeping up loses the oldest messages.
+    Events published by Celery workers or other server processes never reach its streams.
+    """
+    process_local = True
+
+    def __init__(self, max_queue_size=1000, **kwargs):
+        self.max_queue_size = max_queue_size
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            while True:
+                try:
+                    subscription.queue.put_nowait(message)
+                    break
+                except queue.Full:
+                    try:
+                        subscription.queue.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def subscribe(self, channels):
+        subscription = _QueueSubscription(self, list(channels))
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions.get(channel, set()).discard(subscription)
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    def get(self, timeout=None):
+        message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout or 0)
+        if message is None:
+            return None
+        data = message["data"]
+        return data.decode() if isinstance(data, bytes) else data
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisNoticeBroker(BaseNoticeBroker):
+    """
+    Redis pub/sub broker, fanning events out across processes and hosts.
+    Requires the `redis` package.
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", **kwargs):
+        import redis
+        self.client = redis.Redis.from_url(url, **kwargs)
+
+    def publish(self, channel, message):
+        self.client.publish(channel, message)
+
+    def subscribe(self, channels):
+        pubsub = self.client.pubsub()
+        pubsub.subscribe(*channels)
+        return _RedisSubscription(pubsub)
+
+
+@lru_cache(maxsize=None)
+def get_notice_broker() -> BaseNoticeBroker:
+    """
+    Broker configured by `notice_events_broker` / `notice_events_broker_options`. A process
+    local broker is refused unless DEBUG or `notice_events_single_process` is set, as it would
+    silently drop the events of every other process.
+    """
+    broker_class = import_string(NoticeConfig.notice_events_broker)
+    if broker_class.process_local and not (settings.DEBUG or NoticeConfig.notice_events_single_process):
+        raise ImproperlyConfigured(
+            f"{NoticeConfig.notice_events_broker} only reaches the event streams of its own process: use "
+            "notice.events.RedisNoticeBroker, or set notice_events_single_process for a single-process deployment")
+    return broker_class(**(NoticeConfig.notice_events_broker_options or {}))
+
+
+def publish_notice_events(events):
+    """
+    Publish notice events once the current transaction commits, so that a client fetching the
+    notice on receipt sees the change. Failures are logged: events are best effort, clients
+    resynchronise on reconnection.
+    """
+    events = list(events)
+    if not events or not NoticeConfig.notice_events_enabled:
+        return
+
+    def _publish():
+        try:
+            broker = get_notice_broker()
+            for event in events:
+                message = encode_event(event)
+                for channel in event_channels(event):
+                    broker.publish(channel, message)
+        except Exception:
+            logger.exception("Failed to publish %s notice events", len(events))
+    transaction.on_commit(_publish)
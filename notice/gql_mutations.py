@@ -1,32 +1,39 @@
 import logging
 import graphene
-from .models import Notice, NoticeAttachment
+from .models import Notice, NoticeAttachment, NoticeDelivery
 from core.schema import  OpenIMISMutation
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.utils.translation import gettext as _
-from location.models import HealthFacility
-from django.core.mail import send_mail
-import requests
-import os
+from django.db import transaction
+from location.models import HealthFacility, Location
 import base64
 from graphene import String, Int, Boolean, Date, List, InputObjectType
-from celery import shared_task
+from .apps import NoticeConfig
+from .delivery import enqueue_notice_deliveries
+from .uploads import get_completed_upload
+from .audience import get_audience_location
+from .blobs import add_blob_references, release_blob_references
+from .cache import notice_scope, visible_notice_cache
+from .reads import forget_notice_reads, mark_notices_read
+from .search import update_attachment_search
+from .sync import record_scope_changes
+from .previews import preview_status_for, schedule_attachment_previews
+from .instrumentation import instrumented_mutation
+from .events import EVENT_DELETED, EVENT_PUBLISHED, NoticeEvent, is_visible, notice_change_events, \
+    notice_event, publish_notice_events
 logger = logging.getLogger(__name__)
 
+BULK_CHUNK_SIZE = 1000  # Keeps IN (...) lists below the parameter limits of all supported databases
+
+
+def chunked(values, size=BULK_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
 
 
 
-@shared_task
-def send_notice_email(notice_id):
-    notice = Notice.objects.get(id=notice_id)
-    send_mail(
-        subject=f"Notice: {notice.title}",
-        message=notice.description,
-        from_email="no-reply@openimis.org",
-        recipient_list=["test.openimis.org"],
-        fail_silently=True,
-    )
 class NoticeAttachmentInput(InputObjectType):
     general_type = String(required=False)
     type = String(required=False)
@@ -36,6 +43,36 @@ class NoticeAttachmentInput(InputObjectType):
     mime = String(required=False)
     url = String(required=False)
     document = String(required=False)
+    upload_uuid = graphene.UUID(required=False)
+
+
+def set_attachment_content(attachment, user, data):
+    """
+    Attachment content either references a finalized chunked upload or is given inline as base64.
+    """
+    if data.get("upload_uuid"):
+        attachment.attach_upload(get_completed_upload(data["upload_uuid"], user))
+    else:
+        attachment.store_document(data.get("document"))
+
+
+def build_notice_attachment(notice, user, attachment_data):
+    """
+    Unsaved attachment of a notice, with its content already written to the blob store.
+    """
+    from datetime import datetime
+    attachment = NoticeAttachment(
+        notice=notice,
+        general_type=attachment_data.get("general_type", "test"),
+        type=attachment_data.get("type"),
+        title=attachment_data.get("title"),
+        date=attachment_data.get("date", datetime.now().date()),
+        filename=attachment_data.get("filename"),
+        mime=attachment_data.get("mime"),
+        url=attachment_data.get("url"),
+    )
+    set_attachment_content(attachment, user, attachment_data)
+    return attachment
 
 class CreateNoticeMutation(OpenIMISMutation):
     _mutation_module = "notice"
@@ -48,49 +85,52 @@ class CreateNoticeMutation(OpenIMISMutation):
         description = String(required=True)
         priority = String(required=True)
         health_facility_id = Int(required=False, source='healthFacilityId')  # Map healthFacilityId to health_facility_id
+        audience_location_id = Int(required=False)  # region or district, instead of a health facility
         schedule_publish = Boolean(required=False)
         publish_start_date = Date(required=False)
         attachments = List(NoticeAttachmentInput, required=False)
 
     @classmethod
+    @instrumented_mutation
     def async_mutate(cls, user, **data):
         try:
             if isinstance(user, AnonymousUser) or not user.id:
                 raise ValidationError("Authentication required")
             if not user.has_perms(["notice.add_notice"]):
                 raise PermissionDenied("Unauthorized")
+            if data.get('health_facility_id') and data.get('audience_location_id'):
+                raise ValidationError("A notice targets either a health facility or a location")
             health_facility = None
             if data.get('health_facility_id'):
                 health_facility = HealthFacility.objects.get(id=data.get("health_facility_id"))
+            audience_location = None
+            if data.get('audience_location_id'):
+                audience_location = get_audience_location(data["audience_location_id"])
             notice = Notice(
                 title=data["title"],
                 description=data["description"],
                 priority=data["priority"],
                 health_facility=health_facility if health_facility else None,
+                audience_location=audience_location,
                 schedule_publish=data.get("schedule_publish", False),
                 publish_start_date=data.get("publish_start_date"),
             )
-            notice.save()
-            attachments_data = data.get("attachments", [])
-            from datetime import datetime
-            for attachment_data in attachments_data:
-                if not user.has_perms(["notice.add_notice_attachment"]):
-                    raise PermissionDenied("Unauthorized to add attachments")
-                document = attachment_data.get("document")
-                attachment = NoticeAttachment(
-                    notice=notice,
-                    general_type=attachment_data.get("general_type", "test"),
-                    type=attachment_data.get("type"),
-                    title=attachment_data.get("title"),
-                    date=attachment_data.get("date", datetime.now().date()),
-                    filename=attachment_data.get("filename"),
-                    mime=attachment_data.get("mime"),
-                    url=attachment_data.get("url"),
-                    document=document,
-                )
-                attachment.save()
-            #if health_facility and health_facility.email:
-            send_notice_email.delay(notice.id)                
+            # scheduled notices are published (and delivered) later by the publishing scheduler
+            published = notice.publish_if_due()
+            attachments_data = data.get("attachments") or []
+            if attachments_data and not user.has_perms(["notice.add_notice_attachment"]):
+                raise PermissionDenied("Unauthorized to add attachments")
+            # contents are stored before the transaction: if it rolls back, their blobs are left
+            # unreferenced and collected by delete_unreferenced_blobs
+            attachments = [build_notice_attachment(notice, user, attachment_data)
+                           for attachment_data in attachments_data]
+            with transaction.atomic():
+                notice.save()
+                for attachment in attachments:
+                    attachment.notice = notice
+                    attachment.save()
+                if published:
+                    enqueue_notice_deliveries([notice.id], NoticeConfig.notice_delivery_publish_channels)
         except Exception as exc:
             return [{
                 "message": "Failed to create notice or attachments",
@@ -107,8 +147,10 @@ class UpdateNoticeMutation(OpenIMISMutation):
         description = graphene.String()
         priority = graphene.String()
         health_facility_id = graphene.Int()
+        audience_location_id = graphene.Int()
 
     @classmethod
+    @instrumented_mutation
     def async_mutate(cls, user, **data):
         try:
             if isinstance(user, AnonymousUser) or not user.id:
@@ -123,8 +165,15 @@ class UpdateNoticeMutation(OpenIMISMutation):
                 notice.description = data["description"]
             if "priority" in data:
                 notice.priority = data["priority"]
+            if data.get("health_facility_id") and data.get("audience_location_id"):
+                raise ValidationError("A notice targets either a health facility or a location")
+            # setting one target clears the other
             if "health_facility_id" in data:
                 notice.health_facility = HealthFacility.objects.get(id=data["health_facility_id"])
+                notice.audience_location = None
+            if data.get("audience_location_id"):
+                notice.audience_location = get_audience_location(data["audience_location_id"])
+                notice.health_facility = None
             notice.save()
             return None  # Success, no errors
         except Notice.DoesNotExist:
@@ -140,6 +189,7 @@ class DeleteNoticeMutation(OpenIMISMutation):
         uuids = graphene.List(graphene.UUID, required=True)  # Support bulk deletion
 
     @classmethod
+    @instrumented_mutation
     def async_mutate(cls, user, **data):
         try:
             if isinstance(user, AnonymousUser) or not user.id:
@@ -147,15 +197,29 @@ class DeleteNoticeMutation(OpenIMISMutation):
             if not user.has_perms(["notice.delete_notice"]):
                 raise PermissionDenied("Unauthorized")
 
-            errors = []
-            for uuid in data["uuids"]:
-                try:
-                    notice = Notice.objects.get(uuid=uuid, is_active=True)
-                    notice.is_active = False  # Soft delete
-                    notice.save()
-                except Notice.DoesNotExist:
-                    errors.append({"message": "Notice not found", "detail": str(uuid)})
-            
+            # Soft delete with one UPDATE per chunk of uuids instead of a get/save per notice
+            from django.utils import timezone
+            uuids = list(dict.fromkeys(data["uuids"]))
+            deleted, events, scopes = {}, [], set()
+            now = timezone.now()
+            with transaction.atomic():
+                for chunk in chunked(uuids):
+                    notices = Notice.objects.filter(uuid__in=chunk, is_active=True)
+                    for uuid, notice_id, health_facility_id, location_id, published_at in notices.select_for_update() \
+                            .values_list("uuid", "id", "health_facility_id", "audience_location_id", "published_at"):
+                        deleted[uuid] = notice_id
+                        scopes.add(notice_scope(health_facility_id, location_id))
+                        if published_at:
+                            events.append(NoticeEvent(
+                                EVENT_DELETED, uuid, notice_scope(health_facility_id, location_id), now))
+                    notices.update(is_active=False, updated_at=now)
+                # the update sends no post_save, so the cached counts are dropped here
+                visible_notice_cache.invalidate(scopes)
+                forget_notice_reads(deleted.values())
+                publish_notice_events(events)
+
+            errors = [{"message": "Notice not found", "detail": str(uuid)}
+                      for uuid in uuids if uuid not in deleted]
             if errors:
                 return errors
             return None  # Success, no errors
@@ -172,6 +236,7 @@ class ToggleNoticeStatusMutation(OpenIMISMutation):
         is_active = graphene.Boolean(required=True)
 
     @classmethod
+    @instrumented_mutation
     def async_mutate(cls, user, **data):
         try:
             if isinstance(user, AnonymousUser) or not user.id:
@@ -196,6 +261,7 @@ class SendNoticeEmailMutation(OpenIMISMutation):
         uuid = graphene.UUID(required=True)
 
     @classmethod
+    @instrumented_mutation
     def async_mutate(cls, user, **data):
         try:
             if isinstance(user, AnonymousUser) or not user.id:
@@ -203,14 +269,8 @@ class SendNoticeEmailMutation(OpenIMISMutation):
             if not user.has_perms(["notice.send_email"]):  #
                 raise PermissionDenied("Unauthorized")
             notice = Notice.objects.get(uuid=data["uuid"])
-            recipient = notice.health_facility.email
-            send_mail(
-                subject=f"Notice: {notice.title}",
-                message=notice.description,
-                from_email="no-reply@openimis.org",
-                recipient_list=[recipient],
-                fail_silently=False,
-            )
+            # recipients are resolved and emailed in batches by the delivery workers
+            enqueue_notice_deliveries([notice.id], [NoticeDelivery.CHANNEL_EMAIL])
             return None
         except Notice.DoesNotExist:
             return [{"message": "Notice not found", "detail": str(data["uuid"])}]
@@ -225,6 +285,7 @@ class SendNoticeSMSMutation(OpenIMISMutation):
         uuid = graphene.UUID(required=True)
 
     @classmethod
+    @instrumented_mutation
     def async_mutate(cls, user, **data):
         try:
             if isinstance(user, AnonymousUser) or not user.id:
@@ -233,29 +294,8 @@ class SendNoticeSMSMutation(OpenIMISMutation):
                 raise PermissionDenied("Unauthorized")
 
             notice = Notice.objects.get(uuid=data["uuid"])
-            # Custom SMS Gateway configuration
-            sms_gateway_url = os.getenv("SMS_GATEWAY_URL", "https://api.smsgateway.example.com/send")
-            sms_gateway_api_key = os.getenv("SMS_GATEWAY_API_KEY", "your-api-key")
-            recipient_phone = "+1234567890"  # Replace with actual logic, e.g., notice.health_facility.contact_phone
-
-            # Example payload for a custom SMS gateway (adjust based on your provider's API)
-            payload = {
-                "api_key": sms_gateway_api_key,
-                "to": recipient_phone,
-                "message": notice.description,
-                "from": os.getenv("SMS_GATEWAY_SENDER_ID", "OpenIMIS")  # Optional sender ID
-            }
-
-            # Send SMS via HTTP POST request
-            response = requests.post(sms_gateway_url, json=payload, timeout=10)
-            if response.status_code != 200:
-                raise Exception(f"SMS gateway returned status {response.status_code}: {response.text}")
-
-            # Optionally, parse the response to confirm success
-            response_data = response.json()
-            if not response_data.get("success", False):  # Adjust based on your gateway's response format
-                raise Exception(f"SMS gateway error: {response_data.get('error', 'Unknown error')}")
-
+            # delivery runs in the delivery workers, through the pooled SMS backend
+            enqueue_notice_deliveries([notice.id], [NoticeDelivery.CHANNEL_SMS])
             return None
         except Notice.DoesNotExist:
             return [{"message": "Notice not found", "detail": str(data["uuid"])}]
@@ -277,8 +317,10 @@ class CreateNoticeAttachmentMutation(OpenIMISMutation):
         mime = graphene.String()
         url = graphene.String()
         document = graphene.String()
+        upload_uuid = graphene.UUID()
 
     @classmethod
+    @instrumented_mutation
     def async_mutate(cls, user, **data):
         try:
             if isinstance(user, AnonymousUser) or not user.id:
@@ -296,8 +338,8 @@ class CreateNoticeAttachmentMutation(OpenIMISMutation):
                 filename=data.get("filename"),
                 mime=data.get("mime"),
                 url=data.get("url"),
-                document=data.get("document"),
             )
+            set_attachment_content(attachment, user, data)
             attachment.save()
             return None  # Success, no errors
         except Exception as exc:
@@ -321,8 +363,10 @@ class UpdateNoticeAttachmentMutation(OpenIMISMutation):
         mime = graphene.String()
         url = graphene.String()
         document = graphene.String()
+        upload_uuid = graphene.UUID()
 
     @classmethod
+    @instrumented_mutation
     def async_mutate(cls, user, **data):
         try:
             if isinstance(user, AnonymousUser) or not user.id:
@@ -338,7 +382,7 @@ class UpdateNoticeAttachmentMutation(OpenIMISMutation):
             attachment.filename = data.get("filename")
             attachment.mime = data.get("mime")
             attachment.url = data.get("url")
-            attachment.document = data.get("document")
+            set_attachment_content(attachment, user, data)
             attachment.save()
             return None  # Success, no errors
         except Exception as exc:
@@ -355,6 +399,7 @@ class DeleteNoticeAttachmentMutation(OpenIMISMutation):
         id = graphene.String(required=True)
 
     @classmethod
+    @instrumented_mutation
     def async_mutate(cls, user, **data):
         try:
             if isinstance(user, AnonymousUser) or not user.id:
@@ -364,10 +409,12 @@ class DeleteNoticeAttachmentMutation(OpenIMISMutation):
             if "client_mutation_id" in data:
                 data.pop('client_mutation_id')
             if "client_mutation_label" in data:
-                data.pop('client_mutation_label')   
-            import pdb;pdb.set_trace()         
+                data.pop('client_mutation_label')
             attachment = NoticeAttachment.objects.get(id=data["id"])
-            attachment.delete()
+            with transaction.atomic():
+                attachment.delete()
+                release_blob_references([attachment.content_hash])
+            update_attachment_search([attachment.notice_id])
             return None  # Success, no errors
         except Exception as exc:
             return [{
@@ -375,3 +422,278 @@ class DeleteNoticeAttachmentMutation(OpenIMISMutation):
                 "detail": str(exc)
             }]
 
+
+class NoticeBulkInput(InputObjectType):
+    title = String(required=True)
+    description = String(required=True)
+    priority = String(required=True)
+    health_facility_id = Int(required=False)
+    audience_location_id = Int(required=False)
+    schedule_publish = Boolean(required=False)
+    publish_start_date = Date(required=False)
+    attachments = List(NoticeAttachmentInput, required=False)
+
+
+class NoticeBulkUpdateInput(InputObjectType):
+    uuid = graphene.UUID(required=True)
+    title = String()
+    description = String()
+    priority = String()
+    health_facility_id = Int()
+    audience_location_id = Int()
+    attachments = List(NoticeAttachmentInput, required=False)  # New attachments to add
+
+
+def _bulk_audience_locations(items):
+    """
+    Regions and districts targeted by the bulk items, by id, loaded with a single query.
+    """
+    location_ids = {item["audience_location_id"] for item in items if item.get("audience_location_id")}
+    if not location_ids:
+        return {}
+    return Location.objects.filter(
+        id__in=location_ids, validity_to__isnull=True, type__in=Notice.LOCATION_AUDIENCES).in_bulk()
+
+
+def _validate_bulk_notice_items(user, items, locations):
+    """
+    Validate all bulk items up front, returning a list of per-item errors.
+    Facilities are checked with a single query for the whole batch, `locations` are the
+    audience locations loaded by _bulk_audience_locations.
+    """
+    errors = []
+    priorities = {choice for choice, _label in Notice.PRIORITY_CHOICES}
+    facility_ids = {item["health_facility_id"] for item in items if item.get("health_facility_id")}
+    known_facility_ids = set(
+        HealthFacility.objects.filter(id__in=facility_ids).values_list("id", flat=True)) if facility_ids else set()
+    can_add_attachments = user.has_perms(["notice.add_notice_attachment"])
+    for index, item in enumerate(items):
+        if "title" in item and not item["title"]:
+            errors.append({"message": "Notice title is required", "detail": f"notices[{index}]"})
+        if "description" in item and not item["description"]:
+            errors.append({"message": "Notice description is required", "detail": f"notices[{index}]"})
+        if item.get("priority") is not None and item["priority"] not in priorities:
+            errors.append({"message": "Invalid notice priority", "detail": f"notices[{index}]: {item['priority']}"})
+        if item.get("health_facility_id") and item["health_facility_id"] not in known_facility_ids:
+            errors.append({"message": "Health facility not found",
+                           "detail": f"notices[{index}]: {item['health_facility_id']}"})
+        if item.get("audience_location_id") and item["audience_location_id"] not in locations:
+            errors.append({"message": "Audience location not found or neither a region nor a district",
+                           "detail": f"notices[{index}]: {item['audience_location_id']}"})
+        if item.get("health_facility_id") and item.get("audience_location_id"):
+            errors.append({"message": "A notice targets either a health facility or a location",
+                           "detail": f"notices[{index}]"})
+        if item.get("attachments") and not can_add_attachments:
+            errors.append({"message": "Unauthorized to add attachments", "detail": f"notices[{index}]"})
+    return errors
+
+
+def _build_bulk_attachments(user, notices, items):
+    """
+    Write the attachment contents to the blob store and return (attachments, per-item errors).
+    """
+    attachments, errors = [], []
+    for index, (notice, item) in enumerate(zip(notices, items)):
+        for attachment_data in item.get("attachments") or []:
+            try:
+                attachment = build_notice_attachment(notice, user, attachment_data)
+                # bulk_create does not call save(): the previews are scheduled by the mutations
+                attachment.preview_status = preview_status_for(attachment)
+                attachments.append(attachment)
+            except ValidationError as exc:
+                errors.append({"message": "Invalid attachment", "detail": f"notices[{index}]: {'; '.join(exc.messages)}"})
+    return attachments, errors
+
+
+def _ensure_pks(model, instances):
+    """
+    bulk_create only sets primary keys on backends able to return them, reload them by uuid otherwise.
+    """
+    if all(instance.pk for instance in instances):
+        return
+    pks = dict(model.objects.filter(uuid__in=[instance.uuid for instance in instances]).values_list("uuid", "id"))
+    for instance in instances:
+        instance.pk = pks[instance.uuid]
+
+
+class CreateNoticesBulkMutation(OpenIMISMutation):
+    """
+    Create many notices (and their attachments) at once: all items are validated first and
+    the rows are written with bulk_create in a single transaction, nothing is created if any item fails.
+    """
+    _mutation_module = "notice"
+    _mutation_class = "CreateNoticesBulkMutation"
+
+    class Input(OpenIMISMutation.Input):
+        notices = List(NoticeBulkInput, required=True)
+
+    @classmethod
+    @instrumented_mutation
+    def async_mutate(cls, user, **data):
+        try:
+            if isinstance(user, AnonymousUser) or not user.id:
+                raise ValidationError("Authentication required")
+            if not user.has_perms(["notice.add_notice"]):
+                raise PermissionDenied("Unauthorized")
+            items = data["notices"]
+            locations = _bulk_audience_locations(items)
+            errors = _validate_bulk_notice_items(user, items, locations)
+            if errors:
+                return errors
+            notices = [
+                Notice(
+                    title=item["title"],
+                    description=item["description"],
+                    priority=item["priority"],
+                    health_facility_id=item.get("health_facility_id"),
+                    audience_location=locations.get(item.get("audience_location_id")),
+                    schedule_publish=item.get("schedule_publish", False),
+                    publish_start_date=item.get("publish_start_date"),
+                )
+                for item in items
+            ]
+            for notice in notices:
+                # bulk_create does not call save()
+                notice.audience_type = notice.derive_audience_type()
+                notice.publish_if_due()
+            attachments, errors = _build_bulk_attachments(user, notices, items)
+            if errors:
+                return errors
+            with transaction.atomic():
+                Notice.objects.bulk_create(notices)
+                _ensure_pks(Notice, notices)
+                for attachment in attachments:
+                    attachment.notice_id = attachment.notice.pk
+                NoticeAttachment.objects.bulk_create(attachments)
+                # the preview tasks need the attachment ids
+                _ensure_pks(NoticeAttachment, attachments)
+                # bulk_create sends no post_save: count the blob references, index the notices
+                add_blob_references(attachment.content_hash for attachment in attachments)
+                schedule_attachment_previews(attachment.pk for attachment in attachments
+                                             if attachment.preview_status == NoticeAttachment.PREVIEW_PENDING)
+                update_attachment_search([notice.id for notice in notices], reindex_all=True)
+                visible_notice_cache.invalidate_notices(notices)
+                publish_notice_events(notice_event(EVENT_PUBLISHED, notice) for notice in notices if is_visible(notice))
+                enqueue_notice_deliveries([notice.id for notice in notices if notice.published_at],
+                                          NoticeConfig.notice_delivery_publish_channels)
+            return None
+        except Exception as exc:
+            return [{
+                "message": "Failed to create notices",
+                "detail": str(exc)
+            }]
+
+
+class UpdateNoticesBulkMutation(OpenIMISMutation):
+    """
+    Update many notices at once, loading them with one query and saving them with bulk_update.
+    New attachments of the updated notices are written with bulk_create in the same transaction.
+    """
+    _mutation_module = "notice"
+    _mutation_class = "UpdateNoticesBulkMutation"
+
+    UPDATABLE_FIELDS = ("title", "description", "priority", "health_facility_id")
+    AUDIENCE_FIELDS = ("health_facility_id", "audience_location_id", "audience_type")
+
+    class Input(OpenIMISMutation.Input):
+        notices = List(NoticeBulkUpdateInput, required=True)
+
+    @classmethod
+    @instrumented_mutation
+    def async_mutate(cls, user, **data):
+        try:
+            if isinstance(user, AnonymousUser) or not user.id:
+                raise ValidationError("Authentication required")
+            if not user.has_perms(["notice.change_notice"]):
+                raise PermissionDenied("Unauthorized")
+            items = data["notices"]
+            locations = _bulk_audience_locations(items)
+            errors = _validate_bulk_notice_items(user, items, locations)
+            existing = Notice.objects.in_bulk([item["uuid"] for item in items], field_name="uuid")
+            existing = {notice.uuid: notice for notice in existing.values() if notice.is_active}
+            for index, item in enumerate(items):
+                if item["uuid"] not in existing:
+                    errors.append({"message": "Notice not found", "detail": f"notices[{index}]: {item['uuid']}"})
+            if errors:
+                return errors
+            from django.utils import timezone
+            notices, updated_fields = [], {"updated_at"}
+            for item in items:
+                notice = existing[item["uuid"]]
+                for field in cls.UPDATABLE_FIELDS:
+                    if field in item:
+                        setattr(notice, field, item[field])
+                        updated_fields.add(field)
+                # setting one target clears the other; bulk_update does not call save()
+                if "health_facility_id" in item:
+                    notice.audience_location = None
+                if item.get("audience_location_id"):
+                    notice.audience_location = locations[item["audience_location_id"]]
+                    notice.health_facility_id = None
+                if "health_facility_id" in item or item.get("audience_location_id"):
+                    notice.audience_type = notice.derive_audience_type()
+                    updated_fields.update(cls.AUDIENCE_FIELDS)
+                notice.updated_at = timezone.now()
+                notices.append(notice)
+            attachments, errors = _build_bulk_attachments(user, notices, items)
+            if errors:
+                return errors
+            with transaction.atomic():
+                Notice.objects.bulk_update(notices, sorted(updated_fields))
+                NoticeAttachment.objects.bulk_create(attachments)
+                # the preview tasks need the attachment ids
+                _ensure_pks(NoticeAttachment, attachments)
+                add_blob_references(attachment.content_hash for attachment in attachments)
+                schedule_attachment_previews(attachment.pk for attachment in attachments
+                                             if attachment.preview_status == NoticeAttachment.PREVIEW_PENDING)
+                update_attachment_search([notice.id for notice in notices], reindex_all=True)
+                # bulk_update sends no post_save: drop both the previous and the new scopes
+                scopes = {notice.id: notice_scope(notice.health_facility_id, notice.audience_location_id)
+                          for notice in notices}
+                visible_notice_cache.invalidate(
+                    scope for notice in notices for scope in (notice._loaded_scope, scopes[notice.id]))
+                forget_notice_reads([notice.id for notice in notices if notice._loaded_scope != scopes[notice.id]])
+                record_scope_changes(notices)
+                publish_notice_events(
+                    event for notice in notices
+                    for event in notice_change_events(notice, notice._loaded_visible, notice._loaded_scope))
+            return None
+        except Exception as exc:
+            return [{
+                "message": "Failed to update notices",
+                "detail": str(exc)
+            }]
+
+
+
+class MarkNoticesReadMutation(OpenIMISMutation):
+    """
+    Record that the current user has read the given notices (or every notice visible to them
+    with `all`), keeping the unread counter behind `unreadNoticeCount` up to date.
+    """
+    _mutation_module = "notice"
+    _mutation_class = "MarkNoticesReadMutation"
+
+    class Input(OpenIMISMutation.Input):
+        # not `uuids`: read receipts are not linked to the notices mutation log
+        notice_uuids = List(graphene.UUID, required=False)
+        all = Boolean(required=False)
+
+    @classmethod
+    @instrumented_mutation
+    def async_mutate(cls, user, **data):
+        try:
+            if isinstance(user, AnonymousUser) or not user.id:
+                raise ValidationError("Authentication required")
+            if data.get("all"):
+                mark_notices_read(user)
+            elif data.get("notice_uuids"):
+                mark_notices_read(user, data["notice_uuids"])
+            else:
+                raise ValidationError("Either noticeUuids or all is required")
+            return None
+        except Exception as exc:
+            return [{
+                "message": "Failed to mark notices as read",
+                "detail": str(exc)
+            }]
@@ -1,6 +1,7 @@
 import graphene
 from core import prefix_filterset, ExtendedConnection,filter_validity
 from graphene_django import DjangoObjectType
+from django.urls import reverse
 from django.utils.translation import gettext as _
 import graphene
 from graphene_django import DjangoObjectType
@@ -8,9 +9,13 @@ from location.schema import HealthFacilityGQLType
 from location import models as location_models
 from core import models as core_models
 from graphql import ResolveInfo
-from django.db.models import Q  # Add this import at the top for Q objects
+from django.db.models import Q, Count, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
 
-from .models import Notice, NoticeAttachment
+from .models import Notice, NoticeAttachment, NoticeArchive, NoticeAttachmentArchive, NoticeDeliveryStats
+from .pagination import LazyCountConnection
+from .apps import NoticeConfig
+from .audience import audience_filter
 
 
 class NoticePriority(graphene.Enum):
@@ -28,11 +33,23 @@ class NoticePriority(graphene.Enum):
             return _("High priority")
         return ""
 
+class NoticeDeliveryStatsGQLType(DjangoObjectType):
+    """
+    Email and SMS recipients of a notice by delivery status, maintained as counters.
+    """
+    class Meta:
+        model = NoticeDeliveryStats
+        exclude = ('notice',)
+
+
 class NoticeGQLType(DjangoObjectType):
     attachment_count = graphene.Int()
     priority = NoticePriority()
+    delivery_stats = graphene.Field(NoticeDeliveryStatsGQLType)
+    search_rank = graphene.Float()
     class Meta:
         model = Notice
+        exclude = ('search_attachments',)
         interfaces = (graphene.relay.Node,)
         filter_fields = {
             "uuid": ["exact"],
@@ -40,48 +57,66 @@ class NoticeGQLType(DjangoObjectType):
             "title": ["icontains"],
             "description": ["icontains"],
             "priority": ["exact"],
+            "is_active": ["exact"],
             "created_at": ["exact", "lt", "lte", "gt", "gte"],
+            "audience_type": ["exact"],
+            "audience_location__id": ["exact"],
+            "audience_location__uuid": ["exact"],
             **prefix_filterset("health_facility__", HealthFacilityGQLType._meta.filter_fields),
 
         }
-        connection_class = ExtendedConnection 
+        connection_class = LazyCountConnection 
     
     def resolve_attachment_count(self, info):
-    # Count the number of attachments related to this notice
+        # Count computed for the whole page by get_queryset, fall back to a per-row COUNT
+        if hasattr(self, "attachments_count"):
+            return self.attachments_count
         return self.attachments.count()
 
+    def resolve_search_rank(self, info):
+        # Only set on the results of a `search`
+        return getattr(self, "search_rank", None)
+
+    def resolve_delivery_stats(self, info):
+        # Joined by get_queryset; None until the notice has been delivered
+        try:
+            return self.delivery_stats
+        except NoticeDeliveryStats.DoesNotExist:
+            return None
+
     @classmethod
     def get_queryset(cls, queryset, info):
         """
         Default queryset filtering:
         1. Apply validity filter (validity_to__isnull=True).
-        2. If health_facility is null, show to all; otherwise, filter by user's health facility (row security).
-        3. Only show notices where current date is after publish_start_date (if set).
+        2. Row security: national notices, the notices of the user's health facility and those
+           targeting its district or region, as an indexed filter on the cached facility locations.
+        3. Only show published notices (scheduled notices are published by the scheduler
+           once their publish_start_date is reached).
+        4. Join health_facility and the delivery stats and annotate the attachment count so
+           a page of notices is resolved in a single query.
         """
         user = info.context.user
         from django.conf import settings
-        from datetime import datetime
         user = info.context.user
-        current_date = datetime.now()
         if settings.ROW_SECURITY:
             # TechnicalUsers don't have health_facility_id attribute
             if hasattr(user._u, 'health_facility_id') and user._u.health_facility_id:
-                # Filter notices where health_facility matches user's HF or is null
-                queryset = queryset.filter(
-                    Q(health_facility_id=user._u.health_facility_id) |
-                    Q(health_facility__isnull=True) |
-                    Q(publish_start_date__isnull=True) |
-                    Q(publish_start_date__gte=current_date)
-                )
+                queryset = queryset.filter(audience_filter(user._u.health_facility_id), published_at__isnull=False)
 
-        return queryset.order_by('-created_at')
+        attachments_count = NoticeAttachment.objects.filter(notice=OuterRef('pk')) \
+            .order_by().values('notice').annotate(count=Count('*')).values('count')
+        return queryset.select_related('health_facility', 'audience_location', 'delivery_stats').annotate(
+            attachments_count=Coalesce(Subquery(attachments_count, output_field=IntegerField()), 0)
+        ).order_by('-created_at')
 
 class NoticeAttachmentGQLType(DjangoObjectType):
-    doc = graphene.String(source='document')
+    doc = graphene.String()
+    preview_url = graphene.String()
     class Meta:
         model = NoticeAttachment
         interfaces = (graphene.relay.Node,)
-        fields = '__all__'
+        exclude = ('storage_key', 'preview_key')
         filter_fields = {
             "id": ["exact"],
             "general_type": ["exact", "icontains"],
@@ -93,5 +128,105 @@ class NoticeAttachmentGQLType(DjangoObjectType):
             "url": ["exact", "icontains"],
             **prefix_filterset("notice__", NoticeGQLType._meta.filter_fields),
         }
-        connection_class = ExtendedConnection
+        connection_class = LazyCountConnection
+
+    def resolve_doc(self, info):
+        # Only loaded from the blob store when the field is actually selected
+        return self.read_document()
+
+    def resolve_preview_url(self, info):
+        # the generated thumbnail, so that lists never fetch the attachment content itself
+        if self.preview_status != NoticeAttachment.PREVIEW_READY:
+            return None
+        return reverse("notice_attachment_preview", kwargs={"uuid": self.uuid})
+
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        # Join the parent notice (and its facility) so nested selections don't query per row
+        return queryset.select_related('notice', 'notice__health_facility')
+
+
+class NoticeAttachmentArchiveGQLType(DjangoObjectType):
+    class Meta:
+        model = NoticeAttachmentArchive
+        interfaces = (graphene.relay.Node,)
+        exclude = ('storage_key',)
+        filter_fields = {
+            "id": ["exact"],
+            "title": ["exact", "icontains"],
+            "filename": ["exact", "icontains"],
+        }
+        connection_class = LazyCountConnection
+
+
+class NoticeArchiveGQLType(DjangoObjectType):
+    """
+    Expired notices moved to the archive by the sweeper, only reachable through `archivedNotices`.
+    """
+    priority = NoticePriority()
+
+    class Meta:
+        model = NoticeArchive
+        interfaces = (graphene.relay.Node,)
+        filter_fields = {
+            "uuid": ["exact"],
+            "title": ["icontains"],
+            "priority": ["exact"],
+            "created_at": ["exact", "lt", "lte", "gt", "gte"],
+            "validity_to": ["exact", "lt", "lte", "gt", "gte"],
+            "archived_at": ["exact", "lt", "lte", "gt", "gte"],
+            **prefix_filterset("health_facility__", HealthFacilityGQLType._meta.filter_fields),
+        }
+        connection_class = LazyCountConnection
+
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        from django.conf import settings
+        user = info.context.user
+        if settings.ROW_SECURITY and hasattr(user._u, 'health_facility_id') and user._u.health_facility_id:
+            queryset = queryset.filter(audience_filter(user._u.health_facility_id))
+        return queryset.order_by('-archived_at', '-id')
+
+
+
+class NoticeSyncAttachmentGQLType(graphene.ObjectType):
+    """
+    Attachment metadata sent to syncing devices, the content is downloaded separately.
+    """
+    uuid = graphene.UUID()
+    general_type = graphene.String()
+    type = graphene.String()
+    title = graphene.String()
+    date = graphene.Date()
+    filename = graphene.String()
+    mime = graphene.String()
+    url = graphene.String()
+    size = graphene.Float()
+    content_hash = graphene.String()
+
+
+class NoticeSyncGQLType(graphene.ObjectType):
+    uuid = graphene.UUID()
+    title = graphene.String()
+    description = graphene.String()
+    priority = graphene.String()
+    health_facility_id = graphene.Int()
+    audience_type = graphene.String()
+    audience_location_id = graphene.Int()
+    published_at = graphene.DateTime()
+    updated_at = graphene.DateTime()
+    attachments = graphene.List(NoticeSyncAttachmentGQLType)
+
+    def resolve_attachments(self, info):
+        # Prefetched for the whole page by notice.sync.notice_changes
+        return self.sync_attachments
+
 
+class NoticeChangesGQLType(graphene.ObjectType):
+    """
+    One page of `noticesChangedSince`: pass `cursor` to the next call, immediately while `hasMore`.
+    """
+    notices = graphene.List(NoticeSyncGQLType)
+    deleted = graphene.List(graphene.UUID)
+    cursor = graphene.String()
+    has_more = graphene.Boolean()
@@ -0,0 +1,312 @@
+import bisect
+import functools
+import logging
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connection
+from promise import Promise
+
+from .apps import NoticeConfig
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+PROCESSES_KEY = "notice:metrics:processes"
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms rendered in the Prometheus text format, without depending on
+    prometheus_client. Each process counts in memory and publishes a snapshot of its values
+    to the notice cache every `notice_metrics_flush_seconds`; rendering sums the snapshots of
+    all the processes, so that any worker answers a scrape with the totals. This needs a
+    shared cache backend (e.g. Redis): with a per-process cache, each worker only reports
+    its own values.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._collectors = {}
+        self._flushed_at = 0.0
+        self._process_key = None
+
+    def describe(self, name, kind, help_text):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            self._counters[(name, tuple(labels))] += value
+        self._flush_due()
+
+    def observe(self, name, value, labels=()):
+        key = (name, tuple(labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # per bucket counts, then sum and count
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+        self._flush_due()
+
+    def register_collector(self, name, kind, help_text, collect):
+        """
+        Metric read when rendering: `collect()` returns {labels: value}.
+        """
+        self.describe(name, kind, help_text)
+        self._collectors[name] = collect
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """
+        Values of this process: (counters, histograms), the collected metrics being counters.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+        for name, collect in self._collectors.items():
+            try:
+                values = collect()
+            except Exception:
+                logger.exception("Failed to collect metric %s", name)
+                continue
+            counters.update(((name, labels), value) for labels, value in values.items())
+        return counters, histograms
+
+    @staticmethod
+    def _backend():
+        from .cache import visible_notice_cache
+        return visible_notice_cache.backend
+
+    def _flush_due(self):
+        if time.monotonic() - self._flushed_at >= NoticeConfig.notice_metrics_flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """
+        Publish the snapshot of this process to the cache, registering the process on its
+        first flush (and again if a concurrent registration lost it).
+        """
+        self._flushed_at = time.monotonic()
+        if self._process_key is None:
+            self._process_key = f"notice:metrics:process:{socket.gethostname()}:{os.getpid()}"
+        try:
+            backend = self._backend()
+            backend.set(self._process_key, self.snapshot(), NoticeConfig.notice_metrics_process_ttl)
+            processes = backend.get(PROCESSES_KEY) or []
+            if self._process_key not in processes:
+                backend.set(PROCESSES_KEY, processes + [self._process_key], None)
+        except Exception:
+            logger.exception("Failed to publish the notice metrics")
+
+    def collect(self):
+        """
+        Sum of the snapshots of every process still publishing; processes whose snapshot
+        expired are dropped from the registration list.
+        """
+        self.flush()
+        counters, histograms = defaultdict(float), {}
+        try:
+            backend = self._backend()
+            processes = backend.get(PROCESSES_KEY) or []
+            snapshots = {key: backend.get(key) for key in processes}
+            live = [key for key, snapshot in snapshots.items() if snapshot is not None]
+            if len(live) < len(processes):
+                backend.set(PROCESSES_KEY, live, None)
+            snapshots = [snapshots[key] for key in live]
+        except Exception:
+            logger.exception("Failed to read the notice metrics, rendering this process only")
+            snapshots = []
+        for process_counters, process_histograms in snapshots or [self.snapshot()]:
+            for key, value in process_counters.items():
+                counters[key] += value
+            for key, histogram in process_histograms.items():
+                total = histograms.setdefault(key, [0] * len(histogram))
+                for index, value in enumerate(histogram):
+                    total[index] += value
+        return counters, histograms
+
+    def render(self) -> str:
+        counters, histograms = self.collect()
+        samples = defaultdict(list)
+        for (name, labels), value in counters.items():
+            samples[name].append(f"{name}{_label_text(labels)} {value:g}")
+        for (name, labels), histogram in histograms.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), histogram):
+                cumulative += count
+                samples[name].append(f"{name}_bucket{_label_text(labels + (('le', bound),))} {cumulative}")
+            samples[name].append(f"{name}_sum{_label_text(labels)} {histogram[-2]:g}")
+            samples[name].append(f"{name}_count{_label_text(labels)} {histogram[-1]}")
+        lines = []
+        for name in sorted(samples):
+            kind, help_text = self._help.get(name, ("untyped", ""))
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"] + samples[name]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.describe("notice_graphql_field_seconds", "histogram", "Wall time of notice GraphQL field resolvers")
+metrics.describe("notice_graphql_field_queries_total", "counter", "SQL queries run by notice GraphQL field resolvers")
+metrics.describe("notice_graphql_field_bytes_total", "counter", "Characters of string values returned by notice fields")
+metrics.describe("notice_graphql_field_errors_total", "counter", "Notice GraphQL field resolvers raising an error")
+metrics.describe("notice_mutation_seconds", "histogram", "Wall time of the notice mutation bodies")
+metrics.describe("notice_mutation_queries_total", "counter", "SQL queries run by the notice mutation bodies")
+
+
+def _visible_cache_stats():
+    from .cache import visible_notice_cache
+    return {(("event", event),): value for event, value in visible_notice_cache.stats().items()}
+
+
+metrics.register_collector("notice_visible_cache_events_total", "counter",
+                           "Visible notices cache hits, misses, evictions and invalidations", _visible_cache_stats)
+
+
+class Measurement:
+    """
+    Wall time and number of SQL queries (on the default connection) of a block.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self._start
+        self._wrapper.__exit__(*exc_info)
+        return False
+
+
+def _value_size(value):
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return 0
+
+
+@functools.lru_cache(maxsize=None)
+def _notice_root_fields():
+    from graphene.utils.str_converters import to_camel_case
+    from .schema import Mutation, Query
+    return frozenset(to_camel_case(name) for root in (Query, Mutation) for name in root._meta.fields)
+
+
+class NoticeInstrumentationMiddleware:
+    """
+    Graphene middleware timing the resolvers of the notice types and root fields, with their SQL
+    query count and the size of the strings they return (e.g. `doc`). Add it to
+    GRAPHENE["MIDDLEWARE"]; it only measures when `notice_instrumentation_enabled` is set.
+    Root fields, and fields slower than `notice_instrumentation_slow_ms`, are also logged.
+    """
+
+    def resolve(self, next, root, info, **args):
+        if not NoticeConfig.notice_instrumentation_enabled:
+            return next(root, info, **args)
+        type_name = info.parent_type.name
+        is_root = len(info.path or ()) == 1
+        if not (type_name.startswith("Notice") or (is_root and info.field_name in _notice_root_fields())):
+            return next(root, info, **args)
+        measurement = Measurement()
+        start = time.perf_counter()
+        try:
+            with measurement:
+                result = next(root, info, **args)
+        except Exception:
+            self._record(info, is_root, measurement.seconds, measurement.queries, failed=True)
+            raise
+        if not isinstance(result, Promise):
+            self._record(info, is_root, measurement.seconds, measurement.queries, result)
+            return result
+
+        # measured when the promise settles rather than forcing it: the time runs until then,
+        # the queries of batched loads run outside the resolver and are not counted
+        def _fulfilled(value):
+            self._record(info, is_root, time.perf_counter() - start, measurement.queries, value)
+            return value
+
+        def _rejected(error):
+            self._record(info, is_root, time.perf_counter() - start, measurement.queries, failed=True)
+            raise error
+        return result.then(_fulfilled, _rejected)
+
+    @staticmethod
+    def _record(info, is_root, seconds, queries, value=None, failed=False):
+        type_name = info.parent_type.name
+        labels = (("type", type_name), ("field", info.field_name))
+        metrics.observe("notice_graphql_field_seconds", seconds, labels)
+        if queries:
+            metrics.inc("notice_graphql_field_queries_total", labels, queries)
+        if failed:
+            metrics.inc("notice_graphql_field_errors_total", labels)
+            return
+        size = _value_size(value)
+        if size:
+            metrics.inc("notice_graphql_field_bytes_total", labels, size)
+        elapsed_ms = seconds * 1000
+        if is_root or elapsed_ms >= NoticeConfig.notice_instrumentation_slow_ms:
+            logger.info("GraphQL %s.%s: %.1f ms, %s queries", type_name, info.field_name, elapsed_ms,
+                        queries, extra={"notice_graphql": {
+                            "type": type_name, "field": info.field_name, "path": list(info.path or ()),
+                            "ms": round(elapsed_ms, 2), "queries": queries, "bytes": size}})
+
+
+def instrumented_mutation(async_mutate):
+    """
+    Time an `async_mutate` body and count its SQL queries when `notice_instrumentation_enabled`
+    is set. Goes below @classmethod.
+    """
+    @functools.wraps(async_mutate)
+    def wrapper(cls, user, **data):
+        if not NoticeConfig.notice_instrumentation_enabled:
+            return async_mutate(cls, user, **data)
+        mutation = getattr(cls, "_mutation_class", cls.__name__)
+        measurement = Measurement()
+        errors, raised = None, True
+        try:
+            with measurement:
+                errors = async_mutate(cls, user, **data)
+            raised = False
+        finally:
+            outcome = "error" if raised or errors else "success"
+            labels = (("mutation", mutation), ("outcome", outcome))
+            metrics.observe("notice_mutation_seconds", measurement.seconds, labels)
+            metrics.inc("notice_mutation_queries_total", labels, measurement.queries)
+            logger.info("Mutation %s (%s): %.1f ms, %s queries", mutation, outcome, measurement.seconds * 1000,
+                        measurement.queries, extra={"notice_mutation": {
+                            "mutation": mutation, "outcome": outcome, "ms": round(measurement.seconds * 1000, 2),
+                            "queries": measurement.queries, "errors": len(errors or ())}})
+        return errors
+    return wrapper
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from notice.archiving import archive_expired_notices
+
+
+class Command(BaseCommand):
+    help = "Move the notices past their validity_to (and their attachments) to the archive tables, " \
+           "in committed batches. Safe to interrupt and re-run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--max-batches", type=int, default=None,
+                            help="Stop after this many batches (the next run resumes)")
+
+    def handle(self, *args, **options):
+        archived = archive_expired_notices(batch_size=options["batch_size"], max_batches=options["max_batches"])
+        self.stdout.write(f"Archived {archived} notices")
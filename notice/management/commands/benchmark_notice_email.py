@@ -0,0 +1,61 @@
+import json
+import time
+
+from django.core.mail import get_connection, send_mail
+from django.core.management.base import BaseCommand, CommandError
+
+from notice.services import NoticeEmailDispatcher, render_notice_email
+
+
+class Command(BaseCommand):
+    help = "Measure notice email throughput (messages per second) against a local aiosmtpd SMTP " \
+           "stand-in: batched dispatcher over one connection vs one send_mail (and connection) per message."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000)
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--port", type=int, default=8025)
+        parser.add_argument("--skip-baseline", action="store_true", help="Only measure the batched dispatcher")
+
+    def handle(self, *args, **options):
+        try:
+            from aiosmtpd.controller import Controller
+            from aiosmtpd.handlers import Sink
+        except ImportError:
+            raise CommandError("benchmark_notice_email requires the aiosmtpd package")
+
+        controller = Controller(Sink(), hostname="127.0.0.1", port=options["port"])
+        controller.start()
+        try:
+            results = {"messages": options["messages"]}
+            recipients = [f"user{i}@example.org" for i in range(options["messages"])]
+            connection = get_connection(
+                "django.core.mail.backends.smtp.EmailBackend", host="127.0.0.1", port=options["port"],
+                use_tls=False, use_ssl=False, username="", password="")
+
+            rendered = render_notice_email("Benchmark notice", "Generated by benchmark_notice_email", "LOW")
+            dispatcher = NoticeEmailDispatcher(connection=connection, batch_size=options["batch_size"])
+            start = time.perf_counter()
+            result = dispatcher.send(recipients, rendered)
+            elapsed = time.perf_counter() - start
+            connection.close()
+            results["dispatcher"] = {
+                "sent": len(result.sent), "failed": len(result.failed),
+                "seconds": round(elapsed, 3), "messages_per_second": round(len(result.sent) / elapsed, 1),
+            }
+
+            if not options["skip_baseline"]:
+                start = time.perf_counter()
+                for recipient in recipients:
+                    send_mail(rendered.subject, rendered.text, "no-reply@openimis.org", [recipient],
+                              html_message=rendered.html, connection=get_connection(
+                                  "django.core.mail.backends.smtp.EmailBackend", host="127.0.0.1",
+                                  port=options["port"], use_tls=False, use_ssl=False, username="", password=""))
+                elapsed = time.perf_counter() - start
+                results["send_mail_per_message"] = {
+                    "sent": len(recipients), "seconds": round(elapsed, 3),
+                    "messages_per_second": round(len(recipients) / elapsed, 1),
+                }
+        finally:
+            controller.stop()
+        self.stdout.write(json.dumps(results, indent=2))
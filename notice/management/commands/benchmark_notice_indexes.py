@@ -0,0 +1,104 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from location.models import HealthFacility
+from notice.models import Notice
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Generate a notice dataset in a rolled back transaction and compare the query plans of the " \
+           "notice list hot path with and without the tbl_notices composite/partial indexes. " \
+           "Dropping the indexes inside the transaction requires transactional DDL (PostgreSQL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notices", type=int, default=200000, help="Number of notices to generate")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--global-ratio", type=float, default=0.3,
+                            help="Share of notices without health facility")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed executions per query")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                facility_ids = self._generate(options)
+                queries = self._hot_path_queries(facility_ids)
+                self._report("with indexes", queries, options["repeat"])
+                if connection.vendor == "postgresql":
+                    with connection.schema_editor() as schema_editor:
+                        for index in Notice._meta.indexes:
+                            schema_editor.remove_index(Notice, index)
+                    self._analyze()
+                    self._report("without indexes", queries, options["repeat"])
+                else:
+                    self.stdout.write(f"Skipping the comparison: {connection.vendor} has no transactional DDL")
+                raise Rollback()
+        except Rollback:
+            self.stdout.write("Generated data rolled back")
+
+    def _generate(self, options):
+        facility_ids = list(HealthFacility.objects.filter(validity_to__isnull=True).values_list("id", flat=True)[:500])
+        now = timezone.now()
+        created_at = Notice._meta.get_field("created_at")
+        # let the generated rows spread over two years instead of all being created "now"
+        created_at.auto_now_add = False
+        try:
+            remaining = options["notices"]
+            while remaining > 0:
+                size = min(options["batch_size"], remaining)
+                Notice.objects.bulk_create([
+                    Notice(
+                        title=f"Benchmark notice {remaining - i}",
+                        description="Generated by benchmark_notice_indexes",
+                        priority=random.choice(["LOW", "MEDIUM", "HIGH"]),
+                        health_facility_id=None if not facility_ids or random.random() < options["global_ratio"]
+                        else random.choice(facility_ids),
+                        created_at=now - timedelta(minutes=random.randint(0, 2 * 365 * 24 * 60)),
+                        is_active=random.random() > 0.1,
+                    )
+                    for i in range(size)
+                ])
+                remaining -= size
+        finally:
+            created_at.auto_now_add = True
+        self._analyze()
+        self.stdout.write(f"Generated {options['notices']} notices over {len(facility_ids)} facilities")
+        return facility_ids
+
+    def _analyze(self):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Notice._meta.db_table}")
+
+    def _hot_path_queries(self, facility_ids):
+        facility_id = facility_ids[0] if facility_ids else None
+        return {
+            "facility page": Notice.objects
+                .filter(Q(health_facility_id=facility_id) | Q(health_facility__isnull=True))
+                .order_by("-created_at")[:100],
+            "active facility page": Notice.objects
+                .filter(health_facility_id=facility_id, is_active=True)
+                .order_by("-created_at")[:100],
+            "active page": Notice.objects.filter(is_active=True).order_by("-created_at")[:100],
+        }
+
+    def _report(self, label, queries, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {label}"))
+        for name, queryset in queries.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            explain = {"analyze": True} if connection.vendor == "postgresql" else {}
+            self.stdout.write(f"-- {name}: best {min(timings):.2f} ms, median {sorted(timings)[len(timings) // 2]:.2f} ms")
+            self.stdout.write(queryset.explain(**explain))
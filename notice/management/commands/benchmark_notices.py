@@ -0,0 +1,258 @@
+import json
+import platform
+import statistics
+import time
+from types import SimpleNamespace
+
+import graphene
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import User
+from notice.gql_mutations import CreateNoticeMutation, DeleteNoticeMutation
+from notice.models import Notice, NoticeAttachment
+from notice.recipients import CHANNEL_EMAIL, iter_notice_recipients
+from notice.schema import Query
+from notice.services import NoticeEmailDispatcher, render_notice_email
+from notice.views import download_attachment
+
+NOTICES_QUERY = """
+query ($first: Int, $search: String, $keyset: Boolean) {
+  notices(first: $first, search: $search, keyset: $keyset) {
+    edges { node { uuid title description priority createdAt publishedAt isActive attachmentCount } }
+  }
+}"""
+
+ATTACHMENTS_QUERY = """
+query ($first: Int) {
+  noticeAttachments(first: $first) { edges { node { uuid title filename mime size %s } } }
+}"""
+
+SCENARIOS = ("notices_list", "notices_keyset", "notices_search", "attachments_list", "attachments_doc",
+             "attachment_download", "create_notice", "delete_notices", "email_fanout")
+
+
+class Rollback(Exception):
+    pass
+
+
+def _module_version():
+    try:
+        from importlib.metadata import version
+        return version("openimis-be-notice")
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = "Repeatable benchmark of the notice module on the current database (see generate_notice_data): " \
+           "notices list queries, attachment fetches, create/delete mutations and email fan-out against a " \
+           "local SMTP stand-in. Prints JSON results (timings and query counts per scenario) that can be " \
+           "compared across releases with --baseline. Writes are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", default="Admin", help="User the queries and mutations run as")
+        parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                            help="Scenario to run (repeatable, default: all)")
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs per scenario")
+        parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per scenario")
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--search", default="report training")
+        parser.add_argument("--delete-batch", type=int, default=100, help="Notices deleted per delete_notices run")
+        parser.add_argument("--fanout", type=int, default=1000, help="Recipients per email_fanout run")
+        parser.add_argument("--smtp-port", type=int, default=8025,
+                            help="Port of the aiosmtpd stand-in (the locmem backend is used without aiosmtpd)")
+        parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+        parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User not found: {options['username']}")
+        self.user = user
+        self.options = options
+        self.schema = graphene.Schema(query=Query)
+        results = {
+            "module_version": _module_version(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "started_at": timezone.now().isoformat(),
+            "dataset": {
+                "notices": Notice.objects.count(),
+                "attachments": NoticeAttachment.objects.count(),
+            },
+            "options": {key: options[key] for key in ("username", "repeat", "warmup", "page_size", "search",
+                                                      "delete_batch", "fanout")},
+            "scenarios": {},
+        }
+        self._cleanups = []
+        try:
+            for name in options["scenario"] or SCENARIOS:
+                results["scenarios"][name] = self._measure(getattr(self, f"_{name}")())
+        finally:
+            for cleanup in self._cleanups:
+                cleanup()
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline:
+                results["baseline"] = self._compare(results, json.load(baseline))
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as target:
+                target.write(output)
+        else:
+            self.stdout.write(output)
+
+    def _measure(self, scenario):
+        """
+        Run `scenario` (a callable, or a (setup, run) pair) warmup + repeat times, timing and
+        counting the queries of the timed runs only. Each run is rolled back.
+        """
+        setup, run = scenario if isinstance(scenario, tuple) else (None, scenario)
+        timings, queries, errors = [], [], []
+        for iteration in range(self.options["warmup"] + self.options["repeat"]):
+            try:
+                with transaction.atomic():
+                    state = setup() if setup else None
+                    with CaptureQueriesContext(connection) as captured:
+                        start = time.perf_counter()
+                        run(state) if setup else run()
+                        elapsed = (time.perf_counter() - start) * 1000
+                    raise Rollback()
+            except Rollback:
+                pass
+            except Exception as exc:
+                errors.append(str(exc))
+                continue
+            if iteration >= self.options["warmup"]:
+                timings.append(elapsed)
+                queries.append(len(captured.captured_queries))
+        if not timings:
+            return {"runs": 0, "errors": errors[:5]}
+        timings.sort()
+        return {
+            "runs": len(timings),
+            "min_ms": round(timings[0], 2),
+            "median_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            "max_ms": round(timings[-1], 2),
+            "queries": int(statistics.median(queries)),
+            "errors": errors[:5],
+        }
+
+    @staticmethod
+    def _compare(results, baseline):
+        comparison = {"module_version": baseline.get("module_version"), "scenarios": {}}
+        for name, current in results["scenarios"].items():
+            previous = baseline.get("scenarios", {}).get(name)
+            if not previous or not previous.get("median_ms") or "median_ms" not in current:
+                continue
+            comparison["scenarios"][name] = {
+                "median_ms": previous["median_ms"],
+                "change_pct": round((current["median_ms"] / previous["median_ms"] - 1) * 100, 1),
+                "queries": previous.get("queries"),
+            }
+        return comparison
+
+    def _graphql(self, query, **variables):
+        def run():
+            result = self.schema.execute(query, context_value=SimpleNamespace(user=self.user),
+                                         variable_values=variables)
+            if result.errors:
+                raise Exception("; ".join(str(error) for error in result.errors))
+            # serialization is part of what a client waits for
+            json.dumps(result.data)
+        return run
+
+    def _notices_list(self):
+        return self._graphql(NOTICES_QUERY, first=self.options["page_size"])
+
+    def _notices_keyset(self):
+        return self._graphql(NOTICES_QUERY, first=self.options["page_size"], keyset=True)
+
+    def _notices_search(self):
+        return self._graphql(NOTICES_QUERY, first=self.options["page_size"], search=self.options["search"])
+
+    def _attachments_list(self):
+        return self._graphql(ATTACHMENTS_QUERY % "", first=self.options["page_size"])
+
+    def _attachments_doc(self):
+        # inline base64 documents, limited to a few rows as clients would
+        return self._graphql(ATTACHMENTS_QUERY % "doc", first=min(self.options["page_size"], 10))
+
+    def _attachment_download(self):
+        uuids = list(NoticeAttachment.objects.filter(storage_key__isnull=False)
+                     .order_by("-id").values_list("uuid", flat=True)[:self.options["page_size"]])
+        factory = RequestFactory()
+
+        def run():
+            for uuid in uuids:
+                request = factory.get(f"/notice/attachments/{uuid}/download")
+                request.user = self.user
+                response = download_attachment(request, uuid)
+                for _ in getattr(response, "streaming_content", ()):
+                    pass
+        return run
+
+    def _create_notice(self):
+        def run():
+            errors = CreateNoticeMutation.async_mutate(
+                self.user, title="Benchmark notice", description="Generated by benchmark_notices", priority="LOW")
+            if errors:
+                raise Exception(errors)
+        return run
+
+    def _delete_notices(self):
+        def setup():
+            notices = [Notice(title=f"Benchmark notice {index}", description="Generated by benchmark_notices",
+                              priority="LOW") for index in range(self.options["delete_batch"])]
+            Notice.objects.bulk_create(notices)
+            return [notice.uuid for notice in notices]
+
+        def run(uuids):
+            errors = DeleteNoticeMutation.async_mutate(self.user, uuids=uuids)
+            if errors:
+                raise Exception(errors)
+        return setup, run
+
+    def _email_fanout(self):
+        """
+        Resolve the email audience of a national notice and send it to a local stand-in, padding
+        the audience with synthetic addresses up to --fanout recipients.
+        """
+        try:
+            from aiosmtpd.controller import Controller
+            from aiosmtpd.handlers import Sink
+        except ImportError:
+            Controller = None
+        fanout = self.options["fanout"]
+        rendered = render_notice_email("Benchmark notice", "Generated by benchmark_notices", "LOW")
+
+        def run():
+            notice = Notice(title="Benchmark notice", description="Generated by benchmark_notices", priority="LOW")
+            recipients = []
+            for recipient in iter_notice_recipients(notice, CHANNEL_EMAIL):
+                if len(recipients) >= fanout:
+                    break
+                recipients.append(recipient.email)
+            recipients += [f"user{index}@example.org" for index in range(fanout - len(recipients))]
+            if Controller is None:
+                mail = get_connection("django.core.mail.backends.locmem.EmailBackend")
+            else:
+                mail = get_connection("django.core.mail.backends.smtp.EmailBackend", host="127.0.0.1",
+                                      port=self.options["smtp_port"], use_tls=False, use_ssl=False,
+                                      username="", password="")
+            result = NoticeEmailDispatcher(connection=mail).send(recipients, rendered)
+            mail.close()
+            if result.failed:
+                raise Exception(f"{len(result.failed)} messages failed")
+
+        if Controller is not None:
+            controller = Controller(Sink(), hostname="127.0.0.1", port=self.options["smtp_port"])
+            controller.start()
+            self._cleanups.append(controller.stop)
+        return run
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from notice.uploads import delete_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete the chunked attachment uploads not touched for notice_upload_expiry_seconds (abandoned, " \
+           "failed or never attached) with their spool files, and the spool files left without upload."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age-seconds", type=int, default=None,
+                            help="Age of the uploads to delete (default: notice_upload_expiry_seconds)")
+
+    def handle(self, *args, **options):
+        uploads, files = delete_stale_uploads(max_age_seconds=options["max_age_seconds"])
+        self.stdout.write(f"Deleted {uploads} uploads and {files} spool files")
@@ -0,0 +1,46 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from notice.apps import NoticeConfig
+from notice.models import NoticeAttachment
+from notice.previews import generate_attachment_previews
+
+
+class Command(BaseCommand):
+    help = "Generate the missing attachment previews (attachments stored before previews, or whose " \
+           "preview task was lost) in a bounded pool of render processes, and print the counts as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Render processes (default: notice_preview_workers, 0 renders inline)")
+        parser.add_argument("--batch-size", type=int, default=100, help="Attachments per batch")
+        parser.add_argument("--retry-failed", action="store_true", help="Render the failed previews again")
+        parser.add_argument("--all", action="store_true",
+                            help="Regenerate every preview, e.g. after changing notice_preview_max_size")
+
+    def handle(self, *args, **options):
+        workers = NoticeConfig.notice_preview_workers if options["workers"] is None else options["workers"]
+        attachments = NoticeAttachment.objects.filter(storage_key__isnull=False)
+        if not options["all"]:
+            statuses = [NoticeAttachment.PREVIEW_NONE, NoticeAttachment.PREVIEW_PENDING]
+            if options["retry_failed"]:
+                statuses.append(NoticeAttachment.PREVIEW_FAILED)
+            attachments = attachments.filter(preview_status__in=statuses)
+
+        counts, last_id = {}, 0
+        executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+        try:
+            while True:
+                ids = list(attachments.filter(id__gt=last_id).order_by("id")
+                           .values_list("id", flat=True)[:options["batch_size"]])
+                if not ids:
+                    break
+                last_id = ids[-1]
+                for status, count in generate_attachment_previews(ids, executor=executor, window=workers).items():
+                    counts[status] = counts.get(status, 0) + count
+        finally:
+            if executor:
+                executor.shutdown()
+        self.stdout.write(json.dumps(counts, indent=2))
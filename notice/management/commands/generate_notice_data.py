@@ -0,0 +1,200 @@
+import bisect
+import itertools
+import json
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from location.models import HealthFacility, Location
+from notice.blobs import add_blob_references, release_blob_references, store_blob_bytes
+from notice.cache import notice_scope, visible_notice_cache
+from notice.gql_mutations import _ensure_pks
+from notice.models import Notice, NoticeAttachment
+from notice.search import attachment_search_text, index_notice_terms
+
+# Generated notices are recognisable by their description, so that --purge only removes them
+GENERATED_MARKER = "[generated by generate_notice_data]"
+
+WORDS = ("maintenance", "meeting", "equipment", "policy", "drill", "camp", "training", "downtime",
+         "procedure", "compliance", "vaccination", "claims", "stock", "referral", "malaria", "budget",
+         "insurance", "enrolment", "report", "deadline", "circular", "supply", "district", "region")
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _document(rng, size):
+    """
+    Pseudo text content: compressible like real circulars, unlike random bytes.
+    """
+    parts, length = [b"%PDF-1.4\n"], 9
+    while length < size:
+        line = (_sentence(rng, 12) + "\n").encode()
+        parts.append(line)
+        length += len(line)
+    return b"".join(parts)[:size]
+
+
+class Command(BaseCommand):
+    help = "Bulk insert a synthetic notice dataset (notices, attachments stored in the blob store, " \
+           "facility and location targeting) for load testing and benchmark_notices. Rows are written " \
+           "with bulk_create in batches, each committed on its own."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notices", type=int, default=100000, help="Number of notices to generate")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--attachments-per-notice", type=float, default=1.0,
+                            help="Average number of attachments per notice")
+        parser.add_argument("--attachment-size", type=int, default=64 * 1024, help="Attachment size in bytes")
+        parser.add_argument("--distinct-attachments", type=int, default=100,
+                            help="Number of distinct attachment contents shared by the attachments")
+        parser.add_argument("--facilities", type=int, default=None,
+                            help="Spread the notices over at most this many existing facilities")
+        parser.add_argument("--distribution", choices=("uniform", "zipf"), default="zipf",
+                            help="How facility notices are spread over the facilities")
+        parser.add_argument("--national-ratio", type=float, default=0.3, help="Share of national notices")
+        parser.add_argument("--location-ratio", type=float, default=0.1,
+                            help="Share of notices targeting a region or district")
+        parser.add_argument("--inactive-ratio", type=float, default=0.1)
+        parser.add_argument("--scheduled-ratio", type=float, default=0.05,
+                            help="Share of notices scheduled for a future publication")
+        parser.add_argument("--days", type=int, default=730, help="Spread creation dates over this many days")
+        parser.add_argument("--seed", type=int, default=None, help="Random seed, for repeatable datasets")
+        parser.add_argument("--purge", action="store_true",
+                            help="Delete the previously generated notices instead of generating")
+
+    def handle(self, *args, **options):
+        if options["purge"]:
+            deleted = self._purge(options["batch_size"])
+            self.stdout.write(json.dumps({"deleted_notices": deleted}))
+            return
+        rng = random.Random(options["seed"])
+        facility_ids = list(HealthFacility.objects.filter(validity_to__isnull=True)
+                            .order_by("id").values_list("id", flat=True)[:options["facilities"]])
+        location_types = dict(Location.objects.filter(validity_to__isnull=True, type__in=Notice.LOCATION_AUDIENCES)
+                              .order_by("id").values_list("id", "type"))
+        if not facility_ids and options["national_ratio"] + options["location_ratio"] < 1:
+            raise CommandError("No health facility to address the facility notices to")
+        pick_facility = self._facility_picker(rng, facility_ids, options["distribution"])
+        blobs = self._store_blobs(rng, options) if options["attachments_per_notice"] > 0 else []
+
+        counts = {"notices": 0, "attachments": 0}
+        created_at = Notice._meta.get_field("created_at")
+        # let the generated rows spread over time instead of all being created "now"
+        created_at.auto_now_add = False
+        try:
+            remaining = options["notices"]
+            while remaining > 0:
+                size = min(options["batch_size"], remaining)
+                self._generate_batch(rng, size, options, pick_facility, location_types, blobs, counts)
+                remaining -= size
+                self.stderr.write(f"{counts['notices']} / {options['notices']} notices")
+        finally:
+            created_at.auto_now_add = True
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Notice._meta.db_table}")
+                cursor.execute(f"ANALYZE {NoticeAttachment._meta.db_table}")
+        self.stdout.write(json.dumps({
+            **counts,
+            "distinct_attachment_contents": len(blobs),
+            "facilities": len(facility_ids),
+            "locations": len(location_types),
+            "seed": options["seed"],
+        }))
+
+    @staticmethod
+    def _facility_picker(rng, facility_ids, distribution):
+        if not facility_ids:
+            return lambda: None
+        if distribution == "uniform":
+            return lambda: rng.choice(facility_ids)
+        # zipf: a few large facilities get most of the notices, like busy hospitals
+        cumulative = list(itertools.accumulate(1 / rank for rank in range(1, len(facility_ids) + 1)))
+        return lambda: facility_ids[bisect.bisect(cumulative, rng.random() * cumulative[-1])]
+
+    def _store_blobs(self, rng, options):
+        """
+        Write the distinct attachment contents to the blob store once; attachment rows only
+        reference them, as they would after deduplication.
+        """
+        return [store_blob_bytes(_document(rng, options["attachment_size"]), "application/pdf")
+                for _ in range(max(1, options["distinct_attachments"]))]
+
+    def _generate_batch(self, rng, size, options, pick_facility, location_types, blobs, counts):
+        now = timezone.now()
+        location_ids = list(location_types)
+        notices, attachments = [], []
+        for _ in range(size):
+            created = now - timedelta(minutes=rng.randint(0, options["days"] * 24 * 60))
+            target = rng.random()
+            health_facility_id, location_id = None, None
+            if target >= options["national_ratio"] + options["location_ratio"]:
+                health_facility_id = pick_facility()
+            elif target >= options["national_ratio"] and location_ids:
+                location_id = rng.choice(location_ids)
+            scheduled = rng.random() < options["scheduled_ratio"]
+            notice = Notice(
+                title=_sentence(rng, 4).capitalize(),
+                description=f"{_sentence(rng, 30)}\n{GENERATED_MARKER}",
+                priority=rng.choice(["LOW", "MEDIUM", "HIGH"]),
+                health_facility_id=health_facility_id,
+                audience_location_id=location_id,
+                created_at=created,
+                is_active=rng.random() >= options["inactive_ratio"],
+                schedule_publish=scheduled,
+                publish_start_date=now + timedelta(days=rng.randint(1, 30)) if scheduled else None,
+                published_at=None if scheduled else created,
+            )
+            # bulk_create does not call save()
+            notice.audience_type = Notice.AUDIENCE_FACILITY if health_facility_id else \
+                Notice.LOCATION_AUDIENCES[location_types[location_id]] if location_id else Notice.AUDIENCE_NATIONAL
+            average = options["attachments_per_notice"]
+            count = int(average) + (rng.random() < average - int(average))
+            notice_attachments = []
+            for index in range(count if blobs else 0):
+                blob = rng.choice(blobs)
+                notice_attachments.append(NoticeAttachment(
+                    notice=notice, general_type="FILE", title=_sentence(rng, 3).capitalize(),
+                    filename=f"{rng.choice(WORDS)}_{index}.pdf", mime="application/pdf",
+                    storage_key=blob.storage_key, content_hash=blob.content_hash, size=blob.size,
+                ))
+            notice.search_attachments = attachment_search_text(
+                (attachment.title, attachment.filename) for attachment in notice_attachments)
+            notices.append(notice)
+            attachments.extend(notice_attachments)
+        with transaction.atomic():
+            Notice.objects.bulk_create(notices)
+            _ensure_pks(Notice, notices)
+            for attachment in attachments:
+                attachment.notice_id = attachment.notice.pk
+            NoticeAttachment.objects.bulk_create(attachments, batch_size=options["batch_size"])
+            add_blob_references(attachment.content_hash for attachment in attachments)
+            index_notice_terms([notice.id for notice in notices])
+            visible_notice_cache.invalidate_notices(notices)
+        counts["notices"] += len(notices)
+        counts["attachments"] += len(attachments)
+
+    def _purge(self, batch_size):
+        """
+        Delete the generated notices batch by batch, releasing their blobs.
+        """
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                notices = list(Notice.objects.filter(description__endswith=GENERATED_MARKER)
+                               .only("id", "health_facility_id", "audience_location_id")[:batch_size])
+                if not notices:
+                    return deleted
+                ids = [notice.id for notice in notices]
+                attachments = NoticeAttachment.objects.filter(notice_id__in=ids)
+                release_blob_references(list(attachments.values_list("content_hash", flat=True)))
+                attachments.delete()
+                Notice.objects.filter(id__in=ids).delete()
+                visible_notice_cache.invalidate(
+                    notice_scope(notice.health_facility_id, notice.audience_location_id) for notice in notices)
+            deleted += len(ids)
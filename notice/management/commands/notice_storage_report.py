@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from notice.blobs import compress_stored_blobs, delete_unreferenced_blobs, storage_report
+
+
+class Command(BaseCommand):
+    help = "Report the attachment storage savings of deduplication and compression as JSON. Optionally " \
+           "compress the blobs stored before compression and delete the blobs no longer referenced."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--compress", action="store_true",
+                            help="Compress the stored uncompressed blobs of compressible MIME types")
+        parser.add_argument("--delete-unreferenced", action="store_true",
+                            help="Delete the blobs unreferenced for longer than the grace period")
+        parser.add_argument("--grace-seconds", type=int, default=None,
+                            help="Grace period of unreferenced blobs (default: notice_blob_gc_grace_seconds)")
+
+    def handle(self, *args, **options):
+        result = {}
+        if options["compress"]:
+            compressed, saved = compress_stored_blobs()
+            result["compressed"] = {"blobs": compressed, "saved_bytes": saved}
+        if options["delete_unreferenced"]:
+            deleted, freed = delete_unreferenced_blobs(grace_seconds=options["grace_seconds"])
+            result["deleted_unreferenced"] = {"blobs": deleted, "freed_bytes": freed}
+        result["report"] = storage_report()
+        self.stdout.write(json.dumps(result, indent=2))
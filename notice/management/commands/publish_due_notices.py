@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notice.apps import NoticeConfig
+from notice.publishing import publish_due_notices
+
+
+class Command(BaseCommand):
+    help = "Publish the scheduled notices whose publish_start_date is reached. " \
+           "Runs once, or every --interval seconds with --loop (alternative to the Celery beat task)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running, one tick every --interval seconds")
+        parser.add_argument("--interval", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        interval = options["interval"] or NoticeConfig.notice_publish_interval
+        while True:
+            started = time.monotonic()
+            published = publish_due_notices(batch_size=options["batch_size"])
+            self.stdout.write(f"Published {published} notices")
+            if not options["loop"]:
+                break
+            time.sleep(max(0, interval - (time.monotonic() - started)))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notice.apps import NoticeConfig
+from notice.delivery import relay_notice_deliveries
+
+
+class Command(BaseCommand):
+    help = "Relay the pending notice deliveries of the outbox to Celery. Runs once, or every " \
+           "--interval seconds with --loop; start more processes to relay in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument("--interval", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        interval = options["interval"] or NoticeConfig.notice_delivery_relay_interval
+        while True:
+            dispatched = relay_notice_deliveries(batch_size=options["batch_size"])
+            if dispatched or not options["loop"]:
+                self.stdout.write(f"Dispatched {dispatched} deliveries")
+            if not options["loop"]:
+                break
+            if not dispatched:
+                time.sleep(interval)
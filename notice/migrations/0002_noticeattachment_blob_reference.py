@@ -0,0 +1,28 @@
+# Generated by Django 4.2.18 on 2025-07-08 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noticeattachment',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, help_text="SHA-256 of the file content if general_type is 'FILE'.", max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='noticeattachment',
+            name='size',
+            field=models.BigIntegerField(blank=True, help_text='Size of the file content in bytes.', null=True),
+        ),
+        migrations.AddField(
+            model_name='noticeattachment',
+            name='storage_key',
+            field=models.CharField(blank=True, help_text='Key of the file content in the attachment blob store.', max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,145 @@
+import base64
+import gzip
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import migrations
+
+BATCH_SIZE = 100
+
+# Frozen copies of the notice.storage helpers this migration was written against: later
+# changes of the blob store must not change what this migration writes or reads. Only the
+# deployment settings (backend, options, root path) are read from the notice configuration.
+FILESYSTEM_BACKEND = 'notice.storage.FileSystemAttachmentStorage'
+S3_BACKEND = 'notice.storage.S3AttachmentStorage'
+COMPRESSED_SUFFIX = '.gz'
+
+
+def content_key(content_hash):
+    return f'{content_hash[:2]}/{content_hash[2:4]}/{content_hash}'
+
+
+def decode_base64_document(document):
+    if document.startswith('data:') and ',' in document:
+        document = document.split(',', 1)[1]
+    return base64.b64decode(''.join(document.split()), validate=True)
+
+
+class FileSystemBlobs:
+    def __init__(self, root=None):
+        from notice.apps import NoticeConfig
+        self.root = root or NoticeConfig.notice_attachments_root_path \
+            or os.path.join(getattr(settings, 'MEDIA_ROOT', None) or os.getcwd(), 'notice_attachments')
+
+    def path(self, storage_key):
+        return os.path.join(self.root, *storage_key.split('/'))
+
+    def put(self, storage_key, data):
+        path = self.path(storage_key)
+        if os.path.exists(path):
+            return
+        tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as target:
+                target.write(data)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get(self, storage_key):
+        with open(self.path(storage_key), 'rb') as blob:
+            return blob.read()
+
+
+class S3Blobs:
+    def __init__(self, bucket=None, prefix='notice/', endpoint_url=None, **client_kwargs):
+        try:
+            import boto3
+        except ImportError:
+            raise ImproperlyConfigured('S3AttachmentStorage requires the boto3 package')
+        if not bucket:
+            raise ImproperlyConfigured('S3AttachmentStorage requires a bucket')
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, **client_kwargs)
+
+    def put(self, storage_key, data):
+        self.client.put_object(Bucket=self.bucket, Key=f'{self.prefix}{storage_key}', Body=data)
+
+    def get(self, storage_key):
+        return self.client.get_object(Bucket=self.bucket, Key=f'{self.prefix}{storage_key}')['Body'].read()
+
+
+def get_blobs():
+    from notice.apps import NoticeConfig
+    backend = NoticeConfig.notice_attachment_storage_backend or FILESYSTEM_BACKEND
+    options = NoticeConfig.notice_attachment_storage_options or {}
+    if backend == FILESYSTEM_BACKEND:
+        return FileSystemBlobs(**options)
+    if backend == S3_BACKEND:
+        return S3Blobs(**options)
+    raise ImproperlyConfigured(f'Moving the attachment documents to {backend} is not supported')
+
+
+def move_documents_to_storage(apps, schema_editor):
+    """
+    Write the base64 documents to the blob store in batches. Each batch is committed on
+    its own (non-atomic migration) and only rows without a storage_key are picked up,
+    so an interrupted run can simply be restarted.
+    """
+    NoticeAttachment = apps.get_model('notice', 'NoticeAttachment')
+    blobs = get_blobs()
+    pending = NoticeAttachment.objects \
+        .filter(storage_key__isnull=True, document__isnull=False) \
+        .exclude(document='') \
+        .order_by('id')
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id).only('id', 'document')[:BATCH_SIZE])
+        if not batch:
+            break
+        for attachment in batch:
+            data = decode_base64_document(attachment.document)
+            attachment.content_hash = hashlib.sha256(data).hexdigest()
+            attachment.storage_key = content_key(attachment.content_hash)
+            attachment.size = len(data)
+            blobs.put(attachment.storage_key, data)
+        NoticeAttachment.objects.bulk_update(batch, ['storage_key', 'content_hash', 'size'])
+        last_id = batch[-1].id
+
+
+def restore_documents_from_storage(apps, schema_editor):
+    NoticeAttachment = apps.get_model('notice', 'NoticeAttachment')
+    blobs = get_blobs()
+    pending = NoticeAttachment.objects.filter(storage_key__isnull=False).order_by('id')
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id).only('id', 'storage_key')[:BATCH_SIZE])
+        if not batch:
+            break
+        for attachment in batch:
+            data = blobs.get(attachment.storage_key)
+            if attachment.storage_key.endswith(COMPRESSED_SUFFIX):
+                data = gzip.decompress(data)
+            attachment.document = base64.b64encode(data).decode('ascii')
+        NoticeAttachment.objects.bulk_update(batch, ['document'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('notice', '0002_noticeattachment_blob_reference'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_documents_to_storage, restore_documents_from_storage),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.18 on 2025-07-08 09:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0003_move_attachment_documents_to_storage'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='noticeattachment',
+            name='document',
+        ),
+    ]
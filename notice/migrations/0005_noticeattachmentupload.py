@@ -0,0 +1,38 @@
+# Generated by Django 4.2.18 on 2025-07-09 14:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notice', '0004_remove_noticeattachment_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoticeAttachmentUpload',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('filename', models.TextField(blank=True, null=True)),
+                ('mime', models.TextField(blank=True, null=True)),
+                ('size', models.BigIntegerField(help_text='Expected size of the file in bytes.')),
+                ('expected_hash', models.CharField(help_text='SHA-256 announced by the client, verified on finalize.', max_length=64)),
+                ('received', models.BigIntegerField(default=0, help_text='Number of bytes received so far.')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=9)),
+                ('content_hash', models.CharField(blank=True, max_length=64, null=True)),
+                ('storage_key', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notice_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'tbl_noticeAttachmentUploads',
+            },
+        ),
+    ]
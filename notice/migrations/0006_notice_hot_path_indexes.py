@@ -0,0 +1,33 @@
+# Generated by Django 4.2.18 on 2025-07-11 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0005_noticeattachmentupload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(fields=['health_facility', '-created_at'], name='notice_hf_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['health_facility', '-created_at'], name='notice_active_hf_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(condition=models.Q(('health_facility__isnull', True)), fields=['-created_at'], name='notice_global_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='notice_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(condition=models.Q(('publish_start_date__isnull', False)), fields=['publish_start_date'], name='notice_publish_start_idx'),
+        ),
+    ]
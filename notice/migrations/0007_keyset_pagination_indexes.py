@@ -0,0 +1,21 @@
+# Generated by Django 4.2.18 on 2025-07-14 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0006_notice_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(fields=['-created_at', '-id'], name='notice_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='noticeattachment',
+            index=models.Index(fields=['-validity_from', '-id'], name='noticeatt_validfrom_id_idx'),
+        ),
+    ]
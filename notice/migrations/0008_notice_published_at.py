@@ -0,0 +1,37 @@
+# Generated by Django 4.2.18 on 2025-07-16 11:05
+
+from django.db import migrations, models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+def set_published_at(apps, schema_editor):
+    """
+    Notices that are already visible are considered published when they became visible,
+    future scheduled notices are left to the publishing scheduler.
+    """
+    Notice = apps.get_model('notice', 'Notice')
+    Notice.objects.filter(Q(schedule_publish=False) | Q(publish_start_date__isnull=True)) \
+        .update(published_at=F('created_at'))
+    Notice.objects.filter(schedule_publish=True, publish_start_date__lte=timezone.now()) \
+        .update(published_at=F('publish_start_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notice',
+            name='published_at',
+            field=models.DateTimeField(blank=True, help_text='Set when the notice becomes visible, by the scheduler for scheduled notices.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(condition=models.Q(('published_at__isnull', True)), fields=['publish_start_date'], name='notice_publish_due_idx'),
+        ),
+        migrations.RunPython(set_published_at, migrations.RunPython.noop),
+    ]
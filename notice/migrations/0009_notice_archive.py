@@ -0,0 +1,65 @@
+# Generated by Django 4.2.18 on 2025-07-18 15:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0018_auto_20230925_2243'),
+        ('notice', '0008_notice_published_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoticeArchive',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('uuid', models.UUIDField(unique=True)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('priority', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High')], max_length=6)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('schedule_publish', models.BooleanField(default=False)),
+                ('publish_start_date', models.DateTimeField(blank=True, null=True)),
+                ('validity_from', models.DateTimeField()),
+                ('validity_to', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField()),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('health_facility', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_notices', to='location.healthfacility')),
+            ],
+            options={
+                'db_table': 'tbl_notices_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='NoticeAttachmentArchive',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('uuid', models.UUIDField(unique=True)),
+                ('general_type', models.CharField(choices=[('FILE', 'File'), ('URL', 'URL')], max_length=4)),
+                ('type', models.TextField(blank=True, null=True)),
+                ('title', models.TextField(blank=True, null=True)),
+                ('date', models.DateField(blank=True, null=True)),
+                ('filename', models.TextField(blank=True, null=True)),
+                ('mime', models.TextField(blank=True, null=True)),
+                ('module', models.TextField(blank=True, null=True)),
+                ('url', models.TextField(blank=True, null=True)),
+                ('content_hash', models.CharField(blank=True, max_length=64, null=True)),
+                ('size', models.BigIntegerField(blank=True, null=True)),
+                ('storage_key', models.CharField(blank=True, max_length=255, null=True)),
+                ('validity_from', models.DateTimeField(blank=True, null=True)),
+                ('validity_to', models.DateTimeField(blank=True, null=True)),
+                ('legacy_id', models.UUIDField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('notice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='notice.noticearchive')),
+            ],
+            options={
+                'db_table': 'tbl_noticeAttachments_archive',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.18 on 2025-07-23 09:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0009_notice_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoticeDelivery',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('channel', models.CharField(choices=[('EMAIL', 'Email'), ('SMS', 'SMS')], max_length=5)),
+                ('batch_index', models.IntegerField(default=0)),
+                ('recipient_cursor_source', models.IntegerField(blank=True, help_text='Recipient source the batch starts after.', null=True)),
+                ('recipient_cursor_id', models.BigIntegerField(blank=True, help_text='Recipient id the batch starts after.', null=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('DISPATCHED', 'Dispatched'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('recipient_count', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('notice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='notice.notice')),
+            ],
+            options={
+                'db_table': 'tbl_noticeDeliveries',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='noticedelivery',
+            constraint=models.UniqueConstraint(fields=('notice', 'channel', 'batch_index'), name='notice_delivery_batch_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='noticedelivery',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'DISPATCHED'])), fields=['status', 'created_at'], name='notice_delivery_status_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.18 on 2025-07-24 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0010_noticedelivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoticeDeliveryStats',
+            fields=[
+                ('notice', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='delivery_stats', serialize=False, to='notice.notice')),
+                ('email_pending', models.IntegerField(default=0)),
+                ('email_sent', models.IntegerField(default=0)),
+                ('email_failed', models.IntegerField(default=0)),
+                ('sms_pending', models.IntegerField(default=0)),
+                ('sms_sent', models.IntegerField(default=0)),
+                ('sms_failed', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'tbl_noticeDeliveryStats',
+            },
+        ),
+        migrations.CreateModel(
+            name='NoticeRecipientDelivery',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('channel', models.CharField(choices=[('EMAIL', 'Email'), ('SMS', 'SMS')], max_length=5)),
+                ('recipient_source', models.IntegerField()),
+                ('recipient_id', models.BigIntegerField()),
+                ('address', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('delivery', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='notice.noticedelivery')),
+                ('notice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipient_deliveries', to='notice.notice')),
+            ],
+            options={
+                'db_table': 'tbl_noticeRecipientDeliveries',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='noticerecipientdelivery',
+            constraint=models.UniqueConstraint(fields=('delivery', 'recipient_source', 'recipient_id'), name='notice_recipient_delivery_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='noticerecipientdelivery',
+            index=models.Index(fields=['notice', 'channel', 'status'], name='notice_recipient_status_idx'),
+        ),
+    ]
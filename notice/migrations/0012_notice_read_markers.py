@@ -0,0 +1,47 @@
+# Generated by Django 4.2.18 on 2025-07-25 08:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_exportablequerymodel_file_format'),
+        ('notice', '0011_notice_delivery_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoticeReadState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='core.user')),
+                ('read_count', models.IntegerField(default=0)),
+                ('scopes', models.CharField(help_text='Visibility scopes read_count was counted in.', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'tbl_noticeReadStates',
+            },
+        ),
+        migrations.CreateModel(
+            name='NoticeReadMarker',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('read_at', models.DateTimeField(auto_now_add=True)),
+                ('notice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_markers', to='notice.notice')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.user')),
+            ],
+            options={
+                'db_table': 'tbl_noticeReadMarkers',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='noticereadmarker',
+            constraint=models.UniqueConstraint(fields=('user', 'notice'), name='notice_read_marker_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='noticereadmarker',
+            index=models.Index(fields=['notice'], name='notice_read_marker_notice_idx'),
+        ),
+    ]
@@ -0,0 +1,139 @@
+# Generated by Django 4.2.18 on 2025-07-28 09:14
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+# Frozen copies of the notice.search helpers: the backfill must index as the trigger below
+# and the search of this version do, whatever later versions of the module change.
+TERM_MAX_LENGTH = 64
+TITLE_WEIGHT, DESCRIPTION_WEIGHT, ATTACHMENT_WEIGHT = 4, 2, 1
+
+
+def tokenize(text):
+    return [term[:TERM_MAX_LENGTH] for term in re.findall(r"[^\W_]+", (text or "").lower())]
+
+
+def attachment_search_text(attachments):
+    return " ".join(" ".join(tokenize(value)) for attachment in attachments for value in attachment if value)
+
+
+def notice_terms(title, description, search_attachments):
+    weights = Counter()
+    for text, weight in ((title, TITLE_WEIGHT), (description, DESCRIPTION_WEIGHT),
+                         (search_attachments, ATTACHMENT_WEIGHT)):
+        for term in tokenize(text):
+            weights[term] += weight
+    return weights
+
+POSTGRES_SEARCH_VECTOR = """
+ALTER TABLE "tbl_notices" ADD COLUMN "search_vector" tsvector;
+CREATE FUNCTION notice_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.search_attachments, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER notice_search_vector_trg
+    BEFORE INSERT OR UPDATE OF title, description, search_attachments ON "tbl_notices"
+    FOR EACH ROW EXECUTE PROCEDURE notice_search_vector_update();
+"""
+
+POSTGRES_DROP_SEARCH_VECTOR = """
+DROP TRIGGER IF EXISTS notice_search_vector_trg ON "tbl_notices";
+DROP FUNCTION IF EXISTS notice_search_vector_update();
+DROP INDEX IF EXISTS notice_search_vector_idx;
+ALTER TABLE "tbl_notices" DROP COLUMN IF EXISTS "search_vector";
+"""
+
+
+def create_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_SEARCH_VECTOR)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_DROP_SEARCH_VECTOR)
+
+
+def index_existing_notices(apps, schema_editor):
+    """
+    Fill search_attachments in batches (the trigger computes the PostgreSQL vector on update),
+    or the term index on other databases. Each batch is committed on its own.
+    """
+    Notice = apps.get_model('notice', 'Notice')
+    NoticeAttachment = apps.get_model('notice', 'NoticeAttachment')
+    NoticeSearchTerm = apps.get_model('notice', 'NoticeSearchTerm')
+    postgres = schema_editor.connection.vendor == 'postgresql'
+    last_id = 0
+    while True:
+        batch = list(Notice.objects.filter(id__gt=last_id).order_by('id')
+                     .only('id', 'title', 'description')[:BATCH_SIZE])
+        if not batch:
+            break
+        attachments = {notice.id: [] for notice in batch}
+        for notice_id, title, filename in NoticeAttachment.objects.filter(notice_id__in=attachments) \
+                .order_by('id').values_list('notice_id', 'title', 'filename'):
+            attachments[notice_id].append((title, filename))
+        for notice in batch:
+            notice.search_attachments = attachment_search_text(attachments[notice.id])
+        # every row is updated on PostgreSQL so that the trigger computes its vector
+        Notice.objects.bulk_update(batch, ['search_attachments'])
+        if not postgres:
+            NoticeSearchTerm.objects.bulk_create([
+                NoticeSearchTerm(notice_id=notice.id, term=term, weight=weight)
+                for notice in batch
+                for term, weight in notice_terms(notice.title, notice.description,
+                                                 notice.search_attachments).items()
+            ], batch_size=BATCH_SIZE)
+        last_id = batch[-1].id
+
+
+def create_search_index(apps, schema_editor):
+    # built once the vectors are filled rather than maintained through the backfill
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS notice_search_vector_idx ON "tbl_notices" USING GIN ("search_vector")')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('notice', '0012_notice_read_markers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notice',
+            name='search_attachments',
+            field=models.TextField(blank=True, default='', help_text='Titles and filenames of the attachments, for full-text search.'),
+        ),
+        migrations.CreateModel(
+            name='NoticeSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.IntegerField(default=1, help_text='Occurrences weighted by field: title 4, description 2, attachments 1.')),
+                ('notice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='notice.notice')),
+            ],
+            options={
+                'db_table': 'tbl_noticeSearchTerms',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='noticesearchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'notice'), name='notice_search_term_uniq'),
+        ),
+        migrations.RunPython(create_search_vector, drop_search_vector),
+        migrations.RunPython(index_existing_notices, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, migrations.RunPython.noop),
+    ]
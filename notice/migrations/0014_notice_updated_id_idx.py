@@ -0,0 +1,17 @@
+# Generated by Django 4.2.18 on 2025-07-29 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0013_notice_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(fields=['updated_at', 'id'], name='notice_updated_id_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.18 on 2025-07-30 10:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_facility_audience(apps, schema_editor):
+    for model_name in ('Notice', 'NoticeArchive'):
+        apps.get_model('notice', model_name).objects \
+            .filter(health_facility__isnull=False).update(audience_type='FACILITY')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0018_auto_20230925_2243'),
+        ('notice', '0014_notice_updated_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notice',
+            name='audience_type',
+            field=models.CharField(choices=[('NATIONAL', 'National'), ('REGION', 'Region'), ('DISTRICT', 'District'), ('FACILITY', 'Health facility')], default='NATIONAL', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='notice',
+            name='audience_location',
+            field=models.ForeignKey(blank=True, help_text='Region or district targeted by the notice, with all its health facilities.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notices', to='location.location'),
+        ),
+        migrations.AddField(
+            model_name='noticearchive',
+            name='audience_type',
+            field=models.CharField(choices=[('NATIONAL', 'National'), ('REGION', 'Region'), ('DISTRICT', 'District'), ('FACILITY', 'Health facility')], default='NATIONAL', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='noticearchive',
+            name='audience_location',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_notices', to='location.location'),
+        ),
+        migrations.RunPython(set_facility_audience, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.18 on 2025-08-04 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+BATCH_SIZE = 1000
+
+
+def create_blobs(apps, schema_editor):
+    # existing blobs are uncompressed: stored_size is their content size
+    NoticeBlob = apps.get_model('notice', 'NoticeBlob')
+    # attachments, archived attachments and finalized uploads (not attached yet) hold references
+    references = (
+        apps.get_model('notice', 'NoticeAttachment').objects.all(),
+        apps.get_model('notice', 'NoticeAttachmentArchive').objects.all(),
+        apps.get_model('notice', 'NoticeAttachmentUpload').objects.filter(status='COMPLETED'),
+    )
+    blobs = {}
+    for queryset in references:
+        rows = queryset \
+            .filter(content_hash__isnull=False, storage_key__isnull=False) \
+            .values('content_hash') \
+            .annotate(key=Max('storage_key'), content_size=Max('size'), references=Count('id'))
+        for row in rows.iterator():
+            blob = blobs.setdefault(row['content_hash'], NoticeBlob(
+                content_hash=row['content_hash'], storage_key=row['key'],
+                size=row['content_size'] or 0, stored_size=row['content_size'] or 0, ref_count=0))
+            blob.ref_count += row['references']
+    NoticeBlob.objects.bulk_create(blobs.values(), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0015_notice_audience'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoticeBlob',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('storage_key', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField(help_text='Size of the content in bytes.')),
+                ('stored_size', models.BigIntegerField(help_text='Size of the blob in the store, compressed or not.')),
+                ('compression', models.CharField(blank=True, choices=[('', 'None'), ('gzip', 'Gzip')], default='', max_length=8)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'tbl_noticeBlobs',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='noticeblob',
+            index=models.Index(condition=models.Q(('ref_count__lte', 0)), fields=['updated_at'], name='notice_blob_unreferenced_idx'),
+        ),
+        migrations.RunPython(create_blobs, migrations.RunPython.noop),
+    ]
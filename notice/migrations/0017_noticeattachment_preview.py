@@ -0,0 +1,26 @@
+# Generated by Django 4.2.18 on 2025-08-11 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0016_notice_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noticeattachment',
+            name='preview_key',
+            field=models.CharField(blank=True, help_text='Key of the JPEG preview in the attachment blob store.',
+                                   max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='noticeattachment',
+            name='preview_status',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('PENDING', 'Pending'), ('READY', 'Ready'),
+                                                        ('FAILED', 'Failed'), ('UNSUPPORTED', 'Unsupported')],
+                                   default='', max_length=12),
+        ),
+    ]
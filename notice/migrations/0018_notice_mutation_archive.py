@@ -0,0 +1,32 @@
+# Generated by Django 4.2.18 on 2025-08-14 09:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_exportablequerymodel_file_format'),
+        ('notice', '0017_noticeattachment_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoticeMutationArchive',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('mutation', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_notices', to='core.mutationlog')),
+                ('notice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mutations', to='notice.noticearchive')),
+            ],
+            options={
+                'db_table': 'tbl_noticeMutations_archive',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(condition=models.Q(('validity_to__isnull', False)), fields=['validity_to'], name='notice_validity_to_idx'),
+        ),
+    ]
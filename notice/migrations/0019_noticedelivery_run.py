@@ -0,0 +1,26 @@
+# Generated by Django 4.2.18 on 2025-08-18 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0018_notice_mutation_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noticedelivery',
+            name='run',
+            field=models.IntegerField(default=0, help_text='Delivery run of the notice on the channel.'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='noticedelivery',
+            name='notice_delivery_batch_uniq',
+        ),
+        migrations.AddConstraint(
+            model_name='noticedelivery',
+            constraint=models.UniqueConstraint(fields=('notice', 'channel', 'run', 'batch_index'), name='notice_delivery_run_batch_uniq'),
+        ),
+    ]
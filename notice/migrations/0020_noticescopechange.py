@@ -0,0 +1,30 @@
+# Generated by Django 4.2.18 on 2025-08-18 10:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0018_auto_20230925_2243'),
+        ('notice', '0019_noticedelivery_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoticeScopeChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('audience_location', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='location.location')),
+                ('health_facility', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='location.healthfacility')),
+                ('notice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scope_changes', to='notice.notice')),
+            ],
+            options={
+                'db_table': 'tbl_noticeScopeChanges',
+                'indexes': [models.Index(fields=['changed_at', 'id'], name='notice_scope_change_sync_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2025-08-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0020_noticescopechange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noticeblob',
+            name='preview_key',
+            field=models.CharField(blank=True, help_text='Key of the current preview of the content, deleted with the blob.', max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2025-08-19 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0021_noticeblob_preview_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noticedelivery',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='Not dispatched again before, after a failed attempt.', null=True),
+        ),
+    ]
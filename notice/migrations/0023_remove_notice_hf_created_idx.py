@@ -0,0 +1,17 @@
+# Generated by Django 4.2.18 on 2025-08-20 10:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notice', '0022_noticedelivery_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notice',
+            name='notice_hf_created_idx',
+        ),
+    ]
@@ -1,9 +1,11 @@
+import datetime
 import uuid
 from django.db import models
+from django.utils import timezone
 from django.conf import settings
 from django.core.mail import send_mail
 from django.contrib.auth.models import User
-from location.models import HealthFacility 
+from location.models import HealthFacility, Location
 from core import fields, TimeUtils, models as core_models
 
 class Notice(models.Model):
@@ -12,6 +14,18 @@ class Notice(models.Model):
         ('MEDIUM', 'Medium'),
         ('HIGH', 'High'),
     )
+    AUDIENCE_NATIONAL = 'NATIONAL'
+    AUDIENCE_REGION = 'REGION'
+    AUDIENCE_DISTRICT = 'DISTRICT'
+    AUDIENCE_FACILITY = 'FACILITY'
+    AUDIENCE_CHOICES = (
+        (AUDIENCE_NATIONAL, 'National'),
+        (AUDIENCE_REGION, 'Region'),
+        (AUDIENCE_DISTRICT, 'District'),
+        (AUDIENCE_FACILITY, 'Health facility'),
+    )
+    # Location types a notice can target
+    LOCATION_AUDIENCES = {'R': AUDIENCE_REGION, 'D': AUDIENCE_DISTRICT}
 
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     id = models.AutoField(primary_key=True)
@@ -32,18 +46,92 @@ class Notice(models.Model):
     validity_from = models.DateTimeField(auto_now_add=True)
     validity_to = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    published_at = models.DateTimeField(null=True, blank=True,
+                                        help_text="Set when the notice becomes visible, by the scheduler for scheduled notices.")
+    search_attachments = models.TextField(blank=True, default='',
+                                          help_text="Titles and filenames of the attachments, for full-text search.")
+    audience_type = models.CharField(max_length=8, choices=AUDIENCE_CHOICES, default=AUDIENCE_NATIONAL)
+    audience_location = models.ForeignKey(
+        Location, on_delete=models.CASCADE, related_name='notices', null=True, blank=True,
+        help_text="Region or district targeted by the notice, with all its health facilities.")
 
     class Meta:
         db_table = 'tbl_notices'
+        indexes = [
+            # Row security: notices of a facility, newest first
+            models.Index(fields=['health_facility', '-created_at'], name='notice_active_hf_created_idx',
+                         condition=models.Q(is_active=True)),
+            # Notices addressed to every facility, newest first
+            models.Index(fields=['-created_at'], name='notice_global_created_idx',
+                         condition=models.Q(health_facility__isnull=True)),
+            models.Index(fields=['-created_at'], name='notice_active_created_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['publish_start_date'], name='notice_publish_start_idx',
+                         condition=models.Q(publish_start_date__isnull=False)),
+            # Scheduler: unpublished notices by due date
+            models.Index(fields=['publish_start_date'], name='notice_publish_due_idx',
+                         condition=models.Q(published_at__isnull=True)),
+            # Keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='notice_created_id_idx'),
+            # Incremental sync on (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='notice_updated_id_idx'),
+            # Expiry sweeper: notices past their validity_to
+            models.Index(fields=['validity_to'], name='notice_validity_to_idx',
+                         condition=models.Q(validity_to__isnull=False)),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.priority}) - {self.health_facility}"
 
     def save(self, *args, **kwargs):
+        self.audience_type = self.derive_audience_type()
         super().save(*args, **kwargs)
 
+    def derive_audience_type(self):
+        """
+        Audience of the notice from its target: a health facility, a region or district, or everyone.
+        """
+        if self.health_facility_id:
+            return self.AUDIENCE_FACILITY
+        if self.audience_location_id:
+            return self.LOCATION_AUDIENCES.get(self.audience_location.type, self.AUDIENCE_DISTRICT)
+        return self.AUDIENCE_NATIONAL
+
+    def is_due(self, now=None):
+        """
+        Whether the notice may be published at `now`: not scheduled, or its publish_start_date is reached.
+        """
+        if not self.schedule_publish or not self.publish_start_date:
+            return True
+        now = now or timezone.now()
+        if isinstance(self.publish_start_date, datetime.datetime):
+            return self.publish_start_date <= now
+        return self.publish_start_date <= now.date()
+
+    def publish_if_due(self, now=None):
+        """
+        Mark the notice as published unless it is scheduled for later, returns whether it is published.
+        """
+        now = now or timezone.now()
+        if self.published_at is None and self.is_due(now):
+            self.published_at = now
+        return self.published_at is not None
+
 
 class NoticeAttachment(core_models.UUIDModel, core_models.UUIDVersionedModel):
+    PREVIEW_NONE = ''
+    PREVIEW_PENDING = 'PENDING'
+    PREVIEW_READY = 'READY'
+    PREVIEW_FAILED = 'FAILED'
+    PREVIEW_UNSUPPORTED = 'UNSUPPORTED'
+    PREVIEW_STATUS_CHOICES = (
+        (PREVIEW_NONE, 'None'),
+        (PREVIEW_PENDING, 'Pending'),
+        (PREVIEW_READY, 'Ready'),
+        (PREVIEW_FAILED, 'Failed'),
+        (PREVIEW_UNSUPPORTED, 'Unsupported'),
+    )
+
     id = models.AutoField(primary_key=True)
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)  
     notice = models.ForeignKey(
@@ -61,14 +149,391 @@ class NoticeAttachment(core_models.UUIDModel, core_models.UUIDVersionedModel):
     mime = models.TextField(blank=True, null=True, help_text="MIME type of the file (e.g., 'application/pdf').")
     module = models.TextField(blank=False, null=True, default="notice", help_text="Module identifier for future core integration.")
     url = models.TextField(blank=True, null=True, help_text="URL link to the attachment if general_type is 'URL'.")
-    document = models.TextField(blank=True, null=True, help_text="Base64-encoded file content if general_type is 'FILE'.")
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True,
+                                    help_text="SHA-256 of the file content if general_type is 'FILE'.")
+    size = models.BigIntegerField(blank=True, null=True, help_text="Size of the file content in bytes.")
+    storage_key = models.CharField(max_length=255, blank=True, null=True,
+                                   help_text="Key of the file content in the attachment blob store.")
+    preview_key = models.CharField(max_length=255, blank=True, null=True,
+                                   help_text="Key of the JPEG preview in the attachment blob store.")
+    preview_status = models.CharField(max_length=12, choices=PREVIEW_STATUS_CHOICES, default=PREVIEW_NONE,
+                                      blank=True)
 
     class Meta:
         db_table = 'tbl_noticeAttachments'
+        indexes = [
+            # Keyset pagination on (validity_from, id)
+            models.Index(fields=['-validity_from', '-id'], name='noticeatt_validfrom_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title or self.filename or 'Unnamed'} - {self.notice.title}"
 
+    def store_document(self, document):
+        """
+        Write a base64-encoded document to the blob store and keep only its reference on the row.
+        """
+        if not document:
+            self.content_hash, self.size, self.storage_key = None, None, None
+            return
+        from .blobs import store_blob_base64
+        blob = store_blob_base64(document, self.mime)
+        self.storage_key, self.content_hash, self.size = blob.storage_key, blob.content_hash, blob.size
+
+    def attach_upload(self, upload):
+        """
+        Reference the blob of a finalized chunked upload instead of a base64 document.
+        """
+        self.storage_key, self.content_hash, self.size = upload.storage_key, upload.content_hash, upload.size
+        self.filename = self.filename or upload.filename
+        self.mime = self.mime or upload.mime
+
+    def read_document(self):
+        """
+        Base64-encoded content of the attachment, loaded from the blob store.
+        """
+        if not self.storage_key:
+            return None
+        from .storage import get_attachment_storage
+        return get_attachment_storage().read_base64(self.storage_key)
+
+
+class NoticeBlob(models.Model):
+    """
+    Attachment content stored once per content hash, with the number of attachment rows
+    (live and archived) referencing it. Blobs no longer referenced are removed by
+    `notice_storage_report --delete-unreferenced`.
+    """
+    COMPRESSION_NONE = ''
+    COMPRESSION_GZIP = 'gzip'
+    COMPRESSION_CHOICES = (
+        (COMPRESSION_NONE, 'None'),
+        (COMPRESSION_GZIP, 'Gzip'),
+    )
+
+    id = models.AutoField(primary_key=True)
+    content_hash = models.CharField(max_length=64, unique=True)
+    storage_key = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text="Size of the content in bytes.")
+    stored_size = models.BigIntegerField(help_text="Size of the blob in the store, compressed or not.")
+    compression = models.CharField(max_length=8, choices=COMPRESSION_CHOICES, default=COMPRESSION_NONE, blank=True)
+    ref_count = models.IntegerField(default=0)
+    preview_key = models.CharField(max_length=255, blank=True, null=True,
+                                   help_text="Key of the current preview of the content, deleted with the blob.")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'tbl_noticeBlobs'
+        indexes = [
+            # Unreferenced blobs, by the time they were released
+            models.Index(fields=['updated_at'], name='notice_blob_unreferenced_idx',
+                         condition=models.Q(ref_count__lte=0)),
+        ]
+
+
+class NoticeAttachmentUpload(models.Model):
+    """
+    Chunked upload of an attachment file: chunks are appended to a spool file on disk
+    and moved to the blob store once the whole file has been received and verified.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_COMPLETED = 'COMPLETED'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    id = models.AutoField(primary_key=True)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notice_uploads')
+    filename = models.TextField(blank=True, null=True)
+    mime = models.TextField(blank=True, null=True)
+    size = models.BigIntegerField(help_text="Expected size of the file in bytes.")
+    expected_hash = models.CharField(max_length=64, help_text="SHA-256 announced by the client, verified on finalize.")
+    received = models.BigIntegerField(default=0, help_text="Number of bytes received so far.")
+    status = models.CharField(max_length=9, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
+    storage_key = models.CharField(max_length=255, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'tbl_noticeAttachmentUploads'
+
+
+class NoticeArchive(models.Model):
+    """
+    Cold storage of notices past their validity_to, moved out of tbl_notices by the
+    expiry sweeper. Rows keep the id and uuid of the original notice.
+    """
+    id = models.IntegerField(primary_key=True)
+    uuid = models.UUIDField(unique=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    priority = models.CharField(max_length=6, choices=Notice.PRIORITY_CHOICES)
+    health_facility = models.ForeignKey(
+        HealthFacility, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='archived_notices', null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    schedule_publish = models.BooleanField(default=False)
+    publish_start_date = models.DateTimeField(null=True, blank=True)
+    validity_from = models.DateTimeField()
+    validity_to = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField()
+    published_at = models.DateTimeField(null=True, blank=True)
+    audience_type = models.CharField(max_length=8, choices=Notice.AUDIENCE_CHOICES, default=Notice.AUDIENCE_NATIONAL)
+    audience_location = models.ForeignKey(
+        Location, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='archived_notices', null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = 'tbl_notices_archive'
+
+
+class NoticeAttachmentArchive(models.Model):
+    """
+    Attachments of archived notices. The blob references (content_hash, storage_key)
+    are kept, the content stays in the attachment blob store.
+    """
+    id = models.IntegerField(primary_key=True)
+    uuid = models.UUIDField(unique=True)
+    notice = models.ForeignKey(NoticeArchive, on_delete=models.CASCADE, related_name='attachments')
+    general_type = models.CharField(max_length=4, choices=(('FILE', 'File'), ('URL', 'URL')))
+    type = models.TextField(blank=True, null=True)
+    title = models.TextField(blank=True, null=True)
+    date = models.DateField(blank=True, null=True)
+    filename = models.TextField(blank=True, null=True)
+    mime = models.TextField(blank=True, null=True)
+    module = models.TextField(blank=True, null=True)
+    url = models.TextField(blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
+    size = models.BigIntegerField(blank=True, null=True)
+    storage_key = models.CharField(max_length=255, blank=True, null=True)
+    validity_from = models.DateTimeField(blank=True, null=True)
+    validity_to = models.DateTimeField(blank=True, null=True)
+    legacy_id = models.UUIDField(blank=True, null=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'tbl_noticeAttachments_archive'
+
+
+class NoticeMutationArchive(models.Model):
+    """
+    Links of the mutation log to archived notices, moved with them by the expiry sweeper so
+    that the mutations of an archived notice can still be traced.
+    """
+    id = models.UUIDField(primary_key=True)
+    notice = models.ForeignKey(NoticeArchive, on_delete=models.CASCADE, related_name='mutations')
+    mutation = models.ForeignKey(core_models.MutationLog, models.DO_NOTHING, related_name='archived_notices')
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'tbl_noticeMutations_archive'
+
+
+class NoticeDelivery(models.Model):
+    """
+    Transactional outbox of notice deliveries: one row per notice, channel, run and recipient
+    batch, written in the transaction that publishes (or re-sends) the notice and relayed to
+    Celery afterwards. Each publication or manual send of a notice on a channel is a new run.
+    Processing a batch chains the next one (starting after recipient_cursor_*) so the audience
+    is never materialised at once.
+    """
+    CHANNEL_EMAIL = 'EMAIL'
+    CHANNEL_SMS = 'SMS'
+    CHANNEL_CHOICES = (
+        (CHANNEL_EMAIL, 'Email'),
+        (CHANNEL_SMS, 'SMS'),
+    )
+    STATUS_PENDING = 'PENDING'
+    STATUS_DISPATCHED = 'DISPATCHED'
+    STATUS_SENT = 'SENT'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DISPATCHED, 'Dispatched'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    notice = models.ForeignKey(Notice, on_delete=models.CASCADE, related_name='deliveries')
+    channel = models.CharField(max_length=5, choices=CHANNEL_CHOICES)
+    run = models.IntegerField(default=0, help_text="Delivery run of the notice on the channel.")
+    batch_index = models.IntegerField(default=0)
+    recipient_cursor_source = models.IntegerField(blank=True, null=True,
+                                                  help_text="Recipient source the batch starts after.")
+    recipient_cursor_id = models.BigIntegerField(blank=True, null=True,
+                                                 help_text="Recipient id the batch starts after.")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    recipient_count = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    next_attempt_at = models.DateTimeField(blank=True, null=True,
+                                           help_text="Not dispatched again before, after a failed attempt.")
+
+    class Meta:
+        db_table = 'tbl_noticeDeliveries'
+        constraints = [
+            models.UniqueConstraint(fields=['notice', 'channel', 'run', 'batch_index'],
+                                    name='notice_delivery_run_batch_uniq'),
+        ]
+        indexes = [
+            # Relay: rows waiting to be (re)dispatched, oldest first
+            models.Index(fields=['status', 'created_at'], name='notice_delivery_status_idx',
+                         condition=models.Q(status__in=['PENDING', 'DISPATCHED'])),
+        ]
+
+    @property
+    def recipient_cursor(self):
+        if self.recipient_cursor_source is None:
+            return None
+        return self.recipient_cursor_source, self.recipient_cursor_id
+
+
+class NoticeRecipientDelivery(models.Model):
+    """
+    Delivery status of a notice to one recipient, written in bulk by the batch of the outbox
+    (NoticeDelivery) that resolved the recipient.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_SENT = 'SENT'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    delivery = models.ForeignKey(NoticeDelivery, on_delete=models.CASCADE, related_name='recipients')
+    notice = models.ForeignKey(Notice, on_delete=models.CASCADE, related_name='recipient_deliveries')
+    channel = models.CharField(max_length=5, choices=NoticeDelivery.CHANNEL_CHOICES)
+    recipient_source = models.IntegerField()
+    recipient_id = models.BigIntegerField()
+    address = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'tbl_noticeRecipientDeliveries'
+        constraints = [
+            models.UniqueConstraint(fields=['delivery', 'recipient_source', 'recipient_id'],
+                                    name='notice_recipient_delivery_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['notice', 'channel', 'status'], name='notice_recipient_status_idx'),
+        ]
+
+
+class NoticeDeliveryStats(models.Model):
+    """
+    Per-notice delivery counters, kept up to date with F() increments as recipient statuses
+    change so that reading them never aggregates tbl_noticeRecipientDeliveries.
+    """
+    notice = models.OneToOneField(Notice, on_delete=models.CASCADE, primary_key=True,
+                                  related_name='delivery_stats')
+    email_pending = models.IntegerField(default=0)
+    email_sent = models.IntegerField(default=0)
+    email_failed = models.IntegerField(default=0)
+    sms_pending = models.IntegerField(default=0)
+    sms_sent = models.IntegerField(default=0)
+    sms_failed = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'tbl_noticeDeliveryStats'
+
+    @staticmethod
+    def counter(channel, status) -> str:
+        return f"{channel.lower()}_{status.lower()}"
+
+
+class NoticeReadMarker(models.Model):
+    """
+    Read receipt: a user has seen a notice. Markers only exist for notices the user can see,
+    they are dropped when the notice stops being visible.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(core_models.User, on_delete=models.CASCADE, related_name='+')
+    notice = models.ForeignKey(Notice, on_delete=models.CASCADE, related_name='read_markers')
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'tbl_noticeReadMarkers'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'notice'], name='notice_read_marker_uniq'),
+        ]
+        indexes = [
+            # Dropping the receipts of a notice leaving visibility
+            models.Index(fields=['notice'], name='notice_read_marker_notice_idx'),
+        ]
+
+
+class NoticeReadState(models.Model):
+    """
+    Number of read markers of a user, maintained with the markers so that the unread count is
+    the published notice count of the user scopes minus this counter.
+    """
+    user = models.OneToOneField(core_models.User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    read_count = models.IntegerField(default=0)
+    scopes = models.CharField(max_length=64, help_text="Visibility scopes read_count was counted in.")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'tbl_noticeReadStates'
+
+
+class NoticeSearchTerm(models.Model):
+    """
+    Inverted index of the notice texts for full-text search on databases other than
+    PostgreSQL (which uses the tsvector column maintained by a trigger instead).
+    """
+    id = models.BigAutoField(primary_key=True)
+    notice = models.ForeignKey(Notice, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    weight = models.IntegerField(default=1, help_text="Occurrences weighted by field: title 4, description 2, attachments 1.")
+
+    class Meta:
+        db_table = 'tbl_noticeSearchTerms'
+        constraints = [
+            # (term, notice) also serves the term prefix lookups of the searches
+            models.UniqueConstraint(fields=['term', 'notice'], name='notice_search_term_uniq'),
+        ]
+
+
+class NoticeScopeChange(models.Model):
+    """
+    Tombstone of a published notice retargeted away from an audience, so that the devices
+    syncing that audience drop it (notice.sync.notice_changes). Keeps the previous audience.
+    """
+    id = models.BigAutoField(primary_key=True)
+    notice = models.ForeignKey(Notice, on_delete=models.CASCADE, related_name='scope_changes')
+    health_facility = models.ForeignKey(
+        HealthFacility, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', null=True, blank=True)
+    audience_location = models.ForeignKey(
+        Location, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', null=True, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'tbl_noticeScopeChanges'
+        indexes = [
+            # (changed_at, id) keyset of the sync
+            models.Index(fields=['changed_at', 'id'], name='notice_scope_change_sync_idx'),
+        ]
+
 
 class NoticeMutation(core_models.UUIDModel, core_models.ObjectMutation):
     notice = models.ForeignKey(Notice, models.DO_NOTHING,
@@ -0,0 +1,138 @@
+import base64
+import json
+
+import graphene
+from core import ExtendedConnection
+from core.schema import OrderedDjangoFilterConnectionField
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from graphene.relay import PageInfo
+from graphene_django.utils import maybe_queryset
+from graphql.error import GraphQLError
+
+KEYSET_CURSOR_PREFIX = "keyset:"
+DEFAULT_PAGE_SIZE = 100
+
+
+class LazyCountConnection(ExtendedConnection):
+    """
+    ExtendedConnection whose totalCount is only computed when selected: keyset pages
+    don't know their total length and only COUNT the queryset on demand.
+    """
+
+    class Meta:
+        abstract = True
+
+    def resolve_total_count(root, info, **kwargs):
+        if root.length is None:
+            root.length = root.iterable.count()
+        return root.length
+
+
+class KeysetConnectionField(OrderedDjangoFilterConnectionField):
+    """
+    Connection field that, when queried with `keyset: true`, paginates on
+    (keyset_field, id) descending instead of offsets: cursors encode the key of the
+    edge and each page is an index range scan, whatever its depth.
+    orderBy is ignored in keyset mode.
+    """
+    keyset_field = None
+
+    def __init__(self, type, *args, **kwargs):
+        kwargs.setdefault("keyset", graphene.Boolean(
+            description="Paginate on (%s, id) cursors instead of offsets" % self.keyset_field))
+        super().__init__(type, *args, **kwargs)
+
+    @classmethod
+    def encode_cursor(cls, row):
+        key = [getattr(row, cls.keyset_field).isoformat(), row.id]
+        return base64.b64encode((KEYSET_CURSOR_PREFIX + json.dumps(key)).encode()).decode()
+
+    @classmethod
+    def decode_cursor(cls, cursor):
+        try:
+            value = base64.b64decode(cursor).decode()
+            if not value.startswith(KEYSET_CURSOR_PREFIX):
+                raise ValueError()
+            key, row_id = json.loads(value[len(KEYSET_CURSOR_PREFIX):])
+            # parse_datetime returns None on a malformed key, which the filter would not reject
+            key = parse_datetime(key)
+            if key is None:
+                raise ValueError()
+            return key, int(row_id)
+        except (ValueError, TypeError):
+            raise GraphQLError("Invalid keyset cursor")
+
+    @classmethod
+    def _older_than(cls, key, row_id):
+        return Q(**{f"{cls.keyset_field}__lt": key}) | Q(**{cls.keyset_field: key, "id__lt": row_id})
+
+    @classmethod
+    def _newer_than(cls, key, row_id):
+        return Q(**{f"{cls.keyset_field}__gt": key}) | Q(**{cls.keyset_field: key, "id__gt": row_id})
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        if not args.get("keyset"):
+            return super().resolve_connection(connection, args, iterable, max_limit=max_limit)
+        queryset = maybe_queryset(iterable)
+        first, last = args.get("first"), args.get("last")
+        after, before = args.get("after"), args.get("before")
+        backward = last is not None and first is None
+        if (first is not None and first < 0) or (last is not None and last < 0):
+            raise GraphQLError("first and last must not be negative")
+        limit = (last if backward else first) or max_limit or DEFAULT_PAGE_SIZE
+        if max_limit:
+            limit = min(limit, max_limit)
+
+        page = queryset
+        if after:
+            page = page.filter(cls._older_than(*cls.decode_cursor(after)))
+        if before:
+            page = page.filter(cls._newer_than(*cls.decode_cursor(before)))
+        if backward:
+            rows = list(page.order_by(cls.keyset_field, "id")[:limit + 1])
+        else:
+            rows = list(page.order_by(f"-{cls.keyset_field}", "-id")[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+
+        edges = [connection.Edge(node=row, cursor=cls.encode_cursor(row)) for row in rows]
+        result = connection(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=has_more if backward else bool(after),
+                has_next_page=bool(before) if backward else has_more,
+            ),
+        )
+        result.iterable = queryset
+        result.length = None
+        return result
+
+
+class NoticeConnectionField(KeysetConnectionField):
+    """
+    `notices` connection, with full-text `search` ranked by relevance (by recency in keyset mode).
+    """
+    keyset_field = "created_at"
+
+    def __init__(self, type, *args, **kwargs):
+        kwargs.setdefault("search", graphene.String(
+            description="Full-text search on title, description and attachment titles and filenames"))
+        super().__init__(type, *args, **kwargs)
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, *rest, **kwargs):
+        queryset = super().resolve_queryset(connection, iterable, info, args, *rest, **kwargs)
+        if args.get("search"):
+            from .search import search_notices
+            queryset = search_notices(queryset, args["search"], ranked=not args.get("keyset"))
+        return queryset
+
+
+class NoticeAttachmentConnectionField(KeysetConnectionField):
+    keyset_field = "validity_from"
@@ -0,0 +1,217 @@
+import io
+import logging
+from collections import deque
+
+from django.db import transaction
+from django.db.models import Q
+
+from .apps import NoticeConfig
+from .models import NoticeAttachment, NoticeBlob
+from .storage import get_attachment_storage
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_MIME = "image/jpeg"
+TASK_BATCH_SIZE = 50
+# seconds between the soft time limit of a preview task and the kill of its worker
+TASK_HARD_LIMIT_MARGIN = 30
+
+
+def preview_key(content_hash, max_size=None) -> str:
+    """
+    Storage key of the preview of a content: attachments sharing a content share its preview,
+    and a new `notice_preview_max_size` gives new previews.
+    """
+    max_size = max_size or NoticeConfig.notice_preview_max_size
+    return f"previews/{content_hash[:2]}/{content_hash}-{max_size}.jpg"
+
+
+def has_preview(mime) -> bool:
+    return bool(mime) and (mime == "application/pdf" or mime.startswith("image/"))
+
+
+def preview_status_for(attachment) -> str:
+    """
+    Preview status of an attachment whose content was just set.
+    """
+    if not attachment.storage_key:
+        return NoticeAttachment.PREVIEW_NONE
+    if not has_preview(attachment.mime):
+        return NoticeAttachment.PREVIEW_UNSUPPORTED
+    return NoticeAttachment.PREVIEW_PENDING
+
+
+def reset_attachment_preview(attachment):
+    """
+    Forget the preview of a saved attachment whose content changed and schedule the new one.
+    """
+    status = preview_status_for(attachment)
+    if attachment.preview_status != status or attachment.preview_key:
+        NoticeAttachment.objects.filter(id=attachment.id).update(preview_key=None, preview_status=status)
+        attachment.preview_key, attachment.preview_status = None, status
+    if status == NoticeAttachment.PREVIEW_PENDING:
+        schedule_attachment_previews([attachment.id])
+
+
+def _pdf_first_page(data, max_size):
+    try:
+        import pypdfium2
+    except ImportError:
+        logger.warning("PDF previews require the pypdfium2 package")
+        return None
+    pdf = pypdfium2.PdfDocument(data)
+    try:
+        page = pdf[0]
+        width, height = page.get_size()
+        image = page.render(scale=max_size / max(width, height, 1)).to_pil()
+        page.close()
+        return image
+    finally:
+        pdf.close()
+
+
+def render_preview(data: bytes, mime: str, max_size: int, quality: int = 80):
+    """
+    JPEG preview of a content fitting in max_size x max_size: the first page of a PDF or the
+    downscaled image. None when no preview can be made for the type. May run in a pool
+    process, so it only takes and returns plain values. Requires Pillow (and pypdfium2 for PDFs).
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Attachment previews require the Pillow package")
+        return None
+    if mime == "application/pdf":
+        image = _pdf_first_page(data, max_size)
+        if image is None:
+            return None
+    else:
+        image = Image.open(io.BytesIO(data))
+        # lets the JPEG decoder downscale while decoding
+        image.draft("RGB", (max_size, max_size))
+    image.thumbnail((max_size, max_size))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def _render_job(job):
+    data, mime, max_size, quality = job
+    try:
+        return render_preview(data, mime, max_size, quality), None
+    except Exception as exc:
+        return None, str(exc)
+
+
+def _render_contents(jobs, executor=None, window=1):
+    """
+    Render (content_hash, read) jobs in order, reading each content only when its render is
+    submitted, so that at most `window` contents are held in memory at once.
+    """
+    pending = deque()
+    for content_hash, read in jobs:
+        if executor is None:
+            yield content_hash, _render_job(read())
+            continue
+        pending.append((content_hash, executor.submit(_render_job, read())))
+        if len(pending) >= window:
+            content_hash, future = pending.popleft()
+            yield content_hash, future.result()
+    while pending:
+        content_hash, future = pending.popleft()
+        yield content_hash, future.result()
+
+
+def _attach_preview(content_hash, key, attachment_ids):
+    """
+    Point the given attachments, the other attachments showing a preview of the same content
+    and its blob to the preview, then delete the previous previews of the content (e.g. at an
+    older `notice_preview_max_size`) once committed.
+    """
+    with transaction.atomic():
+        previous = set(NoticeBlob.objects.select_for_update().filter(content_hash=content_hash)
+                       .values_list("preview_key", flat=True))
+        same_content = NoticeAttachment.objects.filter(
+            Q(id__in=attachment_ids) | Q(content_hash=content_hash, preview_key__isnull=False))
+        previous.update(same_content.values_list("preview_key", flat=True))
+        same_content.update(preview_key=key, preview_status=NoticeAttachment.PREVIEW_READY)
+        NoticeBlob.objects.filter(content_hash=content_hash).update(preview_key=key)
+        storage = get_attachment_storage()
+        for stale_key in previous - {key, None}:
+            transaction.on_commit(lambda stale_key=stale_key: storage.delete(stale_key))
+
+
+def generate_attachment_previews(attachment_ids, executor=None, window=None) -> dict:
+    """
+    Create the missing previews of the given attachments, once per content, rendering in
+    `executor` (e.g. a bounded ProcessPoolExecutor) or inline. Contents are read, rendered
+    and stored one at a time (`window` at a time with an executor, by default
+    `notice_preview_workers`). Previews already stored for the same content are reused.
+    Returns the number of attachments per resulting status.
+    """
+    storage = get_attachment_storage()
+    max_size, quality = NoticeConfig.notice_preview_max_size, NoticeConfig.notice_preview_quality
+    attachments = NoticeAttachment.objects.filter(id__in=list(attachment_ids), storage_key__isnull=False) \
+        .only("id", "content_hash", "storage_key", "mime", "size")
+    by_content = {}
+    for attachment in attachments:
+        by_content.setdefault(attachment.content_hash, []).append(attachment)
+
+    counts = {}
+
+    def _set_status(content_hash, status):
+        ids = [attachment.id for attachment in by_content[content_hash]]
+        if status == NoticeAttachment.PREVIEW_READY:
+            _attach_preview(content_hash, preview_key(content_hash, max_size), ids)
+        else:
+            NoticeAttachment.objects.filter(id__in=ids).update(preview_key=None, preview_status=status)
+        counts[status] = counts.get(status, 0) + len(ids)
+
+    jobs = []
+    for content_hash, same_content in by_content.items():
+        attachment = same_content[0]
+        mime = next((a.mime for a in same_content if has_preview(a.mime)), None)
+        if storage.exists(preview_key(content_hash, max_size)):
+            _set_status(content_hash, NoticeAttachment.PREVIEW_READY)
+        elif not mime or (attachment.size or 0) > NoticeConfig.notice_preview_max_source_size:
+            _set_status(content_hash, NoticeAttachment.PREVIEW_UNSUPPORTED)
+        else:
+            jobs.append((content_hash, lambda storage_key=attachment.storage_key, mime=mime: (
+                storage.read_bytes(storage_key), mime, max_size, quality)))
+
+    window = window or NoticeConfig.notice_preview_workers or 1
+    for content_hash, (preview, error) in _render_contents(jobs, executor, window):
+        if error:
+            logger.warning("Failed to render the preview of %s: %s", content_hash, error)
+            _set_status(content_hash, NoticeAttachment.PREVIEW_FAILED)
+        elif preview is None:
+            _set_status(content_hash, NoticeAttachment.PREVIEW_UNSUPPORTED)
+        else:
+            storage.put(preview_key(content_hash, max_size), io.BytesIO(preview))
+            _set_status(content_hash, NoticeAttachment.PREVIEW_READY)
+    return counts
+
+
+def schedule_attachment_previews(attachment_ids):
+    """
+    Generate the previews in Celery workers once the current transaction commits.
+    """
+    attachment_ids = [attachment_id for attachment_id in attachment_ids if attachment_id]
+    if not attachment_ids or not NoticeConfig.notice_preview_enabled:
+        return
+
+    def _dispatch():
+        from .tasks import generate_attachment_previews as task
+        for start in range(0, len(attachment_ids), TASK_BATCH_SIZE):
+            try:
+                # the hard limit kills a worker stuck in a native decoder, out of reach of the soft one
+                task.apply_async((attachment_ids[start:start + TASK_BATCH_SIZE],),
+                                 soft_time_limit=NoticeConfig.notice_preview_timeout,
+                                 time_limit=NoticeConfig.notice_preview_timeout + TASK_HARD_LIMIT_MARGIN)
+            except Exception:
+                # the attachments stay pending for the generate_attachment_previews command
+                logger.exception("Failed to schedule attachment previews")
+                return
+    transaction.on_commit(_dispatch)
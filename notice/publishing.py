@@ -0,0 +1,57 @@
+import logging
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .apps import NoticeConfig
+from .cache import notice_scope, visible_notice_cache
+from .events import EVENT_PUBLISHED, NoticeEvent, publish_notice_events
+from .models import Notice
+from .delivery import enqueue_notice_deliveries
+
+logger = logging.getLogger(__name__)
+
+
+def due_notices(now):
+    return Notice.objects.filter(
+        Q(publish_start_date__isnull=True) | Q(publish_start_date__lte=now),
+        published_at__isnull=True,
+        is_active=True,
+    )
+
+
+def publish_due_notices(batch_size=None, now=None, max_batches=None) -> int:
+    """
+    Publish the notices whose publish_start_date is reached, in batches of `batch_size`,
+    each committed on its own. Rows are locked with SKIP LOCKED (where supported) so several
+    schedulers can run concurrently without publishing a notice twice. The deliveries are
+    written to the outbox in the same transaction. Returns the number of published notices.
+    """
+    batch_size = batch_size or NoticeConfig.notice_publish_batch_size
+    now = now or timezone.now()
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    published, batches = 0, 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            rows = list(
+                due_notices(now)
+                .select_for_update(skip_locked=skip_locked)
+                .order_by("publish_start_date", "id")
+                .values_list("id", "uuid", "health_facility_id", "audience_location_id")[:batch_size]
+            )
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            scopes = {uuid: notice_scope(health_facility_id, location_id)
+                      for _, uuid, health_facility_id, location_id in rows}
+            Notice.objects.filter(id__in=ids).update(published_at=now, updated_at=now)
+            enqueue_notice_deliveries(ids, NoticeConfig.notice_delivery_publish_channels)
+            # published counts (unread badges) of the scopes change
+            visible_notice_cache.invalidate(scopes.values())
+            publish_notice_events(NoticeEvent(EVENT_PUBLISHED, uuid, scope, now) for uuid, scope in scopes.items())
+        published += len(ids)
+        batches += 1
+    if published:
+        logger.info("Published %s scheduled notices", published)
+    return published
@@ -0,0 +1,107 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+
+from .audience import audience_filter, facility_scopes
+from .cache import ALL_SCOPE, visible_notice_cache
+from .models import Notice, NoticeReadMarker, NoticeReadState
+
+READ_CHUNK_SIZE = 1000
+
+
+def _chunks(values, size=READ_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def reader_facility_id(user):
+    # TechnicalUsers don't have health_facility_id attribute
+    return getattr(getattr(user, "_u", None), "health_facility_id", None) if settings.ROW_SECURITY else None
+
+
+def reader_scopes(user):
+    """
+    Visibility scopes of a user: those of its facility, or every notice for users without
+    health facility (or without ROW_SECURITY).
+    """
+    health_facility_id = reader_facility_id(user)
+    if health_facility_id:
+        return facility_scopes(health_facility_id)
+    return [ALL_SCOPE]
+
+
+def readable_notices(user):
+    """
+    Published, active notices of the user scopes: the notices counted as read or unread.
+    """
+    notices = Notice.objects.filter(published_at__isnull=False, is_active=True)
+    health_facility_id = reader_facility_id(user)
+    if health_facility_id:
+        notices = notices.filter(audience_filter(health_facility_id))
+    return notices
+
+
+def _read_state(user, for_update=False):
+    scopes = ",".join(reader_scopes(user))
+    state, created = NoticeReadState.objects.get_or_create(user_id=user.id, defaults={"scopes": scopes})
+    if for_update:
+        state = NoticeReadState.objects.select_for_update().get(user_id=user.id)
+    if not created and state.scopes != scopes:
+        # the user moved to another facility: drop the receipts outside the new scopes, recount once
+        markers = NoticeReadMarker.objects.filter(user_id=user.id)
+        markers.exclude(notice__in=readable_notices(user)).delete()
+        state.read_count = markers.count()
+        state.scopes = scopes
+        state.save(update_fields=["read_count", "scopes", "updated_at"])
+    return state
+
+
+def unread_notice_count(user) -> int:
+    """
+    Published notice count of the user scopes (cached per scope) minus the user read counter:
+    two cache lookups and a primary key read, whatever the number of receipts.
+    """
+    total = sum(visible_notice_cache.scope_published_count(scope) for scope in reader_scopes(user))
+    return max(total - _read_state(user).read_count, 0)
+
+
+def mark_notices_read(user, uuids=None) -> int:
+    """
+    Mark the given notices (all readable notices when None) as read by the user, ignoring the
+    ones not visible to the user or already read. Returns the number of new read markers.
+    """
+    with transaction.atomic():
+        # locking the user state serialises concurrent marks, keeping the counter exact
+        _read_state(user, for_update=True)
+        unread = readable_notices(user).exclude(
+            id__in=NoticeReadMarker.objects.filter(user_id=user.id).values("notice_id"))
+        if uuids is None:
+            ids = list(unread.values_list("id", flat=True))
+        else:
+            ids = []
+            for chunk in _chunks(list(dict.fromkeys(uuids))):
+                ids.extend(unread.filter(uuid__in=chunk).values_list("id", flat=True))
+        NoticeReadMarker.objects.bulk_create(
+            [NoticeReadMarker(user_id=user.id, notice_id=notice_id) for notice_id in ids],
+            batch_size=READ_CHUNK_SIZE)
+        if ids:
+            NoticeReadState.objects.filter(user_id=user.id).update(read_count=F("read_count") + len(ids))
+    return len(ids)
+
+
+def forget_notice_reads(notice_ids):
+    """
+    Drop the read markers of notices leaving visibility (deactivated, deleted, archived or moved
+    to another facility) and take them off their readers' counters, set-based.
+    """
+    for chunk in _chunks(list(notice_ids)):
+        markers = NoticeReadMarker.objects.filter(notice_id__in=chunk)
+        readers = defaultdict(list)
+        for row in markers.order_by().values("user_id").annotate(count=Count("id")):
+            readers[row["count"]].append(row["user_id"])
+        for count, user_ids in readers.items():
+            for users in _chunks(user_ids):
+                NoticeReadState.objects.filter(user_id__in=users).update(read_count=F("read_count") - count)
+        markers.delete()
@@ -0,0 +1,106 @@
+from collections import namedtuple
+from itertools import islice
+
+from core.models import InteractiveUser
+from django.db.models import Q
+from location.models import HealthFacility, UserDistrict
+
+from .apps import NoticeConfig
+from .audience import facility_location_ids, location_ancestor_ids, location_descendant_ids
+
+CHANNEL_EMAIL = "EMAIL"
+CHANNEL_SMS = "SMS"
+
+# key is (source index, row id): recipients are streamed in key order, so a key is
+# enough to resume the stream right after a given recipient.
+Recipient = namedtuple("Recipient", ["key", "name", "email", "phone"])
+
+
+def _contact_filter(channel, email_field="email", phone_field="phone"):
+    if channel == CHANNEL_EMAIL:
+        return Q(**{f"{email_field}__isnull": False}) & ~Q(**{email_field: ""})
+    if channel == CHANNEL_SMS:
+        return Q(**{f"{phone_field}__isnull": False}) & ~Q(**{phone_field: ""})
+    return Q()
+
+
+def _user_rows(queryset, channel):
+    return queryset.filter(_contact_filter(channel)) \
+        .values_list("id", "last_name", "other_names", "email", "phone")
+
+
+def _location_user_rows(location_ids, excluded_facilities, channel):
+    """
+    Users assigned to one of `location_ids`, except those of the facilities already reached.
+    """
+    return UserDistrict.objects \
+        .filter(validity_to__isnull=True, location_id__in=location_ids, user__validity_to__isnull=True) \
+        .exclude(user__health_facility_id__in=excluded_facilities) \
+        .filter(_contact_filter(channel, "user__email", "user__phone")) \
+        .values_list("user_id", "user__last_name", "user__other_names", "user__email", "user__phone") \
+        .distinct()
+
+
+def _sources(notice, channel):
+    """
+    Ordered querysets of (id, last name, other names, email, phone) rows making up the audience.
+    A national notice goes to every user and facility; a facility notice goes to the facility
+    itself, its users and the users assigned to its district/region; a region or district notice
+    goes to the facilities below that location, their users and the users assigned to the
+    location, the locations below it or above it.
+    """
+    active_users = InteractiveUser.objects.filter(validity_to__isnull=True)
+    if notice.health_facility_id is None and notice.audience_location_id is None:
+        return [
+            _user_rows(active_users, channel),
+            HealthFacility.objects.filter(validity_to__isnull=True).filter(_contact_filter(channel))
+            .values_list("id", "code", "name", "email", "phone"),
+        ]
+    if notice.health_facility_id is None:
+        location_ids = location_descendant_ids(notice.audience_location_id)
+        facilities = HealthFacility.objects.filter(validity_to__isnull=True, location_id__in=location_ids)
+        return [
+            facilities.filter(_contact_filter(channel)).values_list("id", "code", "name", "email", "phone"),
+            _user_rows(active_users.filter(health_facility__in=facilities), channel),
+            _location_user_rows(location_ids + location_ancestor_ids(notice.audience_location_id),
+                                facilities.values("id"), channel),
+        ]
+    health_facility_id = notice.health_facility_id
+    return [
+        HealthFacility.objects.filter(id=health_facility_id).filter(_contact_filter(channel))
+        .values_list("id", "code", "name", "email", "phone"),
+        _user_rows(active_users.filter(health_facility_id=health_facility_id), channel),
+        _location_user_rows(facility_location_ids(health_facility_id), [health_facility_id], channel),
+    ]
+
+
+def iter_notice_recipients(notice, channel=None, after=None, chunk_size=None):
+    """
+    Stream the recipients of a notice, restricted to those reachable on `channel` (EMAIL, SMS
+    or any when None). Rows are fetched with server-side cursors (where the database supports
+    them) `chunk_size` at a time, so memory stays constant whatever the audience size.
+    `after` is the key of the last recipient already handled.
+    """
+    chunk_size = chunk_size or NoticeConfig.notice_recipient_chunk_size
+    for index, rows in enumerate(_sources(notice, channel)):
+        id_field = rows.query.values_select[0]
+        if after is not None:
+            if index < after[0]:
+                continue
+            if index == after[0]:
+                rows = rows.filter(**{f"{id_field}__gt": after[1]})
+        for row_id, last_name, other_names, email, phone in rows.order_by(id_field).iterator(chunk_size=chunk_size):
+            name = " ".join(part for part in (other_names, last_name) if part)
+            yield Recipient((index, row_id), name, email, phone)
+
+
+def iter_recipient_batches(notice, batch_size, channel=None, after=None):
+    """
+    Recipients of a notice grouped in lists of at most `batch_size`.
+    """
+    recipients = iter_notice_recipients(notice, channel=channel, after=after)
+    while True:
+        batch = list(islice(recipients, batch_size))
+        if not batch:
+            return
+        yield batch
@@ -5,29 +5,65 @@ from core.schema import OrderedDjangoFilterConnectionField
 from core import filter_validity
 from django.conf import settings
 from django.utils.translation import gettext as _
-from django.core.exceptions import PermissionDenied
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied, ValidationError
+from graphql.error import GraphQLError
 from .gql_queries import *
 from .gql_mutations import CreateNoticeMutation, UpdateNoticeMutation, DeleteNoticeMutation, \
                  ToggleNoticeStatusMutation, SendNoticeEmailMutation, SendNoticeSMSMutation,\
                     CreateNoticeAttachmentMutation, UpdateNoticeAttachmentMutation, \
-                     DeleteNoticeAttachmentMutation
+                     DeleteNoticeAttachmentMutation, CreateNoticesBulkMutation, UpdateNoticesBulkMutation, \
+                      MarkNoticesReadMutation, chunked
 from .models import NoticeMutation
+from .pagination import NoticeConnectionField, NoticeAttachmentConnectionField
+from .services import visible_notice_attachments
+from .reads import unread_notice_count
+from .sync import notice_changes
 from core.schema import signal_mutation_module_validate
 from graphene import ObjectType, List
 
 
 class Query(graphene.ObjectType):
-    notices = OrderedDjangoFilterConnectionField(
+    notices = NoticeConnectionField(
         NoticeGQLType,
     )
-    notice_attachments = OrderedDjangoFilterConnectionField(
+    notice_attachments = NoticeAttachmentConnectionField(
             NoticeAttachmentGQLType,
             orderBy=graphene.List(of_type=graphene.String),
         )    
-    def resolve_notice_attachments(self, info, **kwargs):
-        if not info.context.user.has_perms("notice.view_notice_attachment"):
+    archived_notices = OrderedDjangoFilterConnectionField(
+        NoticeArchiveGQLType,
+        orderBy=graphene.List(of_type=graphene.String),
+    )
+    unread_notice_count = graphene.Int()
+    notices_changed_since = graphene.Field(
+        NoticeChangesGQLType,
+        cursor=graphene.String(description="Cursor returned by the previous sync, none for a first sync"),
+        first=graphene.Int(),
+    )
+
+    def resolve_notices_changed_since(self, info, cursor=None, first=None):
+        user = info.context.user
+        if isinstance(user, AnonymousUser) or not user.id:
+            raise PermissionDenied("Unauthorized")
+        try:
+            return notice_changes(user, cursor, first)
+        except ValidationError as exc:
+            raise GraphQLError("; ".join(exc.messages))
+
+    def resolve_unread_notice_count(self, info):
+        user = info.context.user
+        if isinstance(user, AnonymousUser) or not user.id:
             raise PermissionDenied("Unauthorized")
-        queryset = NoticeAttachment.objects.filter(*filter_validity())
+        return unread_notice_count(user)
+
+    def resolve_archived_notices(self, info, **kwargs):
+        if not info.context.user.has_perms(["notice.view_notice"]):
+            raise PermissionDenied("Unauthorized")
+        return NoticeArchive.objects.all()
+
+    def resolve_notice_attachments(self, info, **kwargs):
+        queryset = visible_notice_attachments(info.context.user)
         if "notice_Uuid" in kwargs:
             queryset = queryset.filter(notice__uuid=kwargs["notice_Uuid"])
         return queryset
@@ -42,6 +78,9 @@ class Mutation(graphene.ObjectType):
     create_notice_attachment = CreateNoticeAttachmentMutation.Field()
     update_notice_attachment = UpdateNoticeAttachmentMutation.Field()
     delete_notice_attachment = DeleteNoticeAttachmentMutation.Field()
+    create_notices_bulk = CreateNoticesBulkMutation.Field()
+    update_notices_bulk = UpdateNoticesBulkMutation.Field()
+    mark_notices_read = MarkNoticesReadMutation.Field()
 
 
 def on_notice_mutation(**kwargs):
@@ -52,13 +91,14 @@ def on_notice_mutation(**kwargs):
     if not uuids:
         return []  # No notices impacted
 
-    impacted_notices = Notice.objects.filter(uuid__in=uuids).all()
-    for notice in impacted_notices:
-        NoticeMutation.objects.create(
-            notice=notice,
-            mutation_id=kwargs["mutation_log_id"]
-        )
-    
+    notice_ids = []
+    for chunk in chunked(list(uuids)):
+        notice_ids.extend(Notice.objects.filter(uuid__in=chunk).values_list("id", flat=True))
+    NoticeMutation.objects.bulk_create([
+        NoticeMutation(notice_id=notice_id, mutation_id=kwargs["mutation_log_id"])
+        for notice_id in notice_ids
+    ])
+
     return []  # Return empty list (consistent with signal expectations)
 
 def bind_signals():
@@ -0,0 +1,127 @@
+import re
+from collections import Counter
+
+from django.db import connection
+from django.db.models import IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+TERM_MAX_LENGTH = 64
+# Weights of the fallback index, in the order of the tsvector weights A, B and C
+TITLE_WEIGHT, DESCRIPTION_WEIGHT, ATTACHMENT_WEIGHT = 4, 2, 1
+# Kept in sync with the trigger of migration 0013
+SEARCH_CONFIG = "simple"
+
+
+def uses_tsvector() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def tokenize(text):
+    """
+    Lowercase words of a text, split on anything but letters and digits.
+    """
+    return [term[:TERM_MAX_LENGTH] for term in re.findall(r"[^\W_]+", (text or "").lower())]
+
+
+def attachment_search_text(attachments):
+    """
+    Searchable text of (title, filename) pairs: filenames are split into words so that
+    `annual_report-2024.pdf` is found by `report` on every backend.
+    """
+    return " ".join(" ".join(tokenize(value)) for attachment in attachments for value in attachment if value)
+
+
+def notice_terms(title, description, search_attachments):
+    """
+    Weighted terms of a notice for the fallback index: {term: weight}.
+    """
+    weights = Counter()
+    for text, weight in ((title, TITLE_WEIGHT), (description, DESCRIPTION_WEIGHT),
+                         (search_attachments, ATTACHMENT_WEIGHT)):
+        for term in tokenize(text):
+            weights[term] += weight
+    return weights
+
+
+def index_notice_terms(notice_ids):
+    """
+    Rebuild the fallback index of the given notices. No-op on PostgreSQL, where the search
+    vector is maintained by the database.
+    """
+    from .models import Notice, NoticeSearchTerm
+    if uses_tsvector() or not notice_ids:
+        return
+    notices = Notice.objects.filter(id__in=notice_ids).values_list(
+        "id", "title", "description", "search_attachments")
+    NoticeSearchTerm.objects.filter(notice_id__in=notice_ids).delete()
+    NoticeSearchTerm.objects.bulk_create([
+        NoticeSearchTerm(notice_id=notice_id, term=term, weight=weight)
+        for notice_id, title, description, search_attachments in notices
+        for term, weight in notice_terms(title, description, search_attachments).items()
+    ], batch_size=1000)
+
+
+def update_attachment_search(notice_ids, reindex_all=False):
+    """
+    Refresh the attachment text and updated_at of the given notices after their attachments
+    changed, then the search index of the changed ones (of all of them with `reindex_all`,
+    when their own texts were written without post_save).
+    """
+    from .models import Notice, NoticeAttachment
+    notice_ids = list(set(notice_ids))
+    if not notice_ids:
+        return
+    attachments = {notice_id: [] for notice_id in notice_ids}
+    for notice_id, title, filename in NoticeAttachment.objects.filter(notice_id__in=notice_ids) \
+            .order_by("id").values_list("notice_id", "title", "filename"):
+        attachments[notice_id].append((title, filename))
+    notices = list(Notice.objects.filter(id__in=notice_ids).only("id", "search_attachments"))
+    changed = []
+    for notice in notices:
+        text = attachment_search_text(attachments[notice.id])
+        if notice.search_attachments != text:
+            notice.search_attachments = text
+            changed.append(notice)
+    # bulk_update sends no post_save: the cached scopes are left untouched
+    Notice.objects.bulk_update(changed, ["search_attachments"])
+    # the attachment metadata of the notices is part of the incremental sync
+    Notice.objects.filter(id__in=notice_ids).update(updated_at=timezone.now())
+    index_notice_terms(notice_ids if reindex_all else [notice.id for notice in changed])
+
+
+def search_notices(queryset, query, ranked=True):
+    """
+    Notices matching every word of `query` (as a prefix) in their title, description or
+    attachment titles and filenames. When `ranked`, they are annotated with `search_rank`
+    and ordered by relevance (title matches first), newest first among equals.
+    PostgreSQL uses the GIN-indexed tsvector column, other databases the term index.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return queryset
+    table = queryset.model._meta.db_table
+    if uses_tsvector():
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        queryset = queryset.extra(
+            where=[f"\"{table}\".\"search_vector\" @@ to_tsquery('{SEARCH_CONFIG}', %s)"], params=[tsquery])
+        if ranked:
+            queryset = queryset.annotate(search_rank=RawSQL(
+                f"ts_rank(\"{table}\".\"search_vector\", to_tsquery('{SEARCH_CONFIG}', %s))", [tsquery]))
+    else:
+        from .models import NoticeSearchTerm
+        for term in terms:
+            queryset = queryset.filter(
+                id__in=NoticeSearchTerm.objects.filter(term__startswith=term).values("notice_id"))
+        if ranked:
+            matches = Q()
+            for term in terms:
+                matches |= Q(term__startswith=term)
+            rank = NoticeSearchTerm.objects.filter(matches, notice=OuterRef("pk")) \
+                .order_by().values("notice").annotate(rank=Sum("weight")).values("rank")
+            queryset = queryset.annotate(
+                search_rank=Coalesce(Subquery(rank, output_field=IntegerField()), 0))
+    if ranked:
+        queryset = queryset.order_by("-search_rank", "-created_at", "-id")
+    return queryset
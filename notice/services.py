@@ -1,10 +1,183 @@
-from django.core.mail import send_mail
+import logging
+import random
+import smtplib
+import threading
+import time
+from collections import namedtuple
+
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.utils.html import escape
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ValidationError, PermissionDenied
+from core import filter_validity
+
+from .apps import NoticeConfig
+from .models import NoticeAttachment
+
+logger = logging.getLogger(__name__)
+
+
+def visible_notice_attachments(user):
+    """
+    Attachments the user is allowed to read, shared by the GraphQL query and the download view.
+
+    Raises:
+        PermissionDenied: If the user lacks the attachment view permission.
+    """
+    if not user.has_perms("notice.view_notice_attachment"):
+        raise PermissionDenied("Unauthorized")
+    return NoticeAttachment.objects.filter(*filter_validity())
+
+
+# Inline HTML email template, rendered once per notice
+NOTICE_EMAIL_HTML_TEMPLATE = """
+<!doctype html>
+<html>
+  <head>
+    <meta http-equiv="Content-Type" content="text/html; charset=UTF-8">
+  </head>
+  <body style="font-family: sans-serif;">
+    <div style="display: block; margin: auto; max-width: 600px;" class="main">
+      <h1 style="font-size: 18px; font-weight: bold; margin-top: 20px">{title}</h1>
+      <p>{description}</p>
+      <p><strong>Priority:</strong> {priority}</p>
+    </div>
+    <style>
+      .main {{ background-color: white; }}
+    </style>
+  </body>
+</html>
+"""
+
+# SMTP replies meaning "slow down / try again later"
+THROTTLING_SMTP_CODES = {421, 450, 451, 452}
+
+RenderedNoticeEmail = namedtuple("RenderedNoticeEmail", ["subject", "text", "html"])
+EmailDispatchResult = namedtuple("EmailDispatchResult", ["sent", "failed"])
+
+
+def render_notice_email(title: str, description: str, priority: str) -> RenderedNoticeEmail:
+    """
+    Render the subject, plain text and HTML bodies of a notice email with sanitized values.
+    """
+    html = NOTICE_EMAIL_HTML_TEMPLATE.format(
+        title=escape(title),
+        description=escape(description),
+        priority=escape(priority)
+    )
+    return RenderedNoticeEmail(f"Notice: {title}", description, html)
+
+
+_worker_connection = threading.local()
+
+
+def get_worker_email_connection():
+    """
+    Email backend connection kept open for the lifetime of the worker thread, so consecutive
+    deliveries reuse one SMTP session instead of connecting for every notice.
+    """
+    connection = getattr(_worker_connection, "connection", None)
+    if connection is None:
+        connection = get_connection(fail_silently=False)
+        _worker_connection.connection = connection
+    return connection
 
-def send_notice_email(recipients: list, title: str, description: str, priority: str) -> None:
+
+class _TrackedMessages:
+    """
+    Messages handed to a backend's send_messages, counting how many it took: when it raises,
+    the last message taken is the failing one and the ones before it were sent.
+    """
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.taken = 0
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __iter__(self):
+        for message in self.messages:
+            self.taken += 1
+            yield message
+
+
+class NoticeEmailDispatcher:
+    """
+    Send a rendered notice as one message per recipient, in batches of `batch_size` handed
+    to a single send_messages call over one open connection. Throttling replies (and dropped
+    connections) are retried from the failing message with exponential backoff and jitter,
+    other failures are reported per recipient.
+    """
+
+    def __init__(self, connection=None, batch_size=None, max_retries=None, backoff=None, from_email=None):
+        self.connection = connection or get_worker_email_connection()
+        self.batch_size = batch_size or NoticeConfig.notice_email_batch_size
+        self.max_retries = NoticeConfig.notice_email_max_retries if max_retries is None else max_retries
+        self.backoff = NoticeConfig.notice_email_backoff_seconds if backoff is None else backoff
+        self.from_email = from_email or NoticeConfig.notice_email_from
+
+    def _message(self, rendered, recipient):
+        message = EmailMultiAlternatives(
+            rendered.subject, rendered.text, self.from_email, [recipient], connection=self.connection)
+        message.attach_alternative(rendered.html, "text/html")
+        return message
+
+    @staticmethod
+    def _is_throttling(exc):
+        return isinstance(exc, (smtplib.SMTPServerDisconnected, ConnectionError)) or \
+            (isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code in THROTTLING_SMTP_CODES)
+
+    def _send_batch(self, messages) -> dict:
+        """
+        Send the messages with one send_messages call, calling it again on the rest after a
+        failure. Returns the errors by index of the failed messages.
+        """
+        failed, start, attempt = {}, 0, 0
+        while start < len(messages):
+            batch = _TrackedMessages(messages[start:])
+            try:
+                self.connection.open()
+                self.connection.send_messages(batch)
+                break
+            except Exception as exc:
+                throttling = self._is_throttling(exc)
+                if throttling:
+                    self.connection.close()
+                if batch.taken > 1:
+                    attempt = 0
+                if throttling and attempt < self.max_retries:
+                    # resume from the failing message, the ones before it were sent
+                    start += max(batch.taken - 1, 0)
+                    time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+                    attempt += 1
+                elif not batch.taken:
+                    # no message was sent (e.g. the connection could not be opened)
+                    failed.update((index, exc) for index in range(start, len(messages)))
+                    break
+                else:
+                    failed[start + batch.taken - 1] = exc
+                    start += batch.taken
+                    attempt = 0
+        return failed
+
+    def send(self, recipients, rendered: RenderedNoticeEmail) -> EmailDispatchResult:
+        sent, failed = [], []
+        for start in range(0, len(recipients), self.batch_size):
+            batch = recipients[start:start + self.batch_size]
+            errors = self._send_batch([self._message(rendered, recipient) for recipient in batch])
+            for index, recipient in enumerate(batch):
+                if index in errors:
+                    logger.warning("Failed to email notice to %s: %s", recipient, errors[index])
+                    failed.append((recipient, str(errors[index])))
+                else:
+                    sent.append(recipient)
+        return EmailDispatchResult(sent, failed)
+
+
+def send_notice_email(recipients: list, title: str, description: str, priority: str) -> EmailDispatchResult:
     """
     Send a notice email to the specified recipients with the given title, description, and priority.
+    The notice is rendered once and sent as one message per recipient, in batches over a reused connection.
 
     Args:
         recipients (list): List of email addresses of the recipients.
@@ -12,52 +185,13 @@ def send_notice_email(recipients: list, title: str, description: str, priority:
         description (str): The description of the notice.
         priority (str): The priority of the notice.
 
-    Raises:
-        ValidationError: If no valid recipients are provided or email sending fails.
-    """
-    try:
-        if not recipients:
-            raise ValidationError("No valid recipients provided")
-
-        # Define the HTML email template inline
-        html_template = """
-        <!doctype html>
-        <html>
-          <head>
-            <meta http-equiv="Content-Type" content="text/html; charset=UTF-8">
-          </head>
-          <body style="font-family: sans-serif;">
-            <div style="display: block; margin: auto; max-width: 600px;" class="main">
-              <h1 style="font-size: 18px; font-weight: bold; margin-top: 20px">{title}</h1>
-              <p>{description}</p>
-              <p><strong>Priority:</strong> {priority}</p>
-            </div>
-            <style>
-              .main {{ background-color: white; }}
-            </style>
-          </body>
-        </html>
-        """
+    Returns:
+        EmailDispatchResult: The recipients emailed and the (recipient, error) pairs that failed.
 
-        # Replace placeholders with sanitized values
-        html_message = html_template.format(
-            title=escape(title),
-            description=escape(description),
-            priority=escape(priority)
-        )
-
-        # Prepare email content
-        subject = f"Notice: {title}"
-        message = description  # Plain text fallback
-
-        # Send email to all recipients
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email="no-reply@openimis.org",
-            recipient_list=recipients,
-            html_message=html_message,
-            fail_silently=False,
-        )
-    except Exception as exc:
-        raise ValidationError(f"Failed to send email: {str(exc)}")
\ No newline at end of file
+    Raises:
+        ValidationError: If no valid recipients are provided.
+    """
+    recipients = [recipient for recipient in recipients if recipient]
+    if not recipients:
+        raise ValidationError("No valid recipients provided")
+    return NoticeEmailDispatcher().send(recipients, render_notice_email(title, description, priority))
@@ -0,0 +1,98 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from location.models import HealthFacility, Location
+
+from .audience import invalidate_facility_locations
+from .blobs import add_blob_references, release_blob_references
+from .cache import notice_scope, visible_notice_cache
+from .events import EVENT_DELETED, is_visible, notice_change_events, notice_event, publish_notice_events
+from .models import Notice, NoticeAttachment
+from .previews import reset_attachment_preview
+from .reads import forget_notice_reads
+from .search import index_notice_terms, update_attachment_search
+from .sync import record_scope_changes
+
+
+@receiver(post_init, sender=Notice)
+def remember_notice_scope(sender, instance, **kwargs):
+    # Keep the loaded scope so a retargeted notice also leaves its previous scope, and whether
+    # it was visible to tell published from updated notices. Read from __dict__ so that
+    # deferred fields are not loaded one query per instance.
+    loaded = instance.__dict__
+    instance._loaded_audience = (loaded.get("health_facility_id"), loaded.get("audience_location_id"))
+    instance._loaded_scope = notice_scope(*instance._loaded_audience)
+    instance._loaded_visible = bool(loaded.get("is_active") and loaded.get("published_at"))
+
+
+@receiver(post_save, sender=Notice)
+@receiver(post_delete, sender=Notice)
+def publish_notice_change(sender, instance, **kwargs):
+    # registered before invalidate_notice_visibility, which resets the loaded state
+    was_visible = not kwargs.get("created", False) and getattr(instance, "_loaded_visible", False)
+    scope = notice_scope(instance.health_facility_id, instance.audience_location_id)
+    previous_scope = getattr(instance, "_loaded_scope", scope)
+    if kwargs.get("signal") is post_delete:
+        events = [notice_event(EVENT_DELETED, instance, previous_scope)] if was_visible else []
+    else:
+        events = notice_change_events(instance, was_visible, previous_scope)
+    publish_notice_events(events)
+
+
+@receiver(post_save, sender=Notice)
+def record_notice_scope_change(sender, instance, **kwargs):
+    # registered before invalidate_notice_visibility, which resets the loaded state
+    if not kwargs.get("created", False):
+        record_scope_changes([instance])
+
+
+@receiver(post_save, sender=Notice)
+@receiver(post_delete, sender=Notice)
+def invalidate_notice_visibility(sender, instance, **kwargs):
+    scopes = {notice_scope(instance.health_facility_id, instance.audience_location_id)}
+    if not kwargs.get("created", False):
+        scopes.add(getattr(instance, "_loaded_scope", next(iter(scopes))))
+    visible_notice_cache.invalidate(scopes)
+    if kwargs.get("signal") is post_save and not kwargs.get("created", False) and \
+            (len(scopes) > 1 or not instance.is_active):
+        # deactivated or retargeted: its readers may not see it anymore
+        forget_notice_reads([instance.pk])
+    instance._loaded_audience = (instance.health_facility_id, instance.audience_location_id)
+    instance._loaded_scope = notice_scope(*instance._loaded_audience)
+    instance._loaded_visible = is_visible(instance)
+
+
+@receiver(post_save, sender=Notice)
+def index_notice_search(sender, instance, **kwargs):
+    # PostgreSQL maintains the search vector with a trigger, this only feeds the fallback index
+    index_notice_terms([instance.pk])
+
+
+@receiver(post_save, sender=NoticeAttachment)
+def index_attachment_search(sender, instance, **kwargs):
+    # deletions are handled by the mutations: a receiver would run once per row of a cascade
+    update_attachment_search([instance.notice_id])
+
+
+@receiver(post_init, sender=NoticeAttachment)
+def remember_attachment_content(sender, instance, **kwargs):
+    instance._loaded_content_hash = instance.__dict__.get("content_hash")
+
+
+@receiver(post_save, sender=NoticeAttachment)
+def track_attachment_content(sender, instance, **kwargs):
+    # like the search index, released explicitly on deletion and counted by the bulk paths
+    previous = None if kwargs.get("created", False) else getattr(instance, "_loaded_content_hash", None)
+    if previous != instance.content_hash:
+        release_blob_references([previous])
+        add_blob_references([instance.content_hash])
+        reset_attachment_preview(instance)
+    instance._loaded_content_hash = instance.content_hash
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=HealthFacility)
+@receiver(post_delete, sender=HealthFacility)
+def invalidate_notice_audience_locations(sender, instance, **kwargs):
+    # the facility -> district/region lookup behind location targeted notices
+    invalidate_facility_locations()
@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.utils.module_loading import import_string
+
+from .apps import NoticeConfig
+
+logger = logging.getLogger(__name__)
+
+SMSMessage = namedtuple("SMSMessage", ["to", "text", "idempotency_key"])
+SMSResult = namedtuple("SMSResult", ["to", "success", "error"])
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def idempotency_key(notice_uuid, phone, run=0) -> str:
+    """
+    Stable key of the delivery of a notice to a phone number in a delivery run, so that a
+    retried request (or a retried batch) is not sent twice by gateways honouring idempotency
+    keys, while a new run (the notice sent again) is.
+    """
+    return hashlib.sha256(f"{notice_uuid}:{run}:{phone}".encode()).hexdigest()[:32]
+
+
+class BaseSMSBackend:
+    """
+    SMS delivery backend: sends a list of messages and returns one SMSResult per message.
+    """
+
+    def send_messages(self, messages):
+        raise NotImplementedError()
+
+
+class LocMemSMSBackend(BaseSMSBackend):
+    """
+    In-process stand-in for tests and development: messages are kept in `LocMemSMSBackend.outbox`.
+    """
+    outbox = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def send_messages(self, messages):
+        LocMemSMSBackend.outbox.extend(messages)
+        return [SMSResult(message.to, True, None) for message in messages]
+
+
+class HttpSMSBackend(BaseSMSBackend):
+    """
+    HTTP SMS gateway client using a pooled session. Uses the gateway bulk endpoint when
+    `bulk_url` is configured, otherwise posts single messages with at most `max_workers`
+    concurrent requests. Failed requests (network errors, 429 and 5xx) are retried with
+    jittered exponential backoff, each request carrying an Idempotency-Key header.
+    """
+
+    def __init__(self, url=None, bulk_url=None, api_key=None, sender_id=None, timeout=10,
+                 max_workers=8, max_retries=3, backoff=0.5, bulk_size=100):
+        self.url = url or os.getenv("SMS_GATEWAY_URL", "https://api.smsgateway.example.com/send")
+        self.bulk_url = bulk_url or os.getenv("SMS_GATEWAY_BULK_URL")
+        self.api_key = api_key or os.getenv("SMS_GATEWAY_API_KEY", "your-api-key")
+        self.sender_id = sender_id or os.getenv("SMS_GATEWAY_SENDER_ID", "OpenIMIS")
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.bulk_size = bulk_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, url, payload, key):
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, headers={"Idempotency-Key": key})
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                error = f"SMS gateway returned status {response.status_code}: {response.text}"
+                retry_after = response.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                error, retry_after = str(exc), None
+            if attempt >= self.max_retries:
+                raise Exception(error)
+            delay = float(retry_after) if retry_after and retry_after.isdigit() \
+                else random.uniform(0, self.backoff * (2 ** attempt))
+            time.sleep(delay)
+            attempt += 1
+
+    def _send_one(self, message):
+        try:
+            response = self._post(self.url, {
+                "api_key": self.api_key,
+                "to": message.to,
+                "message": message.text,
+                "from": self.sender_id,
+            }, message.idempotency_key)
+            if response.status_code != 200:
+                raise Exception(f"SMS gateway returned status {response.status_code}: {response.text}")
+            response_data = response.json()
+            if not response_data.get("success", False):
+                raise Exception(f"SMS gateway error: {response_data.get('error', 'Unknown error')}")
+            return SMSResult(message.to, True, None)
+        except Exception as exc:
+            return SMSResult(message.to, False, str(exc))
+
+    def _send_bulk(self, messages):
+        key = hashlib.sha256("".join(message.idempotency_key for message in messages).encode()).hexdigest()[:32]
+        try:
+            response = self._post(self.bulk_url, {
+                "api_key": self.api_key,
+                "from": self.sender_id,
+                "messages": [
+                    {"to": message.to, "message": message.text, "idempotency_key": message.idempotency_key}
+                    for message in messages
+                ],
+            }, key)
+            if response.status_code != 200:
+                raise Exception(f"SMS gateway returned status {response.status_code}: {response.text}")
+            response_data = response.json()
+        except Exception as exc:
+            return [SMSResult(message.to, False, str(exc)) for message in messages]
+        results = {item.get("to"): item for item in response_data.get("results", [])}
+        return [
+            SMSResult(message.to, results.get(message.to, response_data).get("success", False),
+                      results.get(message.to, response_data).get("error"))
+            for message in messages
+        ]
+
+    def send_messages(self, messages):
+        if not messages:
+            return []
+        if self.bulk_url:
+            batches = [messages[i:i + self.bulk_size] for i in range(0, len(messages), self.bulk_size)]
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                return [result for results in executor.map(self._send_bulk, batches) for result in results]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(messages))) as executor:
+            return list(executor.map(self._send_one, messages))
+
+
+@lru_cache(maxsize=None)
+def get_sms_backend() -> BaseSMSBackend:
+    """
+    Backend configured by `notice_sms_backend` / `notice_sms_backend_options`, shared by the
+    worker so its connection pool is reused across deliveries.
+    """
+    backend_class = import_string(NoticeConfig.notice_sms_backend)
+    return backend_class(**(NoticeConfig.notice_sms_backend_options or {}))
@@ -0,0 +1,363 @@
+import base64
+import fnmatch
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from contextlib import closing
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.utils.module_loading import import_string
+
+from .apps import NoticeConfig
+
+CHUNK_SIZE = 64 * 1024
+
+COMPRESSED_SUFFIX = ".gz"
+
+# size is the size of the content, stored_size the size of the (possibly compressed) blob
+StoredBlob = namedtuple("StoredBlob", ["storage_key", "content_hash", "size", "stored_size"])
+
+
+def content_key(content_hash: str) -> str:
+    """
+    Storage key of a blob, sharded by the first bytes of its hash so that no
+    directory (or key prefix) grows unbounded.
+    """
+    return f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+
+def is_compressed(storage_key) -> bool:
+    return bool(storage_key) and storage_key.endswith(COMPRESSED_SUFFIX)
+
+
+def should_compress(mime) -> bool:
+    """
+    Whether contents of this MIME type are worth compressing (`notice_attachment_compress_mime_types`).
+    """
+    return bool(mime) and any(fnmatch.fnmatch(mime.lower(), pattern)
+                              for pattern in NoticeConfig.notice_attachment_compress_mime_types or ())
+
+
+def decode_base64_document(document: str) -> bytes:
+    """
+    Decode a base64 document as sent by the frontend, tolerating a data URL prefix and the
+    line breaks or spaces of legacy documents.
+    """
+    if document.startswith("data:") and "," in document:
+        document = document.split(",", 1)[1]
+    document = "".join(document.split())
+    try:
+        return base64.b64decode(document, validate=True)
+    except (ValueError, TypeError) as exc:
+        raise ValidationError(f"Invalid base64 document: {exc}")
+
+
+class _GzipContent(gzip.GzipFile):
+    """
+    Decompressed view of a gzipped blob, closing the blob with it.
+    """
+
+    def __init__(self, blob):
+        super().__init__(fileobj=blob, mode="rb")
+        self._blob = blob
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._blob.close()
+
+
+class BaseAttachmentStorage:
+    """
+    Content-addressed store for notice attachment bytes. Blobs are identified by
+    the sha256 of their content so identical files are only stored once, gzipped
+    (with a `.gz` key) when saved with `compress` and worth it.
+    """
+
+    def save(self, fileobj, compress=False) -> StoredBlob:
+        """
+        Store the content of a binary file object, reading it in bounded chunks.
+        A content already stored, compressed or not, is not stored again.
+        """
+        raise NotImplementedError()
+
+    def open(self, storage_key: str, offset: int = 0):
+        """
+        Return a readable binary file object for the stored blob, positioned at offset.
+        """
+        raise NotImplementedError()
+
+    def exists(self, storage_key: str) -> bool:
+        raise NotImplementedError()
+
+    def stored_size(self, storage_key: str) -> int:
+        raise NotImplementedError()
+
+    def delete(self, storage_key: str) -> None:
+        raise NotImplementedError()
+
+    def put(self, storage_key: str, fileobj) -> None:
+        """
+        Write a blob as is under the given key, e.g. a compressed blob or a preview.
+        """
+        raise NotImplementedError()
+
+    def recompress(self, storage_key: str, content_hash: str, size: int):
+        """
+        Store an uncompressed blob again, gzipped, when worth it. Returns the compressed
+        StoredBlob (or None); deleting the uncompressed blob is left to the caller.
+        """
+        with tempfile.TemporaryFile() as compressed:
+            with closing(self.open(storage_key)) as raw:
+                self._compress(raw, compressed)
+            stored_size = compressed.tell()
+            if not self._worth_compressing(size, stored_size):
+                return None
+            compressed.seek(0)
+            compressed_key = content_key(content_hash) + COMPRESSED_SUFFIX
+            self.put(compressed_key, compressed)
+        return StoredBlob(compressed_key, content_hash, size, stored_size)
+
+    def existing_key(self, content_hash: str):
+        """
+        Key of the blob already holding this content, if any.
+        """
+        for storage_key in (content_key(content_hash) + COMPRESSED_SUFFIX, content_key(content_hash)):
+            if self.exists(storage_key):
+                return storage_key
+        return None
+
+    def save_bytes(self, data: bytes, compress=False) -> StoredBlob:
+        spool = tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE)
+        try:
+            spool.write(data)
+            spool.seek(0)
+            return self.save(spool, compress=compress)
+        finally:
+            spool.close()
+
+    def save_base64(self, document: str, compress=False):
+        """
+        Store a base64 document, returning (storage_key, content_hash, size) as migration
+        0003 expects. Application code stores through notice.blobs.store_blob_base64.
+        """
+        blob = self.save_bytes(decode_base64_document(document), compress=compress)
+        return blob.storage_key, blob.content_hash, blob.size
+
+    def open_content(self, storage_key: str, offset: int = 0):
+        """
+        Readable binary file object of the content, decompressed on the fly, positioned at offset.
+        """
+        if not is_compressed(storage_key):
+            return self.open(storage_key, offset)
+        content = _GzipContent(self.open(storage_key))
+        if offset:
+            content.seek(offset)
+        return content
+
+    def read_bytes(self, storage_key: str) -> bytes:
+        with closing(self.open_content(storage_key)) as blob:
+            return blob.read()
+
+    def iter_chunks(self, storage_key: str, offset: int = 0, length: int = None):
+        """
+        Yield the content (or `length` bytes of it starting at `offset`) in bounded chunks.
+        """
+        with closing(self.open_content(storage_key, offset)) as blob:
+            remaining = length
+            while remaining is None or remaining > 0:
+                chunk = blob.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def read_base64(self, storage_key: str) -> str:
+        return base64.b64encode(self.read_bytes(storage_key)).decode("ascii")
+
+    def iter_stored_chunks(self, storage_key: str):
+        """
+        Yield the blob as stored (gzipped for compressed blobs) in bounded chunks.
+        """
+        with closing(self.open(storage_key)) as blob:
+            for chunk in iter(lambda: blob.read(CHUNK_SIZE), b""):
+                yield chunk
+
+    @staticmethod
+    def _compress(source, target):
+        """
+        Gzip source into target; mtime is fixed so a content always gives the same blob.
+        """
+        with gzip.GzipFile(fileobj=target, mode="wb", mtime=0) as compressed:
+            shutil.copyfileobj(source, compressed, CHUNK_SIZE)
+
+    @staticmethod
+    def _worth_compressing(size, compressed_size) -> bool:
+        return compressed_size <= size * (1 - NoticeConfig.notice_attachment_compress_min_saving)
+
+    @staticmethod
+    def _spool_and_hash(fileobj, target):
+        """
+        Copy fileobj into target chunk by chunk, returning (sha256 hexdigest, size).
+        """
+        digest = hashlib.sha256()
+        size = 0
+        while True:
+            chunk = fileobj.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+            target.write(chunk)
+        return digest.hexdigest(), size
+
+
+class FileSystemAttachmentStorage(BaseAttachmentStorage):
+    """
+    Default backend, storing blobs under `notice_attachments_root_path`
+    (or MEDIA_ROOT/notice_attachments when not configured).
+    """
+
+    def __init__(self, root=None):
+        self.root = root or NoticeConfig.notice_attachments_root_path \
+            or os.path.join(getattr(settings, "MEDIA_ROOT", None) or os.getcwd(), "notice_attachments")
+
+    def path(self, storage_key: str) -> str:
+        return os.path.join(self.root, *storage_key.split("/"))
+
+    def save(self, fileobj, compress=False) -> StoredBlob:
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        compressed_path = tmp_path + COMPRESSED_SUFFIX
+        try:
+            with os.fdopen(fd, "wb") as target:
+                content_hash, size = self._spool_and_hash(fileobj, target)
+            storage_key = self.existing_key(content_hash)
+            if storage_key:
+                os.remove(tmp_path)
+                return StoredBlob(storage_key, content_hash, size, self.stored_size(storage_key))
+            storage_key, source = content_key(content_hash), tmp_path
+            if compress:
+                with open(tmp_path, "rb") as raw, open(compressed_path, "wb") as target:
+                    self._compress(raw, target)
+                if self._worth_compressing(size, os.path.getsize(compressed_path)):
+                    storage_key, source = storage_key + COMPRESSED_SUFFIX, compressed_path
+            path = self.path(storage_key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(source, path)
+        finally:
+            for leftover in (tmp_path, compressed_path):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        return StoredBlob(storage_key, content_hash, size, os.path.getsize(path))
+
+    def open(self, storage_key: str, offset: int = 0):
+        blob = open(self.path(storage_key), "rb")
+        if offset:
+            blob.seek(offset)
+        return blob
+
+    def exists(self, storage_key: str) -> bool:
+        return os.path.exists(self.path(storage_key))
+
+    def stored_size(self, storage_key: str) -> int:
+        return os.path.getsize(self.path(storage_key))
+
+    def put(self, storage_key: str, fileobj) -> None:
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as target:
+                shutil.copyfileobj(fileobj, target, CHUNK_SIZE)
+            path = self.path(storage_key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def delete(self, storage_key: str) -> None:
+        try:
+            os.remove(self.path(storage_key))
+        except FileNotFoundError:
+            pass
+
+
+class S3AttachmentStorage(BaseAttachmentStorage):
+    """
+    S3-compatible backend. Point `endpoint_url` to a local stand-in (MinIO, moto server...)
+    for development and tests. Requires boto3.
+    """
+
+    def __init__(self, bucket=None, prefix="notice/", endpoint_url=None, **client_kwargs):
+        try:
+            import boto3
+        except ImportError:
+            raise ImproperlyConfigured("S3AttachmentStorage requires the boto3 package")
+        if not bucket:
+            raise ImproperlyConfigured("S3AttachmentStorage requires a bucket")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, **client_kwargs)
+
+    def _object_key(self, storage_key: str) -> str:
+        return f"{self.prefix}{storage_key}"
+
+    def save(self, fileobj, compress=False) -> StoredBlob:
+        with tempfile.TemporaryFile() as spool, tempfile.TemporaryFile() as compressed:
+            content_hash, size = self._spool_and_hash(fileobj, spool)
+            storage_key = self.existing_key(content_hash)
+            if storage_key:
+                return StoredBlob(storage_key, content_hash, size, self.stored_size(storage_key))
+            storage_key, source = content_key(content_hash), spool
+            spool.seek(0)
+            if compress:
+                self._compress(spool, compressed)
+                if self._worth_compressing(size, compressed.tell()):
+                    storage_key, source = storage_key + COMPRESSED_SUFFIX, compressed
+                spool.seek(0)
+            stored_size = source.tell() if source is compressed else size
+            source.seek(0)
+            self.client.upload_fileobj(source, self.bucket, self._object_key(storage_key))
+        return StoredBlob(storage_key, content_hash, size, stored_size)
+
+    def open(self, storage_key: str, offset: int = 0):
+        extra = {"Range": f"bytes={offset}-"} if offset else {}
+        response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(storage_key), **extra)
+        return response["Body"]
+
+    def exists(self, storage_key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(storage_key))
+            return True
+        except ClientError:
+            return False
+
+    def stored_size(self, storage_key: str) -> int:
+        return self.client.head_object(Bucket=self.bucket, Key=self._object_key(storage_key))["ContentLength"]
+
+    def put(self, storage_key: str, fileobj) -> None:
+        self.client.upload_fileobj(fileobj, self.bucket, self._object_key(storage_key))
+
+    def delete(self, storage_key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(storage_key))
+
+
+@lru_cache(maxsize=None)
+def get_attachment_storage() -> BaseAttachmentStorage:
+    """
+    Storage backend configured by `notice_attachment_storage_backend` and
+    `notice_attachment_storage_options`.
+    """
+    backend_class = import_string(NoticeConfig.notice_attachment_storage_backend)
+    return backend_class(**(NoticeConfig.notice_attachment_storage_options or {}))
@@ -0,0 +1,152 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .apps import NoticeConfig
+from .models import Notice, NoticeArchive, NoticeAttachment, NoticeScopeChange
+from .audience import audience_filter
+from .cache import notice_scope
+from .reads import reader_facility_id
+
+SYNC_TOKEN_PREFIX = "sync:"
+# Attachment metadata sent to the devices, never the content
+SYNC_ATTACHMENT_FIELDS = ("id", "uuid", "notice_id", "general_type", "type", "title", "date", "filename", "mime",
+                          "url", "size", "content_hash")
+
+# Keyset streams of a sync token: notices, archived notices, scope changes
+SYNC_STREAMS = ("n", "a", "s")
+
+NoticeChanges = namedtuple("NoticeChanges", ["notices", "deleted", "cursor", "has_more"])
+
+
+def encode_sync_token(notice_key, archive_key, scope_key=None) -> str:
+    key = {stream: [stream_key[0].isoformat(), stream_key[1]] if stream_key else None
+           for stream, stream_key in zip(SYNC_STREAMS, (notice_key, archive_key, scope_key))}
+    return base64.urlsafe_b64encode((SYNC_TOKEN_PREFIX + json.dumps(key, separators=(",", ":"))).encode()).decode()
+
+
+def _decode_stream_key(value):
+    if not value:
+        return None
+    changed_at, row_id = parse_datetime(value[0]), int(value[1])
+    if changed_at is None or row_id < 0:
+        raise ValueError()
+    return changed_at, row_id
+
+
+def decode_sync_token(token):
+    """
+    (notice, archive, scope change) keys of a sync token. Tokens issued before scope changes
+    were tracked have no scope change key: those are then read from the start.
+    """
+    try:
+        value = base64.urlsafe_b64decode(token.encode()).decode()
+        if not value.startswith(SYNC_TOKEN_PREFIX):
+            raise ValueError()
+        key = json.loads(value[len(SYNC_TOKEN_PREFIX):])
+        return tuple(_decode_stream_key(key.get(stream)) for stream in SYNC_STREAMS)
+    except (ValueError, TypeError, KeyError, IndexError, AttributeError):
+        raise ValidationError("Invalid sync token")
+
+
+def record_scope_changes(notices):
+    """
+    Tombstones of the visible notices whose audience changed since they were loaded (see
+    notice.signals.remember_notice_scope), for the devices syncing their previous audience.
+    """
+    NoticeScopeChange.objects.bulk_create([
+        NoticeScopeChange(notice_id=notice.id, health_facility_id=health_facility_id,
+                          audience_location_id=audience_location_id)
+        for notice in notices
+        for health_facility_id, audience_location_id in [notice._loaded_audience]
+        if notice._loaded_visible
+        and notice._loaded_scope != notice_scope(notice.health_facility_id, notice.audience_location_id)
+    ])
+
+
+def _after(key, field):
+    if key is None:
+        return Q()
+    return Q(**{f"{field}__gt": key[0]}) | Q(**{field: key[0], "id__gt": key[1]})
+
+
+def _visible_to(queryset, user):
+    health_facility_id = reader_facility_id(user)
+    if health_facility_id:
+        queryset = queryset.filter(audience_filter(health_facility_id))
+    return queryset
+
+
+def notice_changes(user, token=None, limit=None) -> NoticeChanges:
+    """
+    Notices published or updated, and uuids of notices deleted (soft deleted, archived or
+    retargeted away from the user), since the sync token, visible to the user, in
+    (updated_at, id) order. Without token, the active notices are returned and deletions
+    start now. Rows changed in the last
+    `notice_sync_settle_seconds` are left to the next sync: their transaction may commit
+    after rows with a later updated_at, which would otherwise be skipped.
+    """
+    if limit is not None and limit < 0:
+        raise ValidationError("first must not be negative")
+    limit = min(limit or NoticeConfig.notice_sync_page_size, NoticeConfig.notice_sync_page_size)
+    notice_key, archive_key, scope_key = decode_sync_token(token) if token else (None, None, None)
+    settled = timezone.now() - timedelta(seconds=NoticeConfig.notice_sync_settle_seconds)
+
+    notices = _visible_to(Notice.objects.filter(published_at__isnull=False), user) \
+        .filter(_after(notice_key, "updated_at"), updated_at__lt=settled)
+    if token is None:
+        notices = notices.filter(is_active=True)
+    notices = list(
+        notices.order_by("updated_at", "id")
+        .only("id", "uuid", "title", "description", "priority", "health_facility_id", "audience_type",
+              "audience_location_id", "published_at", "updated_at", "is_active")
+        .prefetch_related(Prefetch(
+            "attachments",
+            queryset=NoticeAttachment.objects.filter(validity_to__isnull=True).only(*SYNC_ATTACHMENT_FIELDS),
+            to_attr="sync_attachments"))
+        [:limit + 1])
+
+    archived = _visible_to(NoticeArchive.objects.all(), user)
+    if token is None:
+        last = archived.order_by("-archived_at", "-id").values_list("archived_at", "id").first()
+        archived = []
+        archive_key = last or archive_key
+    else:
+        archived = list(archived.filter(_after(archive_key, "archived_at"), archived_at__lt=settled)
+                        .order_by("archived_at", "id").values_list("archived_at", "id", "uuid")[:limit + 1])
+
+    scope_changes = _visible_to(NoticeScopeChange.objects.all(), user)
+    if token is None:
+        scope_key = scope_changes.order_by("-changed_at", "-id").values_list("changed_at", "id").first() or scope_key
+        scope_changes = []
+    else:
+        scope_changes = list(scope_changes.filter(_after(scope_key, "changed_at"), changed_at__lt=settled)
+                             .order_by("changed_at", "id")
+                             .values_list("changed_at", "id", "notice_id", "notice__uuid")[:limit + 1])
+
+    has_more = len(notices) > limit or len(archived) > limit or len(scope_changes) > limit
+    notices, archived, scope_changes = notices[:limit], archived[:limit], scope_changes[:limit]
+    if notices:
+        notice_key = (notices[-1].updated_at, notices[-1].id)
+    if archived:
+        archive_key = archived[-1][:2]
+    if scope_changes:
+        scope_key = scope_changes[-1][:2]
+    # retargeted notices still visible to the user (e.g. moved back) come as updates instead
+    still_visible = set(_visible_to(
+        Notice.objects.filter(id__in={notice_id for _, _, notice_id, _ in scope_changes}, is_active=True,
+                              published_at__isnull=False), user).values_list("id", flat=True)) \
+        if scope_changes else set()
+    left = list(dict.fromkeys(uuid for _, _, notice_id, uuid in scope_changes if notice_id not in still_visible))
+    return NoticeChanges(
+        notices=[notice for notice in notices if notice.is_active],
+        deleted=[notice.uuid for notice in notices if not notice.is_active] + [uuid for _, _, uuid in archived] + left,
+        cursor=encode_sync_token(notice_key, archive_key, scope_key),
+        has_more=has_more,
+    )
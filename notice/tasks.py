@@ -0,0 +1,61 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def deliver_notice_batch(delivery_id):
+    """
+    Send one recipient batch of a notice delivery outbox row.
+    """
+    from .delivery import deliver_notice_batch as deliver
+    deliver(delivery_id)
+
+
+@shared_task
+def relay_notice_deliveries():
+    """
+    Celery beat entry point of the delivery outbox relay, e.g.
+    CELERY_BEAT_SCHEDULE = {"notice_relay": {"task": "notice.tasks.relay_notice_deliveries", "schedule": 5}}
+    """
+    from .delivery import relay_notice_deliveries as relay
+    return relay()
+
+
+@shared_task
+def publish_due_notices():
+    """
+    Celery beat entry point of the publishing scheduler, e.g.
+    CELERY_BEAT_SCHEDULE = {"notice_publish": {"task": "notice.tasks.publish_due_notices", "schedule": 60}}
+    """
+    from .publishing import publish_due_notices as publish
+    return publish()
+
+
+@shared_task
+def archive_expired_notices():
+    """
+    Celery beat entry point of the expiry sweeper.
+    """
+    from .archiving import archive_expired_notices as archive
+    return archive()
+
+
+@shared_task
+def cleanup_notice_uploads():
+    """
+    Celery beat entry point deleting the abandoned chunked uploads and their spool files.
+    """
+    from .uploads import delete_stale_uploads
+    return delete_stale_uploads()
+
+
+@shared_task
+def generate_attachment_previews(attachment_ids):
+    """
+    Render the previews of new attachment contents, scheduled by notice.previews.schedule_attachment_previews.
+    """
+    from .previews import generate_attachment_previews as generate
+    return generate(attachment_ids)
@@ -0,0 +1,639 @@
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import smtplib
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import graphene
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import MutationLog
+from core.test_helpers import create_test_interactive_user
+from location.models import HealthFacility
+
+from . import uploads
+from .apps import NoticeConfig
+from .archiving import archive_expired_notices
+from .cache import ALL_SCOPE
+from .delivery import relay_notice_deliveries
+from .events import EVENT_DELETED, scope_channel
+from .gql_mutations import DeleteNoticeMutation
+from .models import Notice, NoticeArchive, NoticeAttachment, NoticeAttachmentUpload, NoticeBlob, NoticeDelivery, \
+    NoticeMutation
+from .pagination import KEYSET_CURSOR_PREFIX, NoticeConnectionField
+from .schema import Query, on_notice_mutation
+from .services import NoticeEmailDispatcher, render_notice_email
+from .sms import HttpSMSBackend, SMSMessage, idempotency_key
+from .storage import FileSystemAttachmentStorage, is_compressed
+from .sync import encode_sync_token, notice_changes
+from .views import download_attachment
+
+NOTICES_QUERY = """
+query ($first: Int) {
+  notices(first: $first) {
+    edges { node { uuid title attachmentCount healthFacility { id } audienceLocation { id } } }
+  }
+}"""
+
+
+@override_settings(ROW_SECURITY=False)
+class NoticesQueryCountTest(TestCase):
+    """
+    A page of notices, with the attachment counts and joined foreign keys, is resolved with
+    a fixed number of queries whatever its size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username="notice_query_count")
+        cls.schema = graphene.Schema(query=Query)
+
+    def _create_notices(self, count, attachments_per_notice):
+        for index in range(count):
+            notice = Notice.objects.create(title=f"Notice {index}", description="Query count test",
+                                           priority="LOW", published_at=timezone.now())
+            for number in range(attachments_per_notice):
+                NoticeAttachment.objects.create(notice=notice, general_type="URL", title=f"Link {number}",
+                                                url=f"https://example.org/{index}/{number}")
+
+    def _query_notices(self):
+        result = self.schema.execute(NOTICES_QUERY, context_value=SimpleNamespace(user=self.user),
+                                     variable_values={"first": 100})
+        self.assertIsNone(result.errors)
+        return [edge["node"] for edge in result.data["notices"]["edges"]]
+
+    def test_attachment_counts(self):
+        self._create_notices(3, 2)
+        nodes = self._query_notices()
+        self.assertEqual(len(nodes), 3)
+        self.assertEqual({node["attachmentCount"] for node in nodes}, {2})
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self._create_notices(2, 1)
+        with CaptureQueriesContext(connection) as small_page:
+            self.assertEqual(len(self._query_notices()), 2)
+
+        self._create_notices(20, 3)
+        with self.assertNumQueries(len(small_page.captured_queries)):
+            self.assertEqual(len(self._query_notices()), 22)
+
+
+KEYSET_QUERY = """
+query ($first: Int, $after: String) {
+  notices(first: $first, after: $after, keyset: true) {
+    edges { cursor node { uuid } }
+    pageInfo { hasNextPage endCursor }
+  }
+}"""
+
+
+@override_settings(ROW_SECURITY=False)
+class KeysetPaginationTest(TestCase):
+    """
+    Keyset cursors round-trip, break created_at ties on the id and are rejected when malformed.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username="notice_keyset")
+        cls.schema = graphene.Schema(query=Query)
+
+    def _execute(self, **variables):
+        return self.schema.execute(KEYSET_QUERY, context_value=SimpleNamespace(user=self.user),
+                                   variable_values=variables)
+
+    @staticmethod
+    def _cursor(value):
+        return base64.b64encode((KEYSET_CURSOR_PREFIX + value).encode()).decode()
+
+    def test_cursor_round_trip(self):
+        created_at = timezone.now()
+        cursor = NoticeConnectionField.encode_cursor(SimpleNamespace(created_at=created_at, id=42))
+        self.assertEqual(NoticeConnectionField.decode_cursor(cursor), (created_at, 42))
+
+    def test_ties_on_created_at_are_ordered_by_id(self):
+        notices = [Notice.objects.create(title=f"Tie {index}", description="Keyset test", priority="LOW",
+                                         published_at=timezone.now()) for index in range(5)]
+        Notice.objects.filter(id__in=[notice.id for notice in notices]).update(created_at=timezone.now())
+        expected = [str(notice.uuid) for notice in sorted(notices, key=lambda notice: notice.id, reverse=True)]
+
+        uuids, after = [], None
+        while True:
+            result = self._execute(first=2, after=after)
+            self.assertIsNone(result.errors)
+            page = result.data["notices"]
+            uuids += [edge["node"]["uuid"] for edge in page["edges"]]
+            if not page["pageInfo"]["hasNextPage"]:
+                break
+            after = page["pageInfo"]["endCursor"]
+        self.assertEqual(uuids, expected)
+
+    def test_malformed_and_tampered_cursors_are_rejected(self):
+        for cursor in [self._cursor('["not a date", 1]'), self._cursor('["2025-01-01T00:00:00", "x"]'),
+                       self._cursor('"2025-01-01T00:00:00"'),
+                       base64.b64encode(b'offset:["2025-01-01T00:00:00", 1]').decode(), "%%%"]:
+            result = self._execute(first=2, after=cursor)
+            self.assertIsNotNone(result.errors, cursor)
+            self.assertIn("Invalid keyset cursor", str(result.errors[0]))
+
+
+class FlakyEmailBackend(BaseEmailBackend):
+    """
+    Email backend refusing some recipients and throttling others once, counting its calls.
+    """
+
+    def __init__(self, refused=(), throttled=(), **kwargs):
+        super().__init__(**kwargs)
+        self.refused, self.throttled = set(refused), set(throttled)
+        self.calls, self.sent = 0, []
+
+    def send_messages(self, email_messages):
+        self.calls += 1
+        for message in email_messages:
+            recipient = message.to[0]
+            if recipient in self.refused:
+                raise smtplib.SMTPRecipientsRefused({recipient: (550, b"Unknown user")})
+            if recipient in self.throttled:
+                self.throttled.discard(recipient)
+                raise smtplib.SMTPResponseException(451, b"Slow down")
+            self.sent.append(recipient)
+        return len(email_messages)
+
+
+class NoticeEmailDispatcherTest(TestCase):
+    """
+    Notice emails never disclose the audience: every recipient gets a message of their own.
+    """
+
+    def test_one_message_per_recipient(self):
+        recipients = [f"user{index}@example.org" for index in range(5)]
+        email_connection = mail.get_connection("django.core.mail.backends.locmem.EmailBackend")
+        result = NoticeEmailDispatcher(connection=email_connection, batch_size=2).send(
+            recipients, render_notice_email("Title", "Description", "LOW"))
+        self.assertEqual(result.sent, recipients)
+        self.assertEqual(result.failed, [])
+        self.assertEqual([message.to for message in mail.outbox], [[recipient] for recipient in recipients])
+        self.assertTrue(all(not message.cc and not message.bcc for message in mail.outbox))
+
+    def test_batch_sent_in_one_call_with_per_message_failures(self):
+        recipients = [f"user{index}@example.org" for index in range(5)]
+        backend = FlakyEmailBackend(refused=[recipients[3]], throttled=[recipients[1]])
+        result = NoticeEmailDispatcher(connection=backend, batch_size=10, backoff=0).send(
+            recipients, render_notice_email("Title", "Description", "LOW"))
+        # one call, resumed after the throttled message and after the refused one
+        self.assertEqual(backend.calls, 3)
+        self.assertEqual(backend.sent, [recipients[0], recipients[1], recipients[2], recipients[4]])
+        self.assertEqual(result.sent, backend.sent)
+        self.assertEqual([recipient for recipient, _ in result.failed], [recipients[3]])
+
+
+class FakeGatewayResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data or {}
+        self.text = str(self.data)
+        self.headers = {}
+
+    def json(self):
+        return self.data
+
+
+class FakeSMSGateway:
+    """
+    Stand-in for the pooled requests session of HttpSMSBackend: answers 503 a given number of
+    times per phone number before accepting it, rejects some numbers, and delivers a message
+    once per idempotency key.
+    """
+
+    def __init__(self, unavailable=None, rejected=()):
+        self.unavailable = Counter(unavailable or {})
+        self.rejected = set(rejected)
+        self.requests = []
+        self.delivered = []
+        self._keys = set()
+        self._lock = threading.Lock()
+
+    def _answer(self, phone, key):
+        if self.unavailable[phone] > 0:
+            self.unavailable[phone] -= 1
+            return None
+        if phone in self.rejected:
+            return {"to": phone, "success": False, "error": "Invalid number"}
+        if key not in self._keys:
+            self._keys.add(key)
+            self.delivered.append(phone)
+        return {"to": phone, "success": True}
+
+    def post(self, url, json=None, timeout=None, headers=None):
+        with self._lock:
+            self.requests.append((url, json, headers["Idempotency-Key"]))
+            if "messages" in json:
+                answers = [self._answer(message["to"], message["idempotency_key"]) for message in json["messages"]]
+                if None in answers:
+                    return FakeGatewayResponse(503)
+                return FakeGatewayResponse(200, {"results": answers})
+            answer = self._answer(json["to"], headers["Idempotency-Key"])
+            return FakeGatewayResponse(503) if answer is None else FakeGatewayResponse(200, answer)
+
+
+class HttpSMSBackendTest(TestCase):
+    """
+    SMS fan-out through a fake gateway: unavailable answers are retried with the same
+    idempotency key, rejected and still unavailable numbers are reported as failed.
+    """
+
+    def _messages(self, count, run=0):
+        phones = [f"+2557000000{index:02d}" for index in range(count)]
+        return phones, [SMSMessage(phone, "Notice", idempotency_key("notice", phone, run)) for phone in phones]
+
+    def _backend(self, gateway, **options):
+        backend = HttpSMSBackend(url="http://gateway.test/send", api_key="key", max_workers=4, max_retries=2,
+                                 backoff=0, **options)
+        backend.session = gateway
+        return backend
+
+    def test_fan_out_retries_and_failures(self):
+        phones, messages = self._messages(20)
+        gateway = FakeSMSGateway(unavailable={phones[1]: 2, phones[2]: 5}, rejected=[phones[3]])
+        results = {result.to: result for result in self._backend(gateway).send_messages(messages)}
+
+        self.assertEqual(set(results), set(phones))
+        self.assertTrue(results[phones[1]].success)
+        self.assertFalse(results[phones[2]].success)
+        self.assertIn("503", results[phones[2]].error)
+        self.assertFalse(results[phones[3]].success)
+        self.assertIn("Invalid number", results[phones[3]].error)
+        self.assertEqual(sum(result.success for result in results.values()), 18)
+        # 20 first attempts, 2 retries of phones[1] and 2 (max_retries) of phones[2]
+        self.assertEqual(len(gateway.requests), 24)
+        keys = {key for _, payload, key in gateway.requests if payload["to"] == phones[1]}
+        self.assertEqual(keys, {idempotency_key("notice", phones[1])})
+        self.assertEqual(sorted(gateway.delivered), sorted(set(phones) - {phones[2], phones[3]}))
+
+    def test_new_run_is_not_deduplicated(self):
+        phones, first_run = self._messages(5)
+        _, second_run = self._messages(5, run=1)
+        gateway = FakeSMSGateway()
+        backend = self._backend(gateway)
+        backend.send_messages(first_run)
+        # a retried batch of the first run is deduplicated by the gateway, the second run is not
+        backend.send_messages(first_run)
+        backend.send_messages(second_run)
+        self.assertEqual(Counter(gateway.delivered), Counter({phone: 2 for phone in phones}))
+
+    def test_bulk_fan_out(self):
+        phones, messages = self._messages(25)
+        gateway = FakeSMSGateway(unavailable={phones[0]: 1}, rejected=[phones[24]])
+        backend = self._backend(gateway, bulk_url="http://gateway.test/bulk", bulk_size=10)
+        results = backend.send_messages(messages)
+
+        self.assertEqual([result.to for result in results], phones)
+        self.assertEqual([result.to for result in results if not result.success], [phones[24]])
+        # 3 bulk requests, the first one retried once
+        self.assertEqual(len(gateway.requests), 4)
+        self.assertTrue(all(url == "http://gateway.test/bulk" for url, _, _ in gateway.requests))
+
+
+class ArchiveExpiredNoticesTest(TestCase):
+    """
+    The expiry sweeper deletes the archived notices set-based and announces each one once.
+    """
+
+    def test_one_event_per_archived_notice(self):
+        expired = timezone.now() - timedelta(days=1)
+        notices = [Notice.objects.create(title=f"Expired {index}", description="Archive test", priority="LOW",
+                                         published_at=timezone.now(), validity_to=expired)
+                   for index in range(3)]
+        with mock.patch("notice.events.get_notice_broker") as get_broker, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_expired_notices(batch_size=2), 3)
+
+        published = [json.loads(message) for channel, message in
+                     (call.args for call in get_broker.return_value.publish.call_args_list)
+                     if channel == scope_channel(ALL_SCOPE)]
+        self.assertEqual(Counter((event["type"], event["uuid"]) for event in published),
+                         Counter({(EVENT_DELETED, str(notice.uuid)): 1 for notice in notices}))
+        ids = [notice.id for notice in notices]
+        self.assertFalse(Notice.objects.filter(id__in=ids).exists())
+        self.assertEqual(NoticeArchive.objects.filter(id__in=ids).count(), 3)
+
+
+class RelayNoticeDeliveriesTest(TestCase):
+    """
+    The relay leaves the outbox rows whose last attempt failed until their backoff is over.
+    """
+
+    def test_failed_rows_wait_for_their_next_attempt(self):
+        notice = Notice.objects.create(title="Relay", description="Relay test", priority="LOW")
+        now = timezone.now()
+        due = NoticeDelivery.objects.create(notice=notice, channel=NoticeDelivery.CHANNEL_EMAIL)
+        NoticeDelivery.objects.create(notice=notice, channel=NoticeDelivery.CHANNEL_SMS, attempts=1,
+                                      next_attempt_at=now + timedelta(minutes=1))
+        with mock.patch("notice.tasks.deliver_notice_batch") as task:
+            self.assertEqual(relay_notice_deliveries(now=now), 1)
+            task.delay.assert_called_once_with(due.id)
+            self.assertEqual(relay_notice_deliveries(now=now + timedelta(minutes=2)), 1)
+
+
+class DownloadAttachmentTest(TestCase):
+    """
+    Byte ranges, conditional requests, gzip passthrough and link attachments of the download view.
+    """
+    CONTENT = bytes(range(256)) * 4
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        self.storage = FileSystemAttachmentStorage(root=root)
+        for target, value in (("notice.views.get_attachment_storage", lambda: self.storage),
+                              ("notice.views.visible_notice_attachments", lambda user: NoticeAttachment.objects.all())):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.notice = Notice.objects.create(title="Download", description="Download test", priority="LOW")
+        self.factory = RequestFactory()
+
+    def _file(self, data, compress=False):
+        blob = self.storage.save_bytes(data, compress=compress)
+        return NoticeAttachment.objects.create(
+            notice=self.notice, general_type="FILE", title="File", filename="file.bin", mime="text/plain",
+            storage_key=blob.storage_key, content_hash=blob.content_hash, size=blob.size)
+
+    def _link(self, url):
+        return NoticeAttachment.objects.create(notice=self.notice, general_type="URL", title="Link", url=url)
+
+    def _get(self, attachment, **headers):
+        request = self.factory.get(f"/attachments/{attachment.uuid}/download", **headers)
+        request.user = None
+        return download_attachment(request, attachment.uuid)
+
+    @staticmethod
+    def _body(response):
+        return b"".join(response.streaming_content)
+
+    def test_suffix_range(self):
+        response = self._get(self._file(self.CONTENT), HTTP_RANGE="bytes=-100")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 924-1023/1024")
+        self.assertEqual(self._body(response), self.CONTENT[-100:])
+
+    def test_open_ended_range(self):
+        response = self._get(self._file(self.CONTENT), HTTP_RANGE="bytes=1000-")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Length"], "24")
+        self.assertEqual(self._body(response), self.CONTENT[1000:])
+
+    def test_unsatisfiable_range(self):
+        response = self._get(self._file(self.CONTENT), HTTP_RANGE="bytes=2000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_if_range_mismatch_sends_the_whole_content(self):
+        response = self._get(self._file(self.CONTENT), HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), self.CONTENT)
+
+    def test_if_none_match(self):
+        attachment = self._file(self.CONTENT)
+        response = self._get(attachment, HTTP_IF_NONE_MATCH=f'"other", "{attachment.content_hash}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], f'"{attachment.content_hash}"')
+
+    def test_gzip_passthrough(self):
+        data = b"notice text " * 1000
+        attachment = self._file(data, compress=True)
+        self.assertTrue(is_compressed(attachment.storage_key))
+
+        response = self._get(attachment, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["ETag"], f'"{attachment.content_hash}-gzip"')
+        self.assertEqual(gzip.decompress(self._body(response)), data)
+
+        response = self._get(attachment, HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(self._body(response), data)
+
+    def test_links_outside_the_allowlist_are_not_redirected(self):
+        with mock.patch.object(NoticeConfig, "allowed_domains_attachments", ["docs.example.org"]):
+            response = self._get(self._link("https://docs.example.org/guide.pdf"))
+            self.assertEqual(response.status_code, 302)
+
+            response = self._get(self._link("https://elsewhere.example.com/guide.pdf"))
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.has_header("Location"))
+            self.assertEqual(json.loads(response.content), {"url": "https://elsewhere.example.com/guide.pdf"})
+
+            with self.assertRaises(Http404):
+                self._get(self._link("javascript:alert(1)"))
+
+
+class ChunkedUploadTest(TestCase):
+    """
+    Offsets, size limit, hash verification, blob reference and expiry of chunked uploads.
+    """
+    CONTENT = b"chunked upload " * 100
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username="notice_uploads")
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        self.storage = FileSystemAttachmentStorage(root=os.path.join(root, "blobs"))
+        patchers = [
+            mock.patch("notice.blobs.get_attachment_storage", lambda: self.storage),
+            mock.patch.object(NoticeConfig, "notice_upload_spool_path", os.path.join(root, "spool")),
+            mock.patch.object(NoticeConfig, "notice_upload_max_size", 10000),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _init(self, content=None, sha256=None):
+        content = self.CONTENT if content is None else content
+        return uploads.init_upload(self.user, len(content), sha256 or hashlib.sha256(content).hexdigest(),
+                                   filename="upload.bin", mime="application/octet-stream")
+
+    def _write(self, upload, offset, data):
+        return uploads.write_chunk(upload.uuid, self.user, offset, io.BytesIO(data), len(data))
+
+    def _upload(self, content=None, sha256=None):
+        content = self.CONTENT if content is None else content
+        upload = self._init(content, sha256)
+        self._write(upload, 0, content[:500])
+        self._write(upload, 500, content[500:])
+        return upload
+
+    def test_out_of_order_and_duplicate_chunks_are_rejected(self):
+        upload = self._init()
+        with self.assertRaises(ValidationError):
+            self._write(upload, 500, self.CONTENT[500:1000])
+        self._write(upload, 0, self.CONTENT[:500])
+        with self.assertRaises(ValidationError):
+            self._write(upload, 0, self.CONTENT[:500])
+        upload.refresh_from_db()
+        self.assertEqual(upload.received, 500)
+        with open(uploads.spool_path(upload), "rb") as spool:
+            self.assertEqual(spool.read(), self.CONTENT[:500])
+
+    def test_size_limit(self):
+        with self.assertRaises(ValidationError):
+            uploads.init_upload(self.user, 10001, "0" * 64)
+        upload = self._init()
+        with self.assertRaises(ValidationError):
+            self._write(upload, 0, self.CONTENT + b"extra")
+
+    def test_finalize_incomplete_upload(self):
+        upload = self._init()
+        self._write(upload, 0, self.CONTENT[:500])
+        with self.assertRaises(ValidationError):
+            uploads.finalize_upload(upload.uuid, self.user)
+
+    def test_finalize_rejects_a_hash_mismatch(self):
+        upload = self._upload(sha256="0" * 64)
+        upload = uploads.finalize_upload(upload.uuid, self.user)
+        self.assertEqual(upload.status, NoticeAttachmentUpload.STATUS_FAILED)
+        self.assertFalse(os.path.exists(uploads.spool_path(upload)))
+        self.assertFalse(NoticeBlob.objects.exists())
+        with self.assertRaises(ValidationError):
+            uploads.get_completed_upload(upload.uuid, self.user)
+
+    def test_finalize_stores_and_references_the_blob(self):
+        upload = self._upload()
+        upload = uploads.finalize_upload(upload.uuid, self.user)
+        self.assertEqual(upload.status, NoticeAttachmentUpload.STATUS_COMPLETED)
+        self.assertEqual(upload.content_hash, hashlib.sha256(self.CONTENT).hexdigest())
+        self.assertEqual(self.storage.read_bytes(upload.storage_key), self.CONTENT)
+        self.assertEqual(NoticeBlob.objects.get(content_hash=upload.content_hash).ref_count, 1)
+        self.assertFalse(os.path.exists(uploads.spool_path(upload)))
+
+        # finalizing again is a no-op
+        uploads.finalize_upload(upload.uuid, self.user)
+        self.assertEqual(NoticeBlob.objects.get(content_hash=upload.content_hash).ref_count, 1)
+
+    def test_expired_uploads_are_deleted(self):
+        completed = uploads.finalize_upload(self._upload().uuid, self.user)
+        pending = self._init()
+        fresh = self._init()
+        NoticeAttachmentUpload.objects.filter(id__in=[completed.id, pending.id]) \
+            .update(updated_at=timezone.now() - timedelta(hours=2))
+        old = time.time() - 7200
+        os.utime(uploads.spool_path(pending), (old, old))
+
+        self.assertEqual(uploads.delete_stale_uploads(max_age_seconds=3600), (2, 1))
+        self.assertEqual(list(NoticeAttachmentUpload.objects.values_list("id", flat=True)), [fresh.id])
+        self.assertFalse(os.path.exists(uploads.spool_path(pending)))
+        self.assertTrue(os.path.exists(uploads.spool_path(fresh)))
+        self.assertEqual(NoticeBlob.objects.get(content_hash=completed.content_hash).ref_count, 0)
+
+
+@override_settings(ROW_SECURITY=True)
+class NoticeSyncTest(TestCase):
+    """
+    Deletions of notices retargeted away from a facility, and validation of the sync tokens.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.facility, cls.other_facility = HealthFacility.objects.filter(validity_to__isnull=True).order_by("id")[:2]
+
+    def setUp(self):
+        patcher = mock.patch.object(NoticeConfig, "notice_sync_settle_seconds", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _reader(facility):
+        return SimpleNamespace(_u=SimpleNamespace(health_facility_id=facility.id))
+
+    def test_retargeted_notice_is_deleted_for_its_previous_facility(self):
+        notice = Notice.objects.create(title="Retargeted", description="Sync test", priority="LOW",
+                                       health_facility=self.facility, published_at=timezone.now())
+        reader, other_reader = self._reader(self.facility), self._reader(self.other_facility)
+        cursor = notice_changes(reader).cursor
+        other_cursor = notice_changes(other_reader).cursor
+
+        notice.health_facility = self.other_facility
+        notice.save()
+
+        changes = notice_changes(reader, cursor)
+        self.assertEqual(changes.deleted, [notice.uuid])
+        self.assertNotIn(notice.id, [changed.id for changed in changes.notices])
+        # the new facility gets it as an update
+        changes = notice_changes(other_reader, other_cursor)
+        self.assertIn(notice.id, [changed.id for changed in changes.notices])
+        self.assertNotIn(notice.uuid, changes.deleted)
+
+    def test_invalid_tokens_are_rejected(self):
+        reader = self._reader(self.facility)
+
+        def encode(value):
+            return base64.urlsafe_b64encode(value.encode()).decode()
+
+        valid = encode_sync_token((timezone.now(), 1), None)
+        tokens = [
+            "not a token",
+            encode("sync:not json"),
+            encode('sync:{"n":["yesterday",1]}'),
+            encode('sync:{"n":["2024-01-01T00:00:00+00:00",-1]}'),
+            # a pagination cursor is not a sync token
+            NoticeConnectionField.encode_cursor(SimpleNamespace(created_at=timezone.now(), id=1)),
+            valid[:-4],
+        ]
+        for token in tokens:
+            with self.subTest(token=token), self.assertRaises(ValidationError):
+                notice_changes(reader, token)
+        notice_changes(reader, valid)
+
+
+class DeleteNoticeMutationTest(TestCase):
+    """
+    Bulk soft delete with valid, already deleted and unknown uuids, and its mutation log.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username="notice_delete")
+
+    def test_mixed_uuids(self):
+        notices = [Notice.objects.create(title=f"Delete {index}", description="Delete test", priority="LOW",
+                                         published_at=timezone.now()) for index in range(3)]
+        already_deleted = Notice.objects.create(title="Deleted", description="Delete test", priority="LOW",
+                                                is_active=False)
+        unknown = uuid.uuid4()
+        # a uuid given twice is deleted, and logged, once
+        uuids = [notices[0].uuid, already_deleted.uuid, notices[1].uuid, unknown, notices[2].uuid, notices[0].uuid]
+        log = MutationLog.objects.create(json_content="{}", user=self.user)
+
+        # as OpenIMISMutation.mutate: the notice module signal logs the impacted notices, then the mutation runs
+        on_notice_mutation(data={"uuids": uuids}, user=self.user, mutation_log_id=log.id)
+        with mock.patch.object(self.user, "has_perms", return_value=True):
+            errors = DeleteNoticeMutation.async_mutate(self.user, uuids=uuids)
+
+        self.assertEqual(errors, [{"message": "Notice not found", "detail": str(already_deleted.uuid)},
+                                  {"message": "Notice not found", "detail": str(unknown)}])
+        self.assertFalse(Notice.objects.filter(id__in=[notice.id for notice in notices], is_active=True).exists())
+        logged = Counter(NoticeMutation.objects.filter(mutation=log).values_list("notice_id", flat=True))
+        for notice in notices:
+            self.assertEqual(logged[notice.id], 1)
+        # the already deleted notice is named by the mutation, so it is logged too; unknown uuids are not
+        self.assertEqual(sum(logged.values()), len(notices) + 1)
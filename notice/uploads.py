@@ -0,0 +1,192 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .apps import NoticeConfig
+from .blobs import add_blob_references, release_blob_references, store_blob_file
+from .models import NoticeAttachmentUpload
+from .storage import CHUNK_SIZE
+
+SPOOL_SUFFIX = ".part"
+CHUNK_SUFFIX = ".chunk"
+
+
+def spool_path(upload: NoticeAttachmentUpload) -> str:
+    return os.path.join(spool_root(), f"{upload.uuid}{SPOOL_SUFFIX}")
+
+
+def spool_root() -> str:
+    root = NoticeConfig.notice_upload_spool_path or os.path.join(tempfile.gettempdir(), "notice_uploads")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def init_upload(user, size: int, sha256: str, filename: str = None, mime: str = None) -> NoticeAttachmentUpload:
+    """
+    Register a new chunked upload of `size` bytes whose content must hash to `sha256`.
+    """
+    if size is None or size < 0:
+        raise ValidationError("Invalid upload size")
+    max_size = NoticeConfig.notice_upload_max_size
+    if max_size and size > max_size:
+        raise ValidationError(f"Upload exceeds the maximum size of {max_size} bytes")
+    if not sha256 or len(sha256) != 64:
+        raise ValidationError("A SHA-256 hex digest of the file is required")
+    upload = NoticeAttachmentUpload.objects.create(
+        user=user, size=size, expected_hash=sha256.lower(), filename=filename, mime=mime)
+    open(spool_path(upload), "wb").close()
+    return upload
+
+
+def write_chunk(upload_uuid, user, offset: int, stream, length: int) -> NoticeAttachmentUpload:
+    """
+    Append `length` bytes read from `stream` at `offset`, which must be the number of bytes
+    received so far. A chunk interrupted half-way is discarded by the next write at the same
+    offset, so clients resume by asking for `received` and re-sending from there.
+    Memory use is bounded by CHUNK_SIZE whatever the chunk or file size. The chunk is read
+    into its own spool file first: the upload row is only locked, in a short transaction, to
+    check the offset again and append it.
+    """
+    upload = NoticeAttachmentUpload.objects.get(uuid=upload_uuid, user=user)
+    _check_chunk(upload, offset, length)
+    fd, chunk_path = tempfile.mkstemp(dir=spool_root(), prefix=f"{upload.uuid}.", suffix=CHUNK_SUFFIX)
+    try:
+        with os.fdopen(fd, "wb") as chunk_file:
+            remaining = length
+            while remaining > 0:
+                chunk = stream.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                chunk_file.write(chunk)
+                remaining -= len(chunk)
+        with transaction.atomic():
+            upload = NoticeAttachmentUpload.objects.select_for_update().get(uuid=upload_uuid, user=user)
+            # another request may have written this offset in the meantime
+            _check_chunk(upload, offset, length)
+            with open(spool_path(upload), "r+b") as spool, open(chunk_path, "rb") as chunk_file:
+                spool.seek(offset)
+                spool.truncate()
+                shutil.copyfileobj(chunk_file, spool, CHUNK_SIZE)
+            upload.received = offset + length - remaining
+            upload.save(update_fields=["received", "updated_at"])
+    finally:
+        os.remove(chunk_path)
+    return upload
+
+
+def _check_chunk(upload, offset, length):
+    if upload.status != NoticeAttachmentUpload.STATUS_PENDING:
+        raise ValidationError("Upload is not pending")
+    if offset != upload.received:
+        raise ValidationError(f"Unexpected offset {offset}, expected {upload.received}")
+    if offset + length > upload.size:
+        raise ValidationError("Chunk exceeds the announced upload size")
+
+
+def finalize_upload(upload_uuid, user) -> NoticeAttachmentUpload:
+    """
+    Verify the size and SHA-256 of the spooled file, then move it to the blob store.
+    Hashing and storing happen before the upload row is locked, the lock is only taken,
+    as in write_chunk, to check the status again and complete the upload.
+    """
+    upload = NoticeAttachmentUpload.objects.get(uuid=upload_uuid, user=user)
+    if upload.status == NoticeAttachmentUpload.STATUS_COMPLETED:
+        return upload
+    _check_complete(upload)
+    path = spool_path(upload)
+    digest = hashlib.sha256()
+    try:
+        spool = open(path, "rb")
+    except FileNotFoundError:
+        # finalized by a concurrent request, which removed the spool file
+        upload.refresh_from_db()
+        if upload.status == NoticeAttachmentUpload.STATUS_COMPLETED:
+            return upload
+        raise ValidationError("Upload is not pending")
+    with spool:
+        for chunk in iter(lambda: spool.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+        blob = store_blob_file(spool, upload.mime) if digest.hexdigest() == upload.expected_hash else None
+    with transaction.atomic():
+        upload = NoticeAttachmentUpload.objects.select_for_update().get(uuid=upload_uuid, user=user)
+        # another request may have finalized the upload in the meantime
+        if upload.status == NoticeAttachmentUpload.STATUS_COMPLETED:
+            return upload
+        _check_complete(upload)
+        if blob:
+            upload.storage_key, upload.content_hash = blob.storage_key, blob.content_hash
+            upload.status = NoticeAttachmentUpload.STATUS_COMPLETED
+            upload.save(update_fields=["storage_key", "content_hash", "status", "updated_at"])
+            # the upload holds the content until attached and expired, like an attachment
+            add_blob_references([upload.content_hash])
+        else:
+            upload.status = NoticeAttachmentUpload.STATUS_FAILED
+            upload.save(update_fields=["status", "updated_at"])
+    os.remove(path)
+    return upload
+
+
+def _check_complete(upload):
+    if upload.status != NoticeAttachmentUpload.STATUS_PENDING:
+        raise ValidationError("Upload is not pending")
+    if upload.received != upload.size:
+        raise ValidationError(f"Upload incomplete: {upload.received} of {upload.size} bytes received")
+
+
+def get_completed_upload(upload_uuid, user) -> NoticeAttachmentUpload:
+    """
+    Finalized upload of the user, to be referenced by an attachment mutation.
+    """
+    upload = NoticeAttachmentUpload.objects.filter(
+        uuid=upload_uuid, user=user, status=NoticeAttachmentUpload.STATUS_COMPLETED).first()
+    if not upload:
+        raise ValidationError(f"No completed upload {upload_uuid}")
+    return upload
+
+
+def delete_stale_uploads(max_age_seconds=None, batch_size=500):
+    """
+    Delete the uploads not touched for `max_age_seconds` (abandoned, failed, or finalized but
+    never attached) with their spool files, and the spool files left without upload row.
+    Returns (number of uploads, number of spool files) deleted.
+    """
+    max_age_seconds = NoticeConfig.notice_upload_expiry_seconds if max_age_seconds is None else max_age_seconds
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    deleted_uploads = 0
+    stale = NoticeAttachmentUpload.objects.filter(updated_at__lt=cutoff)
+    while True:
+        with transaction.atomic():
+            rows = list(stale.select_for_update().order_by("id").values_list("id", "status", "content_hash")[:batch_size])
+            if not rows:
+                break
+            NoticeAttachmentUpload.objects.filter(id__in=[row_id for row_id, _, _ in rows]).delete()
+            release_blob_references(content_hash for _, status, content_hash in rows
+                                    if status == NoticeAttachmentUpload.STATUS_COMPLETED)
+        deleted_uploads += len(rows)
+    # spool files of deleted uploads and of interrupted requests, by age as their row may be gone
+    deleted_files = 0
+    oldest_mtime = time.time() - max_age_seconds
+    with os.scandir(spool_root()) as entries:
+        for entry in entries:
+            if not entry.name.endswith((SPOOL_SUFFIX, CHUNK_SUFFIX)) or entry.stat().st_mtime >= oldest_mtime:
+                continue
+            try:
+                upload_uuid = uuid.UUID(entry.name.split(".", 1)[0])
+            except ValueError:
+                upload_uuid = None
+            if upload_uuid and NoticeAttachmentUpload.objects.filter(uuid=upload_uuid, updated_at__gte=cutoff).exists():
+                continue
+            try:
+                os.remove(entry.path)
+                deleted_files += 1
+            except FileNotFoundError:
+                pass
+    return deleted_uploads, deleted_files
@@ -1,4 +1,13 @@
 from django.urls import path
 
+from . import views
+
 urlpatterns = [
-]
\ No newline at end of file
+    path('attachments/<uuid:uuid>/download', views.download_attachment, name='notice_attachment_download'),
+    path('attachments/<uuid:uuid>/preview', views.download_preview, name='notice_attachment_preview'),
+    path('attachments/uploads', views.init_upload, name='notice_attachment_upload_init'),
+    path('attachments/uploads/<uuid:uuid>', views.upload_chunk, name='notice_attachment_upload'),
+    path('attachments/uploads/<uuid:uuid>/finalize', views.finalize_upload, name='notice_attachment_upload_finalize'),
+    path('events', views.notice_events, name='notice_events'),
+    path('metrics', views.notice_metrics, name='notice_metrics'),
+]
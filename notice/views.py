@@ -0,0 +1,314 @@
+import hmac
+import json
+import re
+import time
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from . import uploads
+from .apps import NoticeConfig
+from .events import get_notice_broker, scope_channel
+from .instrumentation import metrics
+from .models import NoticeAttachment, NoticeAttachmentUpload
+from .previews import PREVIEW_MIME
+from .reads import reader_scopes
+from .services import visible_notice_attachments
+from .storage import get_attachment_storage, is_compressed
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+ACCEPTS_GZIP_RE = re.compile(r"\bgzip\b(?!\s*;\s*q=0(\.0*)?(?![\d.]))")
+
+
+def _parse_range(header, size):
+    """
+    Parse a single-range `Range` header into an inclusive (start, end) pair.
+    Returns None when the header is absent or not a single byte range (the whole
+    file is then served) and raises ValueError when the range is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # suffix range: last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def _link_response(url):
+    """
+    Redirect to the URL of a link attachment only when its host is in `allowed_domains_attachments`,
+    other http(s) links are returned in the payload for the client to open. Any other scheme
+    (javascript:, data:...) is refused.
+    """
+    allowed_hosts = set(NoticeConfig.allowed_domains_attachments or ())
+    if url_has_allowed_host_and_scheme(url, allowed_hosts=allowed_hosts) and urlsplit(url).netloc:
+        return HttpResponseRedirect(url)
+    if urlsplit(url).scheme.lower() in ("http", "https"):
+        return JsonResponse({"url": url})
+    raise Http404()
+
+
+@require_http_methods(["GET", "HEAD"])
+def download_attachment(request, uuid):
+    """
+    Stream the content of a notice attachment, with the same permission checks as
+    the `noticeAttachments` query. Supports single `Range` requests and answers
+    `If-None-Match` with 304 using the content hash as ETag. Blobs stored gzipped are
+    sent as is to clients accepting gzip, decompressed on the fly for the others.
+    """
+    try:
+        queryset = visible_notice_attachments(request.user)
+    except PermissionDenied:
+        return HttpResponse(status=403)
+    attachment = queryset.filter(uuid=uuid) \
+        .only("id", "uuid", "general_type", "filename", "mime", "url", "content_hash", "size", "storage_key") \
+        .first()
+    if not attachment:
+        raise Http404()
+    if not attachment.storage_key:
+        if attachment.url:
+            return _link_response(attachment.url)
+        raise Http404()
+
+    compressed = is_compressed(attachment.storage_key)
+    send_gzip = compressed and request.method == "GET" and "HTTP_RANGE" not in request.META \
+        and bool(ACCEPTS_GZIP_RE.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+    # the gzipped representation has its own ETag
+    etag = f'"{attachment.content_hash}-gzip"' if send_gzip else f'"{attachment.content_hash}"'
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        if compressed:
+            response["Vary"] = "Accept-Encoding"
+        return response
+    if send_gzip:
+        response = StreamingHttpResponse(get_attachment_storage().iter_stored_chunks(attachment.storage_key),
+                                         content_type=attachment.mime or "application/octet-stream")
+        response["Content-Encoding"] = "gzip"
+        response["Vary"] = "Accept-Encoding"
+        response["ETag"] = etag
+        if attachment.filename:
+            response["Content-Disposition"] = 'attachment; filename="%s"' % attachment.filename.replace('"', "")
+        return response
+
+    size = attachment.size or 0
+    byte_range = None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range or if_range.strip() == etag:
+        try:
+            byte_range = _parse_range(request.META.get("HTTP_RANGE"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    length = end - start + 1 if size else 0
+    if request.method == "HEAD" or not length:
+        content = iter(())
+    else:
+        content = get_attachment_storage().iter_chunks(attachment.storage_key, start, length)
+    response = StreamingHttpResponse(content, status=206 if byte_range else 200,
+                                     content_type=attachment.mime or "application/octet-stream")
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    if compressed:
+        response["Vary"] = "Accept-Encoding"
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if attachment.filename:
+        response["Content-Disposition"] = 'attachment; filename="%s"' % attachment.filename.replace('"', "")
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def download_preview(request, uuid):
+    """
+    Send the JPEG preview of a notice attachment (see `previewUrl`), with the same permission
+    checks as the download. Previews are derived from the content: the key is their ETag.
+    """
+    try:
+        queryset = visible_notice_attachments(request.user)
+    except PermissionDenied:
+        return HttpResponse(status=403)
+    attachment = queryset.filter(uuid=uuid, preview_status=NoticeAttachment.PREVIEW_READY) \
+        .only("id", "uuid", "preview_key").first()
+    if not attachment or not attachment.preview_key:
+        raise Http404()
+    etag = f'"{attachment.preview_key.rsplit("/", 1)[-1]}"'
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        response = HttpResponse(status=304)
+    else:
+        content = b"" if request.method == "HEAD" else get_attachment_storage().read_bytes(attachment.preview_key)
+        response = HttpResponse(content, content_type=PREVIEW_MIME)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, max-age=86400"
+    return response
+
+
+def _upload_status(upload):
+    return {
+        "uuid": str(upload.uuid),
+        "size": upload.size,
+        "received": upload.received,
+        "status": upload.status,
+    }
+
+
+def _upload_view(view):
+    """
+    Common checks of the chunked upload endpoints: add attachment permission,
+    unknown uploads answered 404 and validation errors answered 400. The endpoints are
+    csrf_exempt for the mobile and API clients authenticating with a token.
+    """
+    def wrapper(request, *args, **kwargs):
+        if not request.user.has_perms(["notice.add_notice_attachment"]):
+            return HttpResponse(status=403)
+        try:
+            return view(request, *args, **kwargs)
+        except NoticeAttachmentUpload.DoesNotExist:
+            raise Http404()
+        except ValidationError as exc:
+            return JsonResponse({"error": "; ".join(exc.messages)}, status=400)
+    return wrapper
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@_upload_view
+def init_upload(request):
+    """
+    Start a chunked upload. Body: {"size": <bytes>, "sha256": <hex>, "filename": ..., "mime": ...}
+    """
+    try:
+        payload = json.loads(request.body or b"{}")
+        size = int(payload.get("size"))
+    except (ValueError, TypeError):
+        raise ValidationError("Invalid upload request")
+    upload = uploads.init_upload(
+        request.user, size, payload.get("sha256"), payload.get("filename"), payload.get("mime"))
+    return JsonResponse(_upload_status(upload), status=201)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "PUT"])
+@_upload_view
+def upload_chunk(request, uuid):
+    """
+    GET: progress of the upload, to resume after an interruption.
+    PUT: raw chunk body with a `Content-Range: bytes <start>-<end>/<total>` header.
+    """
+    if request.method == "GET":
+        return JsonResponse(_upload_status(NoticeAttachmentUpload.objects.get(uuid=uuid, user=request.user)))
+    match = CONTENT_RANGE_RE.match(request.META.get("HTTP_CONTENT_RANGE", ""))
+    if not match:
+        raise ValidationError("A Content-Range header is required")
+    start, end = int(match.group(1)), int(match.group(2))
+    length = end - start + 1
+    if length <= 0 or int(request.META.get("CONTENT_LENGTH") or 0) != length:
+        raise ValidationError("Content-Range does not match the request body length")
+    # read from the request stream, never loading the chunk body in memory
+    upload = uploads.write_chunk(uuid, request.user, start, request, length)
+    return JsonResponse(_upload_status(upload))
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@_upload_view
+def finalize_upload(request, uuid):
+    """
+    Verify the received file against its announced SHA-256 and store it.
+    """
+    upload = uploads.finalize_upload(uuid, request.user)
+    status = 200 if upload.status == NoticeAttachmentUpload.STATUS_COMPLETED else 400
+    return JsonResponse(_upload_status(upload), status=status)
+
+
+def _event_chunk(message):
+    return ": keep-alive\n\n" if message is None else f"event: notice\ndata: {message}\n\n"
+
+
+def _event_stream(subscription, heartbeat, timeout):
+    try:
+        # clients reconnect after the stream timeout, a few seconds later
+        yield "retry: 3000\n\n"
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            yield _event_chunk(subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0))))
+    finally:
+        subscription.close()
+
+
+async def _async_event_stream(subscription, heartbeat, timeout):
+    # Django buffers synchronous iterators entirely under ASGI: the blocking waits run in
+    # executor threads instead, which are only held while waiting
+    get = sync_to_async(subscription.get, thread_sensitive=False)
+    try:
+        yield "retry: 3000\n\n"
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            yield _event_chunk(await get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0))))
+    finally:
+        await sync_to_async(subscription.close, thread_sensitive=False)()
+
+
+@require_http_methods(["GET"])
+def notice_events(request):
+    """
+    Server-Sent Events stream of the notice changes visible to the user (their facility and
+    the global scope, or every notice for users without facility). Events only carry the
+    notice uuid and change type, clients fetch the notice (or the changes since their last
+    sync) on receipt. Served under ASGI; under WSGI each stream holds a worker for its whole
+    lifetime, so it is refused unless DEBUG or `notice_events_wsgi_streams` (gevent workers).
+    """
+    if not request.user.is_authenticated:
+        return HttpResponse(status=401)
+    asgi = isinstance(request, ASGIRequest)
+    if not (asgi or settings.DEBUG or NoticeConfig.notice_events_wsgi_streams):
+        return HttpResponse("Event streams require an ASGI server", status=503)
+    subscription = get_notice_broker().subscribe([scope_channel(scope) for scope in reader_scopes(request.user)])
+    stream = _async_event_stream if asgi else _event_stream
+    response = StreamingHttpResponse(
+        stream(subscription, NoticeConfig.notice_events_heartbeat, NoticeConfig.notice_events_stream_timeout),
+        content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # disables proxy buffering (nginx) so events are not held back
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@require_http_methods(["GET"])
+def notice_metrics(request):
+    """
+    Notice metrics of all the processes in the Prometheus text format, for scrapers presenting
+    `notice_metrics_token` as a bearer token. Not found while no token is configured.
+    """
+    token = NoticeConfig.notice_metrics_token
+    if not token:
+        raise Http404()
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")